@@ -0,0 +1,97 @@
+# ----------------------------------------------------------------------
+# aspect_engine.py - موتور ماتریسی محاسبه زوایا (Aspects) با NumPy
+#
+# ماتریس فاصله زاویه‌ای N×M یک بار محاسبه می‌شود و همه زوایا با broadcasting
+# در برابر جدول Orb بررسی می‌شوند. حالت N×N (یک چارت با خودش) فقط نیمه بالای ماتریس را
+# در نظر می‌گیرد؛ حالت N×M برای سیناستری و ترانزیت روی چارت ناتال است.
+# ----------------------------------------------------------------------
+
+from typing import Dict, Any, List, Optional, Sequence
+
+import numpy as np
+
+
+def separation_matrix(lon_a: np.ndarray, lon_b: np.ndarray) -> np.ndarray:
+    """کوچک‌ترین فاصله زاویه‌ای (0 تا 180) بین هر جفت از دو آرایه درجه؛ خروجی (N, M)."""
+    diff = np.abs(np.asarray(lon_a, dtype=np.float64)[:, None] - np.asarray(lon_b, dtype=np.float64)[None, :])
+    return np.minimum(diff, 360.0 - diff)
+
+
+class AspectEngine:
+    """
+    موتور زوایا با جدول Orb قابل تنظیم.
+    clamp_bodies: اجسامی که Orb زوایای آن‌ها به clamp_orb محدود می‌شود (گره‌ها و سیارات بیرونی).
+    """
+
+    def __init__(self, aspect_degrees: Dict[str, float], aspect_orbs: Dict[str, float],
+                 clamp_bodies: Sequence[str] = (), clamp_orb: Optional[float] = None, default_orb: float = 1.0):
+        self.aspect_names: List[str] = list(aspect_degrees.keys())
+        self.aspect_angles = np.array([aspect_degrees[a] for a in self.aspect_names], dtype=np.float64)
+        self.aspect_orbs = np.array([aspect_orbs.get(a, default_orb) for a in self.aspect_names], dtype=np.float64)
+        self.clamp_bodies = set(clamp_bodies)
+        self.clamped_orbs = np.minimum(self.aspect_orbs, clamp_orb) if clamp_orb is not None else self.aspect_orbs
+        # نام نمایشی (مثلاً 'True Node') فقط یک بار برای هر نام ساخته می‌شود
+        self._display_names: Dict[str, str] = {}
+
+    def display_name(self, name: str) -> str:
+        display = self._display_names.get(name)
+        if display is None:
+            display = self._display_names[name] = name.replace("_", " ").title()
+        return display
+
+    def _clamp_mask(self, names: Sequence[str]) -> np.ndarray:
+        return np.array([n in self.clamp_bodies for n in names], dtype=bool)
+
+    def match(self, lon_a: Sequence[float], names_a: Sequence[str],
+              lon_b: Optional[Sequence[float]] = None, names_b: Optional[Sequence[str]] = None,
+              top_k: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        یافتن همه زوایای داخل Orb به صورت آرایه.
+        بدون lon_b: زوایای درونی یک چارت (فقط i < j). با lon_b: همه جفت‌های (i از A، j از B).
+        بازگشت: {'i', 'j', 'aspect' (ایندکس در aspect_names), 'orb'} مرتب شده بر اساس Orb.
+        """
+        lon_a = np.asarray(lon_a, dtype=np.float64)
+        same_chart = lon_b is None
+        if same_chart:
+            lon_b, names_b = lon_a, names_a
+        lon_b = np.asarray(lon_b, dtype=np.float64)
+
+        sep = separation_matrix(lon_a, lon_b)                                   # (N, M)
+        orb = np.abs(sep[:, :, None] - self.aspect_angles[None, None, :])      # (N, M, K)
+
+        clamp_pair = self._clamp_mask(names_a)[:, None] | self._clamp_mask(names_b)[None, :]
+        max_orb = np.where(clamp_pair[:, :, None], self.clamped_orbs, self.aspect_orbs)  # (N, M, K)
+
+        hit = orb <= max_orb
+        if same_chart:
+            hit &= np.triu(np.ones(sep.shape, dtype=bool), k=1)[:, :, None]
+
+        i, j, k = np.nonzero(hit)
+        orbs = orb[i, j, k]
+
+        # top-k با partial sort؛ ترتیب نهایی پایدار (Orb و سپس ترتیب جفت‌ها)
+        if top_k is not None and len(orbs) > top_k:
+            keep = np.argpartition(orbs, top_k - 1)[:top_k]
+            keep = keep[np.lexsort((keep, orbs[keep]))]
+        else:
+            keep = np.argsort(orbs, kind='stable')
+        return {"i": i[keep], "j": j[keep], "aspect": k[keep], "orb": orbs[keep]}
+
+    def find(self, lon_a: Sequence[float], names_a: Sequence[str],
+             lon_b: Optional[Sequence[float]] = None, names_b: Optional[Sequence[str]] = None,
+             top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """مانند match، اما خروجی لیست دیکشنری‌ها با همان کلیدهای calculate_aspects."""
+        hits = self.match(lon_a, names_a, lon_b, names_b, top_k)
+        if lon_b is None:
+            lon_b, names_b = lon_a, names_a
+        return [
+            {
+                "p1": self.display_name(names_a[i]),
+                "p2": self.display_name(names_b[j]),
+                "aspect": self.aspect_names[k],
+                "orb": float(orb),
+                "p1_deg": float(lon_a[i]),
+                "p2_deg": float(lon_b[j]),
+            }
+            for i, j, k, orb in zip(hits["i"].tolist(), hits["j"].tolist(), hits["aspect"].tolist(), hits["orb"])
+        ]
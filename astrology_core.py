@@ -1,10 +1,16 @@
 import swisseph as se
 import logging
-from typing import Dict, Any, Union, Tuple, List
-from persiantools import jdatetime
+from typing import Dict, Any, Union, Tuple, List, Sequence, Optional
 import datetime
-import pytz
 import math
+import os
+import time
+import asyncio
+import numpy as np
+
+import aspect_engine
+import fixed_stars
+import time_conversion
 
 # تنظیمات Logging
 logging.basicConfig(level=logging.INFO)
@@ -12,12 +18,14 @@ logging.basicConfig(level=logging.INFO)
 # ======================================================================
 # رفع هشدار Ephemeris: تنظیم مسیر فایل‌های داده نجومی
 # ======================================================================
+# با EPHE_PATH می‌توان پوشه کوچک‌شده (ساخته‌شده با ephemeris_files.py build) را جایگزین کرد
+EPHE_PATH = os.environ.get("EPHE_PATH", "./ephe_data/")
 try:
     # فرض می‌کنیم فایل‌های Ephemeris (مانند se1, se2,...) در پوشه 'ephe_data'
     # در کنار فایل‌های سورس قرار دارند (که توسط Dockerfile به /usr/src/app کپی شده‌اند).
     # نقطه (./) به معنی مسیر WORKDIR یا همان /usr/src/app است.
-    se.set_ephe_path('./ephe_data/') 
-    logging.info("Ephemeris path set successfully to './ephe_data/'.")
+    se.set_ephe_path(EPHE_PATH) 
+    logging.info(f"Ephemeris path set successfully to '{EPHE_PATH}'.")
 except Exception as e:
     # این هشدار اصلی را در صورتی که مسیر درست نباشد یا فایل‌ها نباشند، تولید می‌کند.
     logging.warning(f"Setup Ephemeris not found or failed, continuing without it. Error: {e}")
@@ -41,6 +49,19 @@ PLANETS_MAP = {
     "true_node": 10 # معادل se.SE_TRUE_NODE (گره شمالی حقیقی)
 }
 
+# ترتیب ثابت اجسام در خروجی‌های آرایه‌ای (ستون‌های ماتریس‌های batch)
+BODY_NAMES: List[str] = list(PLANETS_MAP.keys())
+BODY_CODES: List[int] = list(PLANETS_MAP.values())
+
+# FLG_SPEED تا سرعت روزانه هم در کنار طول دایره‌البروجی برگردانده شود (طول تغییری نمی‌کند)
+CALC_FLAGS = se.FLG_SPEED
+
+# سیاست زمان‌های محلی مبهم/ناموجود (مقادیر مجاز در time_conversion.local_to_jd)
+# پیش‌فرض‌ها همان رفتار قبلی pytz.localize (is_dst=False) هستند: 'later' برای ساعت تکراری و
+# 'previous_offset' برای ساعت ناموجود (پرش ساعت به جلو). 'raise' هر دو را به خطا تبدیل می‌کند.
+AMBIGUOUS_TIME_POLICY = os.environ.get("AMBIGUOUS_TIME_POLICY", "later")
+NONEXISTENT_TIME_POLICY = os.environ.get("NONEXISTENT_TIME_POLICY", "previous_offset")
+
 ASPECT_DEGREES = {
     "Conjunction": 0.0,
     "Sextile": 60.0,
@@ -58,6 +79,26 @@ ASPECT_ORBS = {
     "Opposition": 3.0,
 }
 
+# لیست سیاراتی که باید زوایایشان بررسی شود (مثلاً سیارات شخصی و اجتماعی)
+ASPECT_PLANETS = ["sun", "moon", "mercury", "venus", "mars", "jupiter", "saturn", "true_node", "pluto", "neptune", "uranus"]
+
+# برای گره‌ها و سیارات بیرونی Orb را کمی سخت‌گیرانه‌تر می‌کنیم
+OUTER_ASPECT_BODIES = ["true_node", "pluto", "neptune", "uranus"]
+OUTER_ASPECT_MAX_ORB = 1.5
+
+ASPECT_ENGINE = aspect_engine.AspectEngine(ASPECT_DEGREES, ASPECT_ORBS, OUTER_ASPECT_BODIES, OUTER_ASPECT_MAX_ORB)
+
+# نسخه ساختار خروجی calculate_natal_chart؛ با تغییر فیلدها افزایش می‌یابد تا کش‌های ذخیره‌شده قدیمی استفاده نشوند
+CHART_SCHEMA_VERSION = 3
+
+# نام انگلیسی برج‌ها به ترتیب (ایندکس 0 = حمل)؛ عنصر = ایندکس % 4 و کیفیت = ایندکس % 3
+SIGN_NAMES = ['ARIES', 'TAURUS', 'GEMINI', 'CANCER', 'LEO', 'VIRGO', 'LIBRA', 'SCORPIO', 'SAGITTARIUS', 'CAPRICORN', 'AQUARIUS', 'PISCES']
+ELEMENT_NAMES = ['Fire', 'Earth', 'Air', 'Water']
+QUALITY_NAMES = ['Cardinal', 'Fixed', 'Mutable']
+
+# اجسامی که در شمارش عناصر و کیفیت‌ها (summary) حساب می‌شوند (گره شمالی سیاره نیست)
+SUMMARY_BODIES = ["sun", "moon", "mercury", "venus", "mars", "jupiter", "saturn", "uranus", "neptune", "pluto"]
+
 
 # --- [توابع محاسباتی] ---
 
@@ -66,76 +107,221 @@ def get_degree_diff(deg1: float, deg2: float) -> float:
     diff = abs(deg1 - deg2)
     return min(diff, 360 - diff)
 
-def calculate_aspects(planets: Dict[str, Any]) -> List[Dict[str, Any]]:
-    """محاسبه زوایای اصلی بین سیارات با Orb مشخص."""
-    aspects = []
-    
-    # لیست سیاراتی که باید زوایایشان بررسی شود (مثلاً سیارات شخصی و اجتماعی)
-    aspect_planets = ["sun", "moon", "mercury", "venus", "mars", "jupiter", "saturn", "true_node", "pluto", "neptune", "uranus"]
-    
+def calculate_aspects(planets: Dict[str, Any], top_k: Optional[int] = 5) -> List[Dict[str, Any]]:
+    """
+    محاسبه زوایای اصلی بین سیارات با Orb مشخص (موتور ماتریسی aspect_engine).
+    به طور پیش‌فرض فقط 5 زاویه برتر (تنگ‌ترین Orb) برگردانده می‌شود؛ top_k=None یعنی همه زوایا.
+    """
     # فیلتر کردن برای اطمینان از وجود درجه و حذف سیارات مجهول
-    planet_items = [(name, data['degree']) for name, data in planets.items() if name in aspect_planets and 'degree' in data]
-    
-    # از هر سیاره به سیارات بعدی (جلوگیری از تکرار و مقایسه با خود)
-    for i in range(len(planet_items)):
-        p1_name, p1_deg = planet_items[i]
-        for j in range(i + 1, len(planet_items)):
-            p2_name, p2_deg = planet_items[j]
-            
-            for aspect_name, aspect_degree in ASPECT_DEGREES.items():
-                
-                degree_diff = get_degree_diff(p1_deg, p2_deg)
-                orb = abs(degree_diff - aspect_degree)
-                max_orb = ASPECT_ORBS.get(aspect_name, 1.0) # پیش‌فرض 1.0 برای احتیاط
-                
-                # برای گره‌ها و سیارات بیرونی Orb را کمی سخت‌گیرانه‌تر می‌کنیم
-                if p1_name in ["true_node", "pluto", "neptune", "uranus"] or p2_name in ["true_node", "pluto", "neptune", "uranus"]:
-                    if max_orb > 1.5:
-                        max_orb = 1.5
-                
-                if orb <= max_orb:
-                    aspects.append({
-                        "p1": p1_name.replace("_", " ").title(),
-                        "p2": p2_name.replace("_", " ").title(),
-                        "aspect": aspect_name,
-                        "orb": orb,
-                        "p1_deg": p1_deg,
-                        "p2_deg": p2_deg
-                    })
-                    
-    # مرتب‌سازی بر اساس Orb (تنگ‌ترین زوایا ابتدا)
-    aspects.sort(key=lambda x: x['orb'])
-    
-    # بازگشت تنها 5 زاویه برتر
-    return aspects[:5]
+    names = [name for name, data in planets.items() if name in ASPECT_PLANETS and 'degree' in data]
+    degrees = [planets[name]['degree'] for name in names]
+    return ASPECT_ENGINE.find(degrees, names, top_k=top_k)
+
+
+def local_to_jd_utc(birth_date_jalali: str, birth_time_str: str, timezone_str: str) -> Tuple[float, datetime.datetime]:
+    """
+    تبدیل تاریخ شمسی و ساعت محلی به زمان جولیان UTC. در صورت ورودی نامعتبر خطا صادر می‌کند.
+    زمان‌های مبهم و ناموجود طبق AMBIGUOUS_TIME_POLICY و NONEXISTENT_TIME_POLICY حل شده و در لاگ ثبت می‌شوند.
+    """
+    jd, status = time_conversion.local_to_jd([birth_date_jalali], [birth_time_str], timezone_str,
+                                             ambiguous=AMBIGUOUS_TIME_POLICY, nonexistent=NONEXISTENT_TIME_POLICY,
+                                             return_status=True)
+    if status[0] != time_conversion.STATUS_OK:
+        logging.warning(f"Local time {birth_date_jalali} {birth_time_str} in {timezone_str} is "
+                        f"{'ambiguous' if status[0] == time_conversion.STATUS_AMBIGUOUS else 'nonexistent'}; resolved by policy.")
+    jd_utc = float(jd[0])
+    if math.isnan(jd_utc):
+        raise ValueError(f"Local time {birth_date_jalali} {birth_time_str} cannot be resolved in {timezone_str}.")
+    return jd_utc, time_conversion.jd_to_utc_datetime(jd_utc)
+
+def normalize_cusps(cusps_raw: Sequence[float]) -> List[float]:
+    """
+    تبدیل خروجی se.houses به لیست 12 تایی کاپس‌ها (ایندکس 0 = خانه 1).
+    نسخه‌های جدید pyswisseph تاپل 12 تایی و نسخه‌های قدیمی 13 تایی (با خانه صفرِ بی‌استفاده) برمی‌گردانند.
+    """
+    if len(cusps_raw) >= 13:
+        return list(cusps_raw[1:13])
+    if len(cusps_raw) < 12:
+        raise IndexError(f"خروجی se.houses ناقص است. طول cusps: {len(cusps_raw)}")
+    return list(cusps_raw[:12])
+
+def part_of_fortune(sun_deg, moon_deg, asc_deg, desc_deg) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    محاسبه سهم سعادت (Part of Fortune) به صورت برداری.
+    ورودی‌ها می‌توانند عدد یا آرایه باشند. بازگشت: (درجه سهم سعادت، تولد روز).
+    """
+    # نرمال سازی
+    asc = np.mod(asc_deg, 360.0)
+    desc = np.mod(desc_deg, 360.0)
+    degree = np.mod(sun_deg, 360.0)
+
+    # خورشید بالای افق (خانه‌های 7 تا 12، یعنی از کاپس 7 تا آسندانت در جهت افزایش درجه) یعنی تولد روز
+    is_day_birth = np.mod(degree - desc, 360.0) < np.mod(asc - desc, 360.0)
+
+    # فرمول روز: Ascendant + Moon - Sun / فرمول شب: Ascendant + Sun - Moon
+    pf_degree = np.where(is_day_birth, asc_deg + moon_deg - sun_deg, asc_deg + sun_deg - moon_deg)
+
+    # نرمال سازی درجه به محدوده 0 تا 360
+    return np.mod(pf_degree, 360.0), is_day_birth
+
+
+def sign_indices(degrees) -> np.ndarray:
+    """ایندکس برج (0 تا 11) برای آرایه‌ای از درجه‌ها."""
+    return (np.floor_divide(np.mod(degrees, 360.0), 30.0)).astype(np.int64) % 12
+
+
+def house_placement(degrees, cusps) -> np.ndarray:
+    """
+    شماره خانه (1 تا 12) برای هر درجه با جستجوی دودویی روی کاپس‌ها.
+    degrees: (..., B) و cusps: (..., 12) با ابعاد پیشین یکسان (یک چارت یا دسته‌ای از چارت‌ها).
+    کاپس‌ها نسبت به کاپس خانه اول چرخانده می‌شوند تا عبور از 360/0 مشکلی ایجاد نکند؛ برای چند چارت،
+    هر ردیف با فاصله 360 درجه جابجا می‌شود تا همه چارت‌ها با یک searchsorted پیدا شوند.
+    """
+    degrees = np.asarray(degrees, dtype=np.float64)
+    cusps = np.asarray(cusps, dtype=np.float64)
+    lead_shape = cusps.shape[:-1]
+    cusps_2d = cusps.reshape(-1, 12)
+    degrees_2d = degrees.reshape(len(cusps_2d), -1)
+
+    first = cusps_2d[:, :1]
+    cusp_offsets = np.mod(cusps_2d - first, 360.0)
+    body_offsets = np.mod(degrees_2d - first, 360.0)
+    row_shift = 360.0 * np.arange(len(cusps_2d))[:, None]
+    houses = np.searchsorted((cusp_offsets + row_shift).ravel(), (body_offsets + row_shift).ravel(), side='right')
+    houses = houses.reshape(degrees_2d.shape) - 12 * np.arange(len(cusps_2d))[:, None]
+    return houses.reshape(lead_shape + degrees.shape[len(lead_shape):])
+
+
+def sign_summary(sign_index: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """شمارش عناصر (..., 4) و کیفیت‌ها (..., 3) از ایندکس برج اجسام (..., B)؛ ایندکس منفی (نامعتبر) شمرده نمی‌شود."""
+    sign_index = np.asarray(sign_index)
+    known = (sign_index >= 0)[..., None]
+    elements = ((sign_index[..., None] % 4 == np.arange(4)) & known).sum(axis=-2)
+    qualities = ((sign_index[..., None] % 3 == np.arange(3)) & known).sum(axis=-2)
+    return elements, qualities
+
+
+# ----------------------------------------------------------------------
+# منبع موقعیت سیارات (Position Backend) - قابل تعویض
+# ----------------------------------------------------------------------
+
+class PositionBackend:
+    """
+    رابط منبع موقعیت سیارات. هر backend باید برای آرایه‌ای از JD های UTC و کدهای اجسام
+    (مقادیر PLANETS_MAP) طول دایره‌البروجی و سرعت روزانه را به صورت دو آرایه (N, B) برگرداند.
+    مقادیری که محاسبه نشوند NaN هستند.
+    """
+    name = "base"
+
+    def positions(self, jd_utc: np.ndarray, body_codes: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        raise NotImplementedError
+
+
+class SwissEphemerisBackend(PositionBackend):
+    """backend پیش‌فرض: فراخوانی مستقیم se.calc_ut برای هر JD و جسم."""
+    name = "swisseph"
+
+    def __init__(self, flags: int = CALC_FLAGS):
+        self.flags = flags
+
+    def positions(self, jd_utc: np.ndarray, body_codes: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        jd_utc = np.atleast_1d(np.asarray(jd_utc, dtype=np.float64))
+        lon = np.full((len(jd_utc), len(body_codes)), np.nan)
+        speed = np.full((len(jd_utc), len(body_codes)), np.nan)
+        for i, jd in enumerate(jd_utc):
+            for b, planet_code in enumerate(body_codes):
+                try:
+                    res = se.calc_ut(float(jd), planet_code, self.flags)[0]
+                    lon[i, b] = res[0]
+                    speed[i, b] = res[3]
+                except Exception as e:
+                    logging.error(f"FATAL ERROR: خطا در محاسبه موقعیت جسم {planet_code} برای JD {jd}: {e}", exc_info=True)
+        return lon, speed
+
+
+def _load_chebyshev_backend() -> PositionBackend:
+    import chebyshev_ephemeris
+    return chebyshev_ephemeris.load_or_fit()
+
+# کرنل DE ناسا برای backend 'jplephem' (در مخزن نیست؛ دریافت: python jpl_ephemeris.py download)
+JPL_KERNEL_PATH = os.environ.get("JPL_KERNEL_PATH", os.path.join(EPHE_PATH, "de440s.bsp"))
+
+def _load_jpl_backend() -> PositionBackend:
+    import jpl_ephemeris
+    return jpl_ephemeris.JPLEphemerisBackend()
+
+# نام backend -> تابع سازنده (ماژول‌های اختیاری فقط هنگام اولین استفاده ایمپورت می‌شوند)
+POSITION_BACKEND_FACTORIES = {
+    "swisseph": SwissEphemerisBackend,
+    "chebyshev": _load_chebyshev_backend,
+}
+# 'jplephem' فقط وقتی ثبت می‌شود که فایل کرنل موجود باشد (در غیر این صورت انتخاب آن با ValueError رد می‌شود)
+if os.path.exists(JPL_KERNEL_PATH):
+    POSITION_BACKEND_FACTORIES["jplephem"] = _load_jpl_backend
+_backend_instances: Dict[str, PositionBackend] = {}
+
+_position_backend: PositionBackend = SwissEphemerisBackend()
+
+def register_position_backend(name: str, factory) -> None:
+    """ثبت backend جدید با نام مشخص (factory یک تابع بدون ورودی است که PositionBackend می‌سازد)."""
+    POSITION_BACKEND_FACTORIES[name] = factory
+    _backend_instances.pop(name, None)
+
+def resolve_position_backend(backend: Union[str, PositionBackend, None] = None) -> PositionBackend:
+    """تبدیل نام یا نمونه backend به نمونه؛ None یعنی backend سراسری فعال."""
+    if backend is None:
+        return _position_backend
+    if isinstance(backend, PositionBackend):
+        return backend
+    if backend not in _backend_instances:
+        if backend not in POSITION_BACKEND_FACTORIES:
+            raise ValueError(f"Unknown position backend '{backend}'. Available: {list(POSITION_BACKEND_FACTORIES)}")
+        _backend_instances[backend] = POSITION_BACKEND_FACTORIES[backend]()
+    return _backend_instances[backend]
+
+def get_position_backend() -> PositionBackend:
+    """backend فعال برای محاسبه موقعیت سیارات."""
+    return _position_backend
+
+def set_position_backend(backend: Union[str, PositionBackend]) -> PositionBackend:
+    """تعویض backend سراسری (نام ثبت‌شده یا نمونه، مثلاً 'chebyshev' برای batch و اسکن ترانزیت). backend قبلی را برمی‌گرداند."""
+    global _position_backend
+    previous = _position_backend
+    _position_backend = resolve_position_backend(backend)
+    logging.info(f"Position backend set to '{_position_backend.name}'.")
+    return previous
+
+
+async def setup_ephemeris() -> Dict[str, Any]:
+    """
+    گرم کردن فایل‌های اپمریس بازه EPHE_YEAR_FROM تا EPHE_YEAR_TO (از lifespan در bot_app فراخوانی می‌شود).
+    خواندن فایل‌ها در thread جداگانه انجام می‌شود تا حلقه رویداد مسدود نشود؛ باز کردن فایل‌ها در swisseph
+    در همین thread، چون وضعیت swisseph برای هر thread جداست.
+    """
+    import ephemeris_files
+    if not ephemeris_files.EPHE_WARMUP:
+        return {}
+    start = time.perf_counter()
+    read_bytes = await asyncio.to_thread(ephemeris_files.read_files)
+    probe = ephemeris_files.open_files()
+    logging.info(f"Ephemeris warm-up: {len(probe['files'])} files ({read_bytes / 1e6:.1f} MB) in {(time.perf_counter() - start) * 1000:.1f} ms.")
+    return {"read_bytes": read_bytes, **probe}
 
 
 # ----------------------------------------------------------------------
 # تابع اصلی: محاسبه چارت تولد (به روز شده با Part of Fortune)
 # ----------------------------------------------------------------------
 
-def calculate_natal_chart(birth_date_jalali: str, birth_time_str: str, city_name: str, latitude: Union[float, int], longitude: Union[float, int], timezone_str: str) -> Dict[str, Any]:
+def calculate_natal_chart(birth_date_jalali: str, birth_time_str: str, city_name: str, latitude: Union[float, int], longitude: Union[float, int], timezone_str: str, house_system: bytes = b'P', backend: Union[str, PositionBackend, None] = None, zodiac_flags: int = 0) -> Dict[str, Any]:
     """
     محاسبه چارت تولد نجومی شامل موقعیت سیارات و خانه‌ها بر اساس سیستم پلاسی دوس.
+    backend: نام ('swisseph'، 'jplephem'، 'chebyshev') یا نمونه PositionBackend؛ پیش‌فرض backend سراسری.
+    zodiac_flags: پرچم‌های اضافی swisseph (مثلاً se.FLG_SIDEREAL با آیانامسای تنظیم‌شده در همین thread؛ calc_service.py).
     """
     
     # 1. تبدیل تاریخ شمسی به میلادی و محاسبه زمان جولیان (JD) UTC
     try:
-        j_date = jdatetime.JalaliDate.strptime(birth_date_jalali, '%Y/%m/%d')
-        j_time = datetime.datetime.strptime(birth_time_str, '%H:%M')
-        
-        # FIX: ترکیب تاریخ میلادی با زمان محلی
-        dt_gregorian_date = j_date.to_gregorian()
-        dt_local = datetime.datetime.combine(dt_gregorian_date, j_time.time())
-
-        # اعمال منطقه زمانی
-        local_tz = pytz.timezone(timezone_str)
-        dt_local = local_tz.localize(dt_local)
-        dt_utc = dt_local.astimezone(pytz.utc)
-
-        # محاسبه JD UTC
-        jd_utc = se.julday(dt_utc.year, dt_utc.month, dt_utc.day, dt_utc.hour + dt_utc.minute / 60.0 + dt_utc.second / 3600.0)
-        
+        jd_utc, dt_utc = local_to_jd_utc(birth_date_jalali, birth_time_str, timezone_str)
     except Exception as e:
         logging.error(f"FATAL ERROR: خطا در تبدیل تاریخ و زمان: {e}", exc_info=True)
         return {"error": f"❌ خطای تبدیل زمان: {str(e)}"}
@@ -158,52 +344,25 @@ def calculate_natal_chart(birth_date_jalali: str, birth_time_str: str, city_name
         "arabic_parts": {}
     }
 
-    # 2. محاسبه موقعیت سیارات
-    for planet_name, planet_code in PLANETS_MAP.items():
-        try:
-            # استفاده از se.calc_ut. Flag 0 برای استفاده از فایل‌های اپمریس تنظیم شده (اگر موفق باشد)
-            # در غیر این صورت از داده‌های داخلی (با دقت پایین‌تر) استفاده می‌کند، که با لاگ رفع شد.
-            res = se.calc_ut(jd_utc, planet_code, 0) 
-            lon_deg = res[0][0]
-            chart_data['planets'][planet_name] = {
-                "degree": lon_deg,
-                "status": "N/A (Calculated)", 
-            }
-        except Exception as e:
-            logging.error(f"FATAL ERROR: خطا در محاسبه موقعیت سیاره {planet_name}: {e}", exc_info=True)
-            chart_data['planets'][planet_name] = {"error": f"❌ خطا در محاسبه: {str(e)}"}
-            
-    # 3. محاسبه خانه ها (Houses)
-    try:
-        # P = Placidus (سیستم پیش‌فرض)
-        house_system = b'P' 
-        
-        # se.houses برای محاسبه cusps و ascmc (ascendant و midheaven)
-        cusps_raw, ascmc = se.houses(jd_utc, latitude, longitude, house_system)
-        
-        if len(cusps_raw) < 12 or len(ascmc) < 2:
-             raise IndexError(f"خروجی se.houses ناقص است. طول cusps: {len(cusps_raw)}")
+    # 2 و 3. موقعیت سیارات (از طریق backend فعال؛ پیش‌فرض se.calc_ut با فایل‌های اپمریس) و خانه‌ها
+    lon_row, speed_row, cusps, ascmc, house_error = compute_chart_arrays(jd_utc, latitude, longitude, house_system, backend, zodiac_flags)
+    for b, planet_name in enumerate(BODY_NAMES):
+        if np.isnan(lon_row[b]):
+            chart_data['planets'][planet_name] = {"error": "❌ خطا در محاسبه موقعیت سیاره"}
+            continue
+        chart_data['planets'][planet_name] = {
+            "degree": float(lon_row[b]),
+            "speed": float(speed_row[b]),
+            "status": "N/A (Calculated)", 
+        }
 
-        chart_data['houses']['ascendant'] = ascmc[0]
-        chart_data['houses']['midheaven'] = ascmc[1]
-        
-        # ایندکس گذاری امن برای cusps
-        cusps_dict = {}
-        for i in range(1, 13):
-            # برای Placidus، کاپس‌ها از خانه 1 شروع می‌شوند. 
-            index_to_use = i 
-            if index_to_use >= 0 and index_to_use < len(cusps_raw):
-                cusps_dict[i] = cusps_raw[index_to_use]
-            else:
-                cusps_dict[i] = 0.0 
-
-        chart_data['houses']['cusps'] = cusps_dict
-        chart_data['houses']['error'] = None 
-        
-    except Exception as e:
-        err_msg = f"FATAL ERROR: خطا در محاسبه خانه‌ها و آسندانت: {e}"
-        logging.error(err_msg, exc_info=True)
-        chart_data['houses']['error'] = f"❌ خطای محاسبه خانه‌ها: {str(e)}"
+    if house_error is None:
+        chart_data['houses']['ascendant'] = float(ascmc[0])
+        chart_data['houses']['midheaven'] = float(ascmc[1])
+        # کلید 1 = کاپس خانه اول
+        chart_data['houses']['cusps'] = {i + 1: float(cusp) for i, cusp in enumerate(cusps)}
+    else:
+        chart_data['houses']['error'] = house_error
     
     # 4. محاسبه زوایا (Aspects)
     chart_data['aspects'] = calculate_aspects(chart_data['planets'])
@@ -216,40 +375,9 @@ def calculate_natal_chart(birth_date_jalali: str, birth_time_str: str, city_name
         asc_deg = chart_data['houses']['ascendant']
         desc_deg = chart_data['houses']['cusps'].get(7, 0.0) # درجه کاپس خانه 7
         
-        # تعیین تولد روز/شب (Day/Night Birth)
-        def get_house_of_degree_simple(degree: float, asc: float, desc: float) -> int:
-            """تعیین اینکه درجه در نیمکره بالا (7-12) یا پایین (1-6) است."""
-            # نرمال سازی
-            asc = asc % 360
-            desc = desc % 360
-            degree = degree % 360
-
-            if asc > desc: # محور افق در 360/0 قطع نشده است
-                 if asc >= degree > desc:
-                     return 1 # خانه های 1 تا 6 (زیر افق)
-                 else:
-                     return 7 # خانه های 7 تا 12 (بالای افق)
-            else: # محور افق از 360/0 عبور کرده است
-                if degree >= asc and degree < desc:
-                     return 7 # خانه های 7 تا 12 (بالای افق)
-                else:
-                     return 1 # خانه های 1 تا 6 (زیر افق)
-        
-        sun_house_zone = get_house_of_degree_simple(sun_deg, asc_deg, desc_deg)
-        
-        # اگر خورشید در نیمکره بالای افق (خانه 7 تا 12) باشد، روز است.
-        is_day_birth = (sun_house_zone == 7) 
-        
-        
-        if is_day_birth:
-            # فرمول روز: Ascendant + Moon - Sun
-            pf_degree = asc_deg + moon_deg - sun_deg
-        else:
-            # فرمول شب: Ascendant + Sun - Moon
-            pf_degree = asc_deg + sun_deg - moon_deg
-
-        # نرمال سازی درجه به محدوده 0 تا 360
-        pf_degree = pf_degree % 360
+        pf_degree, is_day_birth = part_of_fortune(sun_deg, moon_deg, asc_deg, desc_deg)
+        pf_degree = float(pf_degree)
+        is_day_birth = bool(is_day_birth)
 
         chart_data['arabic_parts']['part_of_fortune'] = {
             "degree": pf_degree,
@@ -258,6 +386,221 @@ def calculate_natal_chart(birth_date_jalali: str, birth_time_str: str, city_name
     except Exception as e:
          logging.error(f"خطا در محاسبه Part of Fortune: {e}")
          chart_data['arabic_parts']['part_of_fortune'] = {"error": "❌ خطا در محاسبه سهم سعادت"}
-    
+
+    # 6. برج، خانه و خلاصه عناصر/کیفیت‌ها برای همه نقاط در یک مرحله برداری
+    _annotate_placements(chart_data)
+
+    # 7. اتصال سیارات و زوایا با ستارگان ثابت (ایندکس مرتب کاتالوگ sefstars.txt)
+    ayanamsa = 0.0
+    if zodiac_flags & se.FLG_SIDEREAL:
+        ayanamsa = se.get_ayanamsa_ut(jd_utc)
+        chart_data['ayanamsa'] = ayanamsa
+    chart_data['fixed_stars'] = fixed_star_conjunctions(jd_utc, fixed_star_points(chart_data['planets'], chart_data['houses']), ayanamsa)
     
     return chart_data
+
+
+def fixed_star_points(planets: Dict[str, Any], houses: Dict[str, Any]) -> Dict[str, float]:
+    """نقاطی که اتصالشان با ستارگان ثابت بررسی می‌شود: سیارات محاسبه‌شده و در صورت وجود خانه‌ها، آسندانت و میدهون."""
+    points = {name: data['degree'] for name, data in planets.items() if 'degree' in data}
+    if not houses.get('error'):
+        points['ascendant'] = houses['ascendant']
+        points['midheaven'] = houses['midheaven']
+    return points
+
+
+def fixed_star_conjunctions(jd_utc: float, points: Dict[str, float], ayanamsa: float = 0.0) -> List[Dict[str, Any]]:
+    """
+    اتصال نقاط با ستارگان ثابت؛ در صورت خطا فهرست خالی (ستارگان ثابت بخش اختیاری چارت هستند).
+    ayanamsa: برای چارت نجومی (sidereal)؛ ایندکس ستارگان استوایی است، پس نقاط با افزودن آیانامسا مقایسه
+    و درجه ستاره‌ها با کم کردن آن به زودیاک چارت برگردانده می‌شوند.
+    """
+    try:
+        if not ayanamsa:
+            return fixed_stars.find_conjunctions(jd_utc, points)
+        tropical = {name: (degree + ayanamsa) % 360.0 for name, degree in points.items()}
+        hits = fixed_stars.find_conjunctions(jd_utc, tropical)
+        for hit in hits:
+            hit['star_degree'] = (hit['star_degree'] - ayanamsa) % 360.0
+        return hits
+    except Exception as e:
+        logging.error(f"خطا در محاسبه اتصال ستارگان ثابت: {e}")
+        return []
+
+
+def compute_chart_arrays(jd_utc: float, latitude: float, longitude: float, house_system: bytes = b'P',
+                         backend: Union[str, PositionBackend, None] = None,
+                         zodiac_flags: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, Optional[str]]:
+    """
+    محاسبه خام یک چارت: (طول‌ها (B,)، سرعت‌ها (B,)، کاپس‌ها (12,)، [آسندانت، میدهون]، پیام خطای خانه‌ها یا None).
+    جسمی که محاسبه‌اش شکست خورده NaN است؛ در صورت خطای خانه‌ها کاپس‌ها و زوایا NaN هستند.
+    zodiac_flags فقط با backend swisseph معنا دارد (سایر backendها استوایی و زمین‌مرکز هستند).
+    """
+    position_backend = resolve_position_backend(backend)
+    if zodiac_flags:
+        if not isinstance(position_backend, SwissEphemerisBackend):
+            raise ValueError(f"zodiac_flags need the swisseph backend, not '{position_backend.name}'.")
+        position_backend = SwissEphemerisBackend(position_backend.flags | zodiac_flags)
+    lon_row, speed_row = position_backend.positions(np.array([jd_utc]), BODY_CODES)
+    cusps, ascmc, house_error = compute_houses(jd_utc, latitude, longitude, house_system, zodiac_flags)
+    return lon_row[0], speed_row[0], cusps, ascmc, house_error
+
+
+def compute_houses(jd_utc: float, latitude: float, longitude: float, house_system: bytes = b'P',
+                   zodiac_flags: int = 0) -> Tuple[np.ndarray, np.ndarray, Optional[str]]:
+    """کاپس‌ها (12,)، [آسندانت، میدهون] و پیام خطای خانه‌ها یا None (در صورت خطا کاپس‌ها و زوایا NaN)."""
+    cusps = np.full(12, np.nan)
+    ascmc = np.full(2, np.nan)
+    house_error = None
+    try:
+        # house_system پیش‌فرض: P = Placidus
+        # se.houses_ex برای محاسبه cusps و ascmc (ascendant و midheaven)؛ با FLG_SIDEREAL خانه‌ها هم نجومی می‌شوند
+        cusps_raw, ascmc_raw = se.houses_ex(jd_utc, latitude, longitude, house_system, zodiac_flags & se.FLG_SIDEREAL)
+        if len(ascmc_raw) < 2:
+            raise IndexError(f"خروجی se.houses ناقص است. طول ascmc: {len(ascmc_raw)}")
+        cusps[:] = normalize_cusps(cusps_raw)
+        ascmc[:] = ascmc_raw[:2]
+    except Exception as e:
+        logging.error(f"FATAL ERROR: خطا در محاسبه خانه‌ها و آسندانت: {e}", exc_info=True)
+        cusps[:] = np.nan
+        ascmc[:] = np.nan
+        house_error = f"❌ خطای محاسبه خانه‌ها: {str(e)}"
+    return cusps, ascmc, house_error
+
+
+def _annotate_placements(chart_data: Dict[str, Any]) -> None:
+    """
+    افزودن 'sign' (نام انگلیسی با حروف بزرگ)، 'sign_index'، 'degree_in_sign' و 'house' به هر سیاره و سهم سعادت،
+    'ascendant_sign' و 'midheaven_sign' به خانه‌ها، و 'summary' (شمارش عناصر و کیفیت‌ها) به چارت.
+    """
+    points = [data for data in chart_data['planets'].values() if 'degree' in data]
+    pof = chart_data['arabic_parts'].get('part_of_fortune', {})
+    if 'degree' in pof:
+        points.append(pof)
+    houses = chart_data['houses']
+    has_houses = not houses.get('error')
+
+    degrees = np.array([p['degree'] for p in points], dtype=np.float64)
+    signs = sign_indices(degrees)
+    in_sign = np.mod(degrees, 30.0)
+    if has_houses:
+        cusps = np.array([houses['cusps'][i] for i in range(1, 13)], dtype=np.float64)
+        house_numbers = house_placement(degrees, cusps).tolist()
+        angle_signs = sign_indices([houses['ascendant'], houses['midheaven']]).tolist()
+        houses['ascendant_sign'] = SIGN_NAMES[angle_signs[0]]
+        houses['midheaven_sign'] = SIGN_NAMES[angle_signs[1]]
+    else:
+        house_numbers = [None] * len(points)
+
+    for point, sign, deg, house in zip(points, signs.tolist(), in_sign.tolist(), house_numbers):
+        point['sign'] = SIGN_NAMES[sign]
+        point['sign_index'] = sign
+        point['degree_in_sign'] = deg
+        point['house'] = house
+
+    summary_signs = [chart_data['planets'][name]['sign_index'] for name in SUMMARY_BODIES if 'sign_index' in chart_data['planets'].get(name, {})]
+    elements, qualities = sign_summary(np.array(summary_signs, dtype=np.int64))
+    chart_data['summary'] = {
+        'elements': dict(zip(ELEMENT_NAMES, elements.tolist())),
+        'qualities': dict(zip(QUALITY_NAMES, qualities.tolist())),
+    }
+
+
+# ----------------------------------------------------------------------
+# محاسبه دسته‌ای چارت‌ها (Batch) - خروجی به صورت آرایه‌های NumPy
+# ----------------------------------------------------------------------
+
+def calculate_natal_charts_batch(birth_dates_jalali: Sequence[str], birth_times: Sequence[str], latitudes: Sequence[float], longitudes: Sequence[float], timezones: Sequence[str], house_system: bytes = b'P', backend: Union[str, PositionBackend, None] = None) -> Dict[str, np.ndarray]:
+    """
+    محاسبه دسته‌ای چارت تولد برای تعداد زیادی تولد (مثلاً بازمحاسبه شبانه چارت‌های ذخیره‌شده).
+
+    خروجی به صورت ساختار آرایه‌ها (struct-of-arrays) است و اعداد آن با calculate_natal_chart یکسان است:
+      - 'jd_utc': (N,)  - 'longitudes' و 'speeds': (N, 11) به ترتیب BODY_NAMES
+      - 'cusps': (N, 12)  - 'ascendant' و 'midheaven': (N,)
+      - 'part_of_fortune': (N,)  - 'is_day_birth': (N,) بولی
+      - 'sign_index' و 'house': (N, 11) صحیح (برای ردیف‌های نامعتبر -1 و 0)
+      - 'element_counts': (N, 4) به ترتیب ELEMENT_NAMES  - 'quality_counts': (N, 3) به ترتیب QUALITY_NAMES
+      - 'valid': (N,) بولی؛ ردیف‌هایی که تبدیل زمان یا محاسبه‌شان شکست خورده NaN هستند.
+    لحظه‌های تکراری (مثلاً ساعت پیش‌فرض 12:00) فقط یک بار محاسبه می‌شوند.
+    """
+    n = len(birth_dates_jalali)
+    if not (len(birth_times) == len(latitudes) == len(longitudes) == len(timezones) == n):
+        raise ValueError("طول تمام ورودی‌های calculate_natal_charts_batch باید برابر باشد.")
+
+    lats = np.asarray(latitudes, dtype=np.float64)
+    lons = np.asarray(longitudes, dtype=np.float64)
+    n_bodies = len(BODY_CODES)
+
+    jd_utc = np.full(n, np.nan)
+    longitudes_out = np.full((n, n_bodies), np.nan)
+    speeds_out = np.full((n, n_bodies), np.nan)
+    cusps_out = np.full((n, 12), np.nan)
+    asc_out = np.full(n, np.nan)
+    mc_out = np.full(n, np.nan)
+
+    # 1. تبدیل برداری زمان محلی به JD UTC
+    jd_utc, time_status = time_conversion.local_to_jd(birth_dates_jalali, birth_times, timezones,
+                                                      ambiguous=AMBIGUOUS_TIME_POLICY, nonexistent=NONEXISTENT_TIME_POLICY,
+                                                      invalid='nan', return_status=True)
+    for i in np.nonzero(time_status != time_conversion.STATUS_OK)[0]:
+        logging.warning(f"خطا یا ابهام در تبدیل تاریخ و زمان ردیف {i} (status={time_status[i]}).")
+
+    valid = ~np.isnan(jd_utc)
+
+    # 2. موقعیت سیارات: فقط برای JD های یکتا (موقعیت‌ها به مکان وابسته نیستند)
+    unique_jd, inverse = np.unique(jd_utc[valid], return_inverse=True)
+    unique_lon, unique_speed = resolve_position_backend(backend).positions(unique_jd, BODY_CODES)
+    longitudes_out[valid] = unique_lon[inverse]
+    speeds_out[valid] = unique_speed[inverse]
+
+    # 3. خانه‌ها: برای ترکیب‌های یکتای (JD، عرض، طول)
+    moments = np.column_stack((jd_utc, lats, lons))[valid]
+    unique_moments, inverse = np.unique(moments, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    unique_cusps = np.full((len(unique_moments), 12), np.nan)
+    unique_ascmc = np.full((len(unique_moments), 2), np.nan)
+    for u, (jd, lat, lon) in enumerate(unique_moments):
+        try:
+            cusps_raw, ascmc = se.houses(jd, lat, lon, house_system)
+            unique_cusps[u] = normalize_cusps(cusps_raw)
+            unique_ascmc[u] = ascmc[:2]
+        except Exception as e:
+            logging.error(f"خطا در محاسبه خانه‌ها برای JD {jd} ({lat}, {lon}): {e}")
+    cusps_out[valid] = unique_cusps[inverse]
+    asc_out[valid] = unique_ascmc[inverse, 0]
+    mc_out[valid] = unique_ascmc[inverse, 1]
+
+    # 4. سهم سعادت (برداری روی همه چارت‌ها)
+    with np.errstate(invalid='ignore'):
+        pf_degree, is_day_birth = part_of_fortune(
+            longitudes_out[:, BODY_NAMES.index('sun')],
+            longitudes_out[:, BODY_NAMES.index('moon')],
+            asc_out,
+            cusps_out[:, 6],
+        )
+
+    valid &= ~np.isnan(longitudes_out).any(axis=1) & ~np.isnan(cusps_out).any(axis=1)
+
+    # 5. برج، خانه (0 برای ردیف‌های نامعتبر) و خلاصه عناصر/کیفیت‌ها برای همه چارت‌ها
+    sign_out = np.where(valid[:, None], sign_indices(np.nan_to_num(longitudes_out)), -1)
+    house_out = np.zeros((n, n_bodies), dtype=np.int64)
+    if valid.any():
+        house_out[valid] = house_placement(longitudes_out[valid], cusps_out[valid])
+    summary_columns = [BODY_NAMES.index(name) for name in SUMMARY_BODIES]
+    element_counts, quality_counts = sign_summary(sign_out[:, summary_columns])
+
+    return {
+        "jd_utc": jd_utc,
+        "longitudes": longitudes_out,
+        "speeds": speeds_out,
+        "cusps": cusps_out,
+        "ascendant": asc_out,
+        "midheaven": mc_out,
+        "part_of_fortune": pf_degree,
+        "is_day_birth": is_day_birth & valid,
+        "sign_index": sign_out,
+        "house": house_out,
+        "element_counts": element_counts,
+        "quality_counts": quality_counts,
+        "valid": valid,
+    }
@@ -1,4 +1,4 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import math
 
 # ====================================================================
@@ -12,7 +12,8 @@ PLANETS = ['sun', 'moon', 'mercury', 'venus', 'mars', 'jupiter', 'saturn', 'uran
 PLANETS_MAP = {
     'SUN': 'خورشید', 'MOON': 'ماه', 'MERCURY': 'عطارد', 'VENUS': 'زهره', 'MARS': 'مریخ',
     'JUPITER': 'مشتری', 'SATURN': 'زحل', 'URANUS': 'اورانوس', 'NEPTUNE': 'نپتون', 'PLUTO': 'پلوتون',
-    'TRUE_NODE': 'گره شمالی', 'PART_OF_FORTUNE': 'سهم سعادت'
+    'TRUE_NODE': 'گره شمالی', 'PART_OF_FORTUNE': 'سهم سعادت',
+    'ASCENDANT': 'طالع', 'MIDHEAVEN': 'میانه آسمان'
 }
 
 # نگاشت نام‌های برج‌های فلکی
@@ -35,6 +36,9 @@ ASPECTS_MAP = {
 ELEMENT_MAP = {'Fire': 'آتش', 'Earth': 'خاک', 'Air': 'هوا', 'Water': 'آب'}
 QUALITY_MAP = {'Cardinal': 'بنیادی', 'Fixed': 'ثابت', 'Mutable': 'متغیر'}
 
+# حداکثر تعداد اتصال ستارگان ثابت (نزدیک‌ترین‌ها) که در متن تفسیر آورده می‌شوند
+FIXED_STAR_MAX_LINES = 5
+
 # ====================================================================
 # توابع کمکی
 # ====================================================================
@@ -231,6 +235,109 @@ RULER_IN_HOUSE_INTERPRETATIONS: Dict[int, Dict[int, str]] = {
     },
 }
 
+# 6. تفسیر اتصال با ستارگان ثابت (کلید: نام ستاره در sefstars.txt)
+FIXED_STAR_INTERPRETATIONS: Dict[str, str] = {
+    'Regulus': 'قلب الاسد (Regulus): بلندپروازی، شهرت و موفقیت؛ به شرط پرهیز از انتقام‌جویی و غرور.',
+    'Spica': 'سنبله (Spica): استعداد، موهبت و حمایت؛ از سعدترین ستارگان ثابت.',
+    'Algol': 'رأس الغول (Algol): شدت عاطفی و نیروی مهارنشده؛ نیاز به مهار خشم و هدایت انرژی.',
+    'Aldebaran': 'دبران (Aldebaran): صداقت، شجاعت و موفقیت از راه درستکاری.',
+    'Antares': 'قلب العقرب (Antares): جسارت و شور؛ تمایل به شتاب‌زدگی و درگیری.',
+    'Fomalhaut': 'فم الحوت (Fomalhaut): آرمان‌گرایی، هنر و شهرت معنوی.',
+    'Sirius': 'شعرای یمانی (Sirius): جاه‌طلبی، شهرت و مسئولیت‌های بزرگ.',
+    'Arcturus': 'سماک رامح (Arcturus): راهبری، پیشرفت از راه کار و سفر.',
+    'Vega': 'نسر واقع (Vega): جذابیت، هنر و موسیقی.',
+    'Capella': 'عیوق (Capella): کنجکاوی، علم‌آموزی و آزادی‌خواهی.',
+    'Pollux': 'رأس التوأم المؤخر (Pollux): جسارت و رقابت‌جویی.',
+    'Betelgeuse': 'ابط الجوزاء (Betelgeuse): موفقیت پایدار و افتخار.',
+    'Rigel': 'رجل الجبار (Rigel): دانش‌دوستی، آموزش و ابتکار.',
+    'Procyon': 'شعرای شامی (Procyon): فعالیت و موفقیت سریع اما ناپایدار.',
+    'Altair': 'نسر طائر (Altair): شجاعت، بلندپروازی و اعتماد به نفس.',
+    'Deneb': 'ذنب الدجاجه (Deneb): ذهن تیزبین و استعداد هنری.',
+    'Achernar': 'آخر النهر (Achernar): موفقیت در امور عمومی و مذهبی.',
+    'Canopus': 'سهیل (Canopus): سفر، راهنمایی دیگران و دانش.',
+}
+
+
+# ====================================================================
+# متن تک‌تک بخش‌ها (مشترک بین interpret_natal_chart و interpretation_fragments)
+# ====================================================================
+
+INNER_PLANETS = ['sun', 'moon', 'mercury', 'venus', 'mars']
+OUTER_PLANETS = ['jupiter', 'saturn', 'uranus', 'neptune', 'pluto', 'true_node']
+
+SECTION_TITLES = {
+    'ascendant': "\n*--- طالع (Ascendant) و هویت ظاهری ---*",
+    'inner': "\n*--- تفسیر سیارات اصلی در برج و خانه ---*",
+    'outer': "\n*--- تفسیر سیارات بیرونی و گره‌ها ---*",
+    'aspects': "\n*--- زوایای اصلی (Aspects) ---*",
+    'fixed_stars': "\n*--- ستارگان ثابت ---*",
+    'summary': "\n*--- توزیع عناصر و کیفیت‌ها ---*",
+}
+
+
+def header_text(city_name: str, date_str_fa: str, time_str_fa: str) -> str:
+    header = f"⭐️ **تفسیر چارت تولد** ⭐️\n"
+    header += f"**محل تولد:** {city_name} | **تاریخ:** {date_str_fa} | **زمان:** {time_str_fa}\n\n"
+    return header
+
+
+def planet_fa(planet_name: str) -> str:
+    return PLANETS_MAP.get(planet_name.upper(), planet_name.title())
+
+
+def ascendant_text(asc_sign: Optional[str]) -> str:
+    """خط طالع؛ asc_sign نام انگلیسی برج (ascendant_sign) یا None اگر خانه‌ها محاسبه نشده باشند."""
+    if asc_sign is not None:
+        asc_sign_fa = SIGNS_MAP[asc_sign]
+        # از نام فارسی برای جستجو در ASCENDANT_INTERPRETATIONS استفاده می‌کنیم.
+        asc_interp = ASCENDANT_INTERPRETATIONS.get(asc_sign_fa, f"**طالع در {asc_sign_fa}:** تفسیر موجود نیست.")
+    else:
+        # اگر خانه‌ها محاسبه نشده باشند.
+        asc_interp = "**طالع نامشخص:** داده‌های چارت، درجه طالع (Ascendant) را شامل نمی‌شوند."
+    return f"**طالع:** {asc_interp}"
+
+
+def planet_sign_text(planet_name: str, p_sign: str) -> str:
+    p_fa = planet_fa(planet_name)
+    if planet_name == 'true_node':
+        default = f"*{p_fa} در {SIGNS_MAP.get(p_sign, p_sign)}:* مسیر تکاملی روح شما در این حوزه است."
+    else:
+        default = f"*{p_fa} در {SIGNS_MAP.get(p_sign, p_sign)}:* تفسیر موجود نیست."
+    return PLANET_IN_SIGN_INTERPRETATIONS.get(planet_name, {}).get(p_sign, default)
+
+
+def planet_house_text(planet_name: str, p_house: Optional[int]) -> str:
+    p_fa = planet_fa(planet_name)
+    if planet_name in INNER_PLANETS:
+        default = f"*{p_fa} در خانه {p_house}:* فعالیت این سیاره در این حوزه زندگی متمرکز است."
+    else:
+        default = f"*{p_fa} در خانه {p_house}:* تأثیر این سیاره نسلی/اجتماعی بر این حوزه زندگی است."
+    return PLANET_IN_HOUSE_INTERPRETATIONS.get(p_house, {}).get(planet_name, default)
+
+
+def aspect_line_parts(aspect_name: str, p1: str, p2: str) -> Tuple[str, str]:
+    """خط زاویه بدون Orb: (پیش از عدد Orb، پس از آن)؛ p1 و p2 با حروف بزرگ (مانند 'TRUE_NODE')."""
+    interp = ASPECT_INTERPRETATIONS.get(aspect_name, {}).get(f"{p1}_{p2}")
+    if not interp:
+        interp = ASPECT_INTERPRETATIONS.get(aspect_name, {}).get(f"{p2}_{p1}")
+    if interp:
+        return f"  • {interp} (اُرب: ", "°)"
+    aspect_fa = ASPECTS_MAP.get(aspect_name.upper(), aspect_name)
+    p1_fa = PLANETS_MAP.get(p1, p1.title())
+    p2_fa = PLANETS_MAP.get(p2, p2.title())
+    return f"  • {aspect_fa} بین {p1_fa} و {p2_fa} (اُرب: ", "°): این دو نیرو در حال تعامل هستند."
+
+
+def fixed_star_line_parts(point: str, star: str) -> Tuple[str, str]:
+    """خط اتصال ستاره ثابت بدون Orb: (پیش از عدد Orb، پس از آن)."""
+    point_fa = planet_fa(point)
+    star_interp = FIXED_STAR_INTERPRETATIONS.get(star, f"{star}: تأثیر این ستاره بر {point_fa} برجسته است.")
+    return f"  • {point_fa} در اتصال با {star_interp} (اُرب: ", "°)"
+
+
+def aspect_names(aspect: Dict[str, Any]) -> Tuple[str, str]:
+    return aspect['p1'].upper().replace(" ", "_"), aspect['p2'].upper().replace(" ", "_")
+
 
 # ====================================================================
 # تابع اصلی تولید تفسیر
@@ -239,6 +346,7 @@ RULER_IN_HOUSE_INTERPRETATIONS: Dict[int, Dict[int, str]] = {
 def interpret_natal_chart(chart_data: Dict[str, Any]) -> str:
     """
     داده‌های چارت تولد را گرفته و یک تفسیر جامع فارسی تولید می‌کند.
+    (نسخه فراردهی‌شده برای MarkdownV2 بدون ساخت دوباره رشته‌ها: interpretation_fragments.render_escaped)
     """
     
     interpretations = []
@@ -248,105 +356,59 @@ def interpret_natal_chart(chart_data: Dict[str, Any]) -> str:
     date_str_fa = chart_data.get('birth_date_jalali', 'تاریخ نامشخص')
     time_str_fa = chart_data.get('birth_time_str', 'زمان نامشخص')
     
-    header = f"⭐️ **تفسیر چارت تولد** ⭐️\n"
-    header += f"**محل تولد:** {city_name} | **تاریخ:** {date_str_fa} | **زمان:** {time_str_fa}\n\n"
+    header = header_text(city_name, date_str_fa, time_str_fa)
     
     
     # 2. تفسیر Ascendant (طالع - شخصیت ظاهری)
-    interpretations.append("\n*--- طالع (Ascendant) و هویت ظاهری ---*")
+    interpretations.append(SECTION_TITLES['ascendant'])
     
-    # 💥💥💥 رفع خطای 'asc_sign' با دسترسی ایمن به درجه (درجه طالع) 💥💥💥
-    asc_degree = chart_data.get('houses', {}).get('asc') 
-    
-    if asc_degree is None:
-        # کلیدهای محتمل دیگر را چک می‌کنیم.
-        asc_degree = chart_data.get('houses', {}).get('Ascendant') 
-        if asc_degree is None:
-             asc_degree = chart_data.get('houses', {}).get('ASC')
-        
-    if asc_degree is not None:
-        # درجه پیدا شد، نام برج (به فارسی) را محاسبه می‌کنیم.
-        asc_sign_fa = get_sign_name(asc_degree) 
-        # از نام فارسی برای جستجو در ASCENDANT_INTERPRETATIONS استفاده می‌کنیم.
-        asc_interp = ASCENDANT_INTERPRETATIONS.get(asc_sign_fa, f"**طالع در {asc_sign_fa}:** تفسیر موجود نیست.")
-    else:
-        # اگر هیچ کلیدی پیدا نشد.
-        asc_interp = "**طالع نامشخص:** داده‌های چارت، درجه طالع (Ascendant) را شامل نمی‌شوند."
-        
-    # افزودن تفسیر طالع
-    interpretations.append(f"**طالع:** {asc_interp}")
+    # برج طالع در هسته (astrology_core) محاسبه شده است؛ اینجا فقط جستجو در جدول‌ها انجام می‌شود
+    interpretations.append(ascendant_text(chart_data.get('houses', {}).get('ascendant_sign')))
 
     # 3. تفسیر سیارات اصلی در برج و خانه
-    interpretations.append("\n*--- تفسیر سیارات اصلی در برج و خانه ---*")
+    interpretations.append(SECTION_TITLES['inner'])
     
-    for planet_name in ['sun', 'moon', 'mercury', 'venus', 'mars']:
+    for planet_name in INNER_PLANETS:
         if planet_name in chart_data['planets']:
             data = chart_data['planets'][planet_name]
             # 💥💥💥 رفع خطای 'sign' با استفاده از .get() 💥💥💥
-            p_sign = data.get('sign', 'UNKNOWN').upper()
-            p_house = data['house']
-            p_fa = PLANETS_MAP.get(planet_name.upper(), planet_name.title())
-            
-            # تفسیر در برج
-            sign_interp = PLANET_IN_SIGN_INTERPRETATIONS.get(planet_name, {}).get(p_sign, f"*{p_fa} در {SIGNS_MAP.get(p_sign, p_sign)}:* تفسیر موجود نیست.")
-            
-            # تفسیر در خانه
-            house_interp = PLANET_IN_HOUSE_INTERPRETATIONS.get(p_house, {}).get(planet_name, f"*{p_fa} در خانه {p_house}:* فعالیت این سیاره در این حوزه زندگی متمرکز است.")
-
-            # اضافه کردن به لیست
+            sign_interp = planet_sign_text(planet_name, data.get('sign', 'UNKNOWN'))
+            house_interp = planet_house_text(planet_name, data.get('house'))
             interpretations.append(f"\n{sign_interp}\n{house_interp}")
             
     # 4. تفسیر سیارات بیرونی و گره‌ها (فقط در خانه/برج)
-    interpretations.append("\n*--- تفسیر سیارات بیرونی و گره‌ها ---*")
-    for planet_name in ['jupiter', 'saturn', 'uranus', 'neptune', 'pluto', 'true_node']:
+    interpretations.append(SECTION_TITLES['outer'])
+    for planet_name in OUTER_PLANETS:
         if planet_name in chart_data['planets']:
             data = chart_data['planets'][planet_name]
-            p_house = data['house']
-            p_fa = PLANETS_MAP.get(planet_name.upper(), planet_name.title())
-
             # تفسیر در خانه (یا گره در برج برای گره‌ها)
             if planet_name == 'true_node':
-                 # 💥💥💥 رفع خطای 'sign' با استفاده از .get() 💥💥💥
-                 p_sign = data.get('sign', 'UNKNOWN').upper()
-                 node_interp = PLANET_IN_SIGN_INTERPRETATIONS.get('true_node', {}).get(p_sign, f"*{p_fa} در {SIGNS_MAP.get(p_sign, p_sign)}:* مسیر تکاملی روح شما در این حوزه است.")
-                 interpretations.append(f"\n{node_interp}")
+                 interpretations.append(f"\n{planet_sign_text(planet_name, data.get('sign', 'UNKNOWN'))}")
             else:
-                 house_interp = PLANET_IN_HOUSE_INTERPRETATIONS.get(p_house, {}).get(planet_name, f"*{p_fa} در خانه {p_house}:* تأثیر این سیاره نسلی/اجتماعی بر این حوزه زندگی است.")
-                 interpretations.append(f"\n{house_interp}")
+                 interpretations.append(f"\n{planet_house_text(planet_name, data.get('house'))}")
 
 
     # 5. تفسیر زوایا (Aspects)
     aspects_list = chart_data.get('aspects', [])
     if aspects_list:
-        aspects_interp = ["\n*--- زوایای اصلی (Aspects) ---*"]
-        
+        interpretations.append(SECTION_TITLES['aspects'])
         for aspect in aspects_list:
-            p1 = aspect['p1'].upper().replace(" ", "_")
-            p2 = aspect['p2'].upper().replace(" ", "_")
-            aspect_name = aspect['aspect']
-            
-            key1 = f"{p1}_{p2}"
-            key2 = f"{p2}_{p1}"
-            
-            interp = ASPECT_INTERPRETATIONS.get(aspect_name, {}).get(key1)
-            if not interp:
-                interp = ASPECT_INTERPRETATIONS.get(aspect_name, {}).get(key2)
-                
-            if interp:
-                aspects_interp.append(f"  • {interp} (اُرب: {aspect['orb']:.2f}°)")
-            else:
-                aspect_fa = ASPECTS_MAP.get(aspect_name.upper(), aspect_name)
-                p1_fa = PLANETS_MAP.get(p1, p1.title())
-                p2_fa = PLANETS_MAP.get(p2, p2.title())
-                aspects_interp.append(f"  • {aspect_fa} بین {p1_fa} و {p2_fa} (اُرب: {aspect['orb']:.2f}°): این دو نیرو در حال تعامل هستند.")
-                
-        interpretations.extend(aspects_interp)
+            before, after = aspect_line_parts(aspect['aspect'], *aspect_names(aspect))
+            interpretations.append(f"{before}{aspect['orb']:.2f}{after}")
         
-    # 6. خلاصه‌ای از توزیع عناصر و کیفیت‌ها
+    # 6. اتصال با ستارگان ثابت (فهرست مرتب بر اساس Orb در astrology_core محاسبه شده است)
+    fixed_star_hits = chart_data.get('fixed_stars', [])
+    if fixed_star_hits:
+        interpretations.append(SECTION_TITLES['fixed_stars'])
+        for hit in fixed_star_hits[:FIXED_STAR_MAX_LINES]:
+            before, after = fixed_star_line_parts(hit['point'], hit['star'])
+            interpretations.append(f"{before}{hit['orb']:.2f}{after}")
+
+    # 7. خلاصه‌ای از توزیع عناصر و کیفیت‌ها
     element_summary = chart_data.get('summary', {}).get('elements', {})
     quality_summary = chart_data.get('summary', {}).get('qualities', {})
     
-    summary_text = ["\n*--- توزیع عناصر و کیفیت‌ها ---*"]
+    summary_text = [SECTION_TITLES['summary']]
     
     elements_fa = [f"{ELEMENT_MAP.get(e, e)}: {c:.2f} سیاره" for e, c in element_summary.items()]
     summary_text.append(f"  • عناصر: {'، '.join(elements_fa)}")
@@ -356,6 +418,6 @@ def interpret_natal_chart(chart_data: Dict[str, Any]) -> str:
 
     interpretations.extend(summary_text)
 
-    # 7. ترکیب نهایی
+    # 8. ترکیب نهایی
     final_output = "\n".join(interpretations)
     return header + final_output
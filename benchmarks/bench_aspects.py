@@ -0,0 +1,77 @@
+# ----------------------------------------------------------------------
+# benchmarks/bench_aspects.py - مقایسه حلقه سه‌گانه قدیمی calculate_aspects با aspect_engine
+# اجرا: python benchmarks/bench_aspects.py
+# ----------------------------------------------------------------------
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import astrology_core  # noqa: E402
+
+
+def legacy_calculate_aspects(planets, aspect_planets):
+    """نسخه مرجع حلقه‌ای (پیاده‌سازی قبلی calculate_aspects) بدون برش 5 تایی."""
+    aspects = []
+    planet_items = [(name, data['degree']) for name, data in planets.items() if name in aspect_planets and 'degree' in data]
+    for i in range(len(planet_items)):
+        p1_name, p1_deg = planet_items[i]
+        for j in range(i + 1, len(planet_items)):
+            p2_name, p2_deg = planet_items[j]
+            for aspect_name, aspect_degree in astrology_core.ASPECT_DEGREES.items():
+                degree_diff = astrology_core.get_degree_diff(p1_deg, p2_deg)
+                orb = abs(degree_diff - aspect_degree)
+                max_orb = astrology_core.ASPECT_ORBS.get(aspect_name, 1.0)
+                if p1_name in astrology_core.OUTER_ASPECT_BODIES or p2_name in astrology_core.OUTER_ASPECT_BODIES:
+                    max_orb = min(max_orb, astrology_core.OUTER_ASPECT_MAX_ORB)
+                if orb <= max_orb:
+                    aspects.append({
+                        "p1": p1_name.replace("_", " ").title(),
+                        "p2": p2_name.replace("_", " ").title(),
+                        "aspect": aspect_name,
+                        "orb": orb,
+                        "p1_deg": p1_deg,
+                        "p2_deg": p2_deg,
+                    })
+    aspects.sort(key=lambda x: x['orb'])
+    return aspects
+
+
+def timeit(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    rng = np.random.default_rng(7)
+    engine = astrology_core.ASPECT_ENGINE
+    for n in (11, 25, 60):
+        # 11 جسم اول همان سیارات واقعی؛ بقیه نقاط فرضی (مثلاً سیارک‌ها و نقاط عربی)
+        names = (astrology_core.ASPECT_PLANETS + [f"point_{k}" for k in range(n)])[:n]
+        degrees = rng.uniform(0, 360, n)
+        planets = {name: {"degree": float(d)} for name, d in zip(names, degrees)}
+        repeat = 2000 if n <= 25 else 300
+
+        legacy_t, legacy = timeit(lambda: legacy_calculate_aspects(planets, names), repeat)
+        all_t, found = timeit(lambda: engine.find(degrees, names), repeat)
+        top_t, _ = timeit(lambda: engine.match(degrees, names, top_k=5), repeat)
+
+        same = [(a['p1'], a['p2'], a['aspect']) for a in legacy] == [(a['p1'], a['p2'], a['aspect']) for a in found]
+        print(f"N={n:3d}  legacy loop: {legacy_t * 1e6:9.1f} µs   engine all: {all_t * 1e6:8.1f} µs   "
+              f"engine top-5 arrays: {top_t * 1e6:8.1f} µs   aspects={len(found):4d} identical={same}")
+
+    # N×M: ترانزیت 11 جسم روی 60 نقطه ناتال
+    natal = rng.uniform(0, 360, 60)
+    transit = rng.uniform(0, 360, 11)
+    natal_names = [f"point_{k}" for k in range(60)]
+    cross_t, hits = timeit(lambda: engine.match(transit, astrology_core.ASPECT_PLANETS, natal, natal_names), 2000)
+    print(f"N×M 11×60 transit: {cross_t * 1e6:8.1f} µs   aspects={len(hits['orb'])}")
+
+
+if __name__ == "__main__":
+    main()
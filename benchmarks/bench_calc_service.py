@@ -0,0 +1,88 @@
+# ----------------------------------------------------------------------
+# benchmarks/bench_calc_service.py - چارت‌های استوایی/Placidus و نجومی/Whole Sign به صورت هم‌زمان
+# نتیجه هر حالت با محاسبه مرجع (هر پیکربندی جدا و پشت سر هم) مقایسه می‌شود:
+#   switched: یک thread با تعویض پیکربندی زیر قفل برای هر درخواست (درخواست‌ها یک در میان)
+#   pinned:   یک process pool برای هر پیکربندی، همه درخواست‌ها هم‌زمان
+# اجرا: python benchmarks/bench_calc_service.py [تعداد چارت برای هر پیکربندی]
+# ----------------------------------------------------------------------
+
+import os
+import sys
+import time
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import calc_service  # noqa: E402
+from bench_natal_batch import make_births  # noqa: E402
+
+SIDEREAL = calc_service.make_config("sidereal", "lahiri")
+# (پیکربندی، سیستم خانه)
+VARIANTS = [(calc_service.TROPICAL, b'P'), (SIDEREAL, b'W')]
+
+
+def chart_key(chart):
+    planets = tuple(round(p['degree'], 9) for p in chart['planets'].values())
+    houses = tuple(round(c, 9) for c in chart['houses']['cusps'].values())
+    return planets + houses + (round(chart['houses']['ascendant'], 9),)
+
+
+def requests(n: int):
+    dates, times, lats, lons, zones = make_births(n)
+    births = list(zip(dates, times, lats, lons, zones))
+    # درخواست‌ها یک در میان بین دو پیکربندی
+    return [(config, hsys, birth) for birth in births for config, hsys in VARIANTS]
+
+
+async def run(service: calc_service.CalcService, reqs):
+    start = time.perf_counter()
+    charts = await asyncio.gather(*[
+        service.calculate_natal_chart(config, d, t, "", la, lo, z, house_system=hsys)
+        for config, hsys, (d, t, la, lo, z) in reqs
+    ])
+    return charts, time.perf_counter() - start
+
+
+def mismatches(charts, reference):
+    return sum(chart_key(c) != r for c, r in zip(charts, reference))
+
+
+async def main(n: int):
+    reqs = requests(n)
+
+    # مرجع: هر پیکربندی جدا در یک thread (بدون تعویض در میانه)
+    reference_calc = calc_service.SwitchingCalculator()
+    reference = [None] * len(reqs)
+    start = time.perf_counter()
+    for config, hsys in VARIANTS:
+        for i, (c, h, (d, t, la, lo, z)) in enumerate(reqs):
+            if (c, h) == (config, hsys):
+                reference[i] = chart_key(reference_calc.calculate(c, (d, t, "", la, lo, z), {"house_system": h}))
+    reference_time = time.perf_counter() - start
+    print(f"charts: {len(reqs)} ({n} per configuration)")
+    print(f"reference (grouped)   : {reference_time:7.2f}s")
+
+    sample = reqs[0][2]
+    tropical = reference_calc.calculate(calc_service.TROPICAL, (sample[0], sample[1], "", *sample[2:]), {})
+    sidereal = reference_calc.calculate(SIDEREAL, (sample[0], sample[1], "", *sample[2:]), {})
+    shift = (tropical['planets']['sun']['degree'] - sidereal['planets']['sun']['degree']) % 360.0
+    print(f"sun tropical - sidereal = {shift:.6f}, ayanamsa = {sidereal['ayanamsa']:.6f} (difference: nutation)")
+
+    switched = calc_service.CalcService(max_pools=0)
+    charts, elapsed = await run(switched, reqs)
+    stats = switched.stats()
+    print(f"switched (one thread) : {elapsed:7.2f}s  mismatches {mismatches(charts, reference)}  "
+          f"switches {stats['switches']}  switch cost {stats['switch_ms_mean'] * 1000:.1f} us each, "
+          f"{stats['switch_ms_total']:.1f} ms total")
+    await switched.shutdown()
+
+    # همه درخواست‌ها یکجا فرستاده می‌شوند؛ صف به اندازه کل درخواست‌ها
+    pinned = calc_service.CalcService(workers_per_config=1, queue_size=len(reqs))
+    pinned.start([config for config, _ in VARIANTS])
+    await run(pinned, reqs[:len(VARIANTS)])  # انتظار برای آماده شدن workerها
+    charts, elapsed = await run(pinned, reqs)
+    print(f"pinned (process/config): {elapsed:6.2f}s  mismatches {mismatches(charts, reference)}  routes {pinned.stats()['routes']}")
+    await pinned.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
@@ -0,0 +1,62 @@
+# ----------------------------------------------------------------------
+# benchmarks/bench_chart_drawer.py - زمان رسم هر چارت و رشد حافظه (RSS) در رسم‌های پیاپی
+#   cached:   لایه‌های ثابت چرخ یک بار رسم و برای هر چارت فقط لایه چارت روی raster آن رسم می‌شود
+#   uncached: برای هر چارت یک شکل کامل ساخته و پس از رسم آزاد می‌شود (CHART_WHEEL_CACHE=0)
+# تصویر دو حالت پیکسل به پیکسل مقایسه می‌شود.
+# اجرا: python benchmarks/bench_chart_drawer.py [تعداد رسم cached] [تعداد رسم uncached]
+# ----------------------------------------------------------------------
+
+import os
+import sys
+import time
+import resource
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import astrology_core  # noqa: E402
+import chart_drawer_fa  # noqa: E402
+from bench_natal_batch import make_births  # noqa: E402
+
+
+def rss_mb() -> float:
+    """RSS فعلی پردازه (لینوکس)؛ در غیر این صورت بیشینه RSS."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def run(name: str, charts, n: int, cached: bool):
+    chart_drawer_fa.CHART_WHEEL_CACHE = cached
+    chart_drawer_fa.draw_chart_wheel_fa(charts[0])  # گرم کردن (فونت‌ها و بوم کش‌شده)
+    before = rss_mb()
+    latencies = []
+    for i in range(n):
+        start = time.perf_counter()
+        chart_drawer_fa.draw_chart_wheel_fa(charts[i % len(charts)])
+        latencies.append(time.perf_counter() - start)
+    growth = rss_mb() - before
+    ms = np.array(latencies) * 1000
+    print(f"{name:8s}: {n:5d} renders  mean {ms.mean():6.1f} ms  p50 {np.percentile(ms, 50):6.1f}  "
+          f"p95 {np.percentile(ms, 95):6.1f}  RSS growth {growth:+7.1f} MB")
+
+
+def main(n_cached: int, n_uncached: int):
+    dates, times, lats, lons, zones = make_births(50, seed=20)
+    charts = [astrology_core.calculate_natal_chart(d, t, "تهران", la, lo, z) for d, t, la, lo, z in zip(dates, times, lats, lons, zones)]
+
+    chart_drawer_fa.CHART_WHEEL_CACHE = True
+    cached_png = chart_drawer_fa.draw_chart_wheel_fa(charts[1]).getvalue()
+    chart_drawer_fa.CHART_WHEEL_CACHE = False
+    uncached_png = chart_drawer_fa.draw_chart_wheel_fa(charts[1]).getvalue()
+    print(f"cached image identical to uncached: {cached_png == uncached_png} ({len(cached_png) / 1e3:.0f} kB)")
+
+    run("cached", charts, n_cached, cached=True)
+    run("uncached", charts, n_uncached, cached=False)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 200)
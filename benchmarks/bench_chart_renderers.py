@@ -0,0 +1,83 @@
+# ----------------------------------------------------------------------
+# benchmarks/bench_chart_renderers.py - مقایسه رسام‌های چرخ چارت: draw_chart_wheel_fa (matplotlib) و
+# draw_chart_wheel_svg (SVG/Pillow، با و بدون supersampling)
+# هر رسام در یک پردازه جداگانه اجرا می‌شود تا زمان import و حافظه (RSS) آن جدا اندازه‌گیری شود.
+# اجرا: python benchmarks/bench_chart_renderers.py [تعداد رسم]
+# ----------------------------------------------------------------------
+
+import os
+import sys
+import json
+import time
+import pickle
+import subprocess
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+VARIANTS = [
+    ("matplotlib", "chart_drawer_fa", "draw_chart_wheel_fa", {}),
+    ("svg", "chart_drawer_svg", "draw_chart_wheel_svg", {"CHART_SVG_SUPERSAMPLE": "1"}),
+    ("svg x2", "chart_drawer_svg", "draw_chart_wheel_svg", {"CHART_SVG_SUPERSAMPLE": "2"}),
+]
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+
+def child(module_name: str, function_name: str, charts_path: str, n: int):
+    """اجرا در پردازه فرزند: import، اولین رسم (شامل لایه‌های ثابت) و n رسم پیاپی."""
+    import importlib
+    with open(charts_path, "rb") as f:
+        charts = pickle.load(f)
+    base = rss_mb()
+    start = time.perf_counter()
+    draw = getattr(importlib.import_module(module_name), function_name)
+    import_s = time.perf_counter() - start
+    start = time.perf_counter()
+    size = len(draw(charts[0]).getvalue())
+    first_s = time.perf_counter() - start
+    after_first = rss_mb()
+    latencies = []
+    for i in range(n):
+        start = time.perf_counter()
+        draw(charts[i % len(charts)])
+        latencies.append(time.perf_counter() - start)
+    ms = np.array(latencies) * 1000
+    print(json.dumps({
+        "import_ms": import_s * 1000, "first_ms": first_s * 1000, "mean_ms": float(ms.mean()),
+        "p95_ms": float(np.percentile(ms, 95)), "rss_import_mb": after_first - base,
+        "rss_growth_mb": rss_mb() - after_first, "png_kb": size / 1e3,
+    }))
+
+
+def main(n: int):
+    import astrology_core
+    from bench_natal_batch import make_births
+
+    dates, times, lats, lons, zones = make_births(50, seed=22)
+    charts = [astrology_core.calculate_natal_chart(d, t, "تهران", la, lo, z) for d, t, la, lo, z in zip(dates, times, lats, lons, zones)]
+    with tempfile.NamedTemporaryFile(suffix=".pkl", delete=False) as f:
+        pickle.dump(charts, f)
+    try:
+        print(f"renders: {n} per renderer (separate processes)")
+        print(f"{'renderer':10s} {'import':>8s} {'first':>8s} {'mean':>7s} {'p95':>7s} {'RSS init':>9s} {'RSS growth':>11s} {'PNG':>7s}")
+        for name, module_name, function_name, env in VARIANTS:
+            result = subprocess.run([sys.executable, __file__, "--child", module_name, function_name, f.name, str(n)],
+                                    capture_output=True, text=True, env={**os.environ, **env}, check=True)
+            r = json.loads(result.stdout.strip().splitlines()[-1])
+            print(f"{name:10s} {r['import_ms']:6.0f}ms {r['first_ms']:6.0f}ms {r['mean_ms']:5.1f}ms {r['p95_ms']:5.1f}ms "
+                  f"{r['rss_import_mb']:7.1f}MB {r['rss_growth_mb']:+9.1f}MB {r['png_kb']:5.0f}kB")
+    finally:
+        os.unlink(f.name)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3], sys.argv[4], int(sys.argv[5]))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
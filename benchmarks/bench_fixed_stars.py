@@ -0,0 +1,66 @@
+# ----------------------------------------------------------------------
+# benchmarks/bench_fixed_stars.py - مقایسه ایندکس ستارگان ثابت با فراخوانی se.fixstar_ut برای هر ستاره
+# اجرا: python benchmarks/bench_fixed_stars.py [تعداد چارت]
+# ----------------------------------------------------------------------
+
+import os
+import sys
+import time
+import random
+
+import numpy as np
+import swisseph as se
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import astrology_core  # noqa: E402
+import fixed_stars  # noqa: E402
+
+
+def naive_conjunctions(catalogue: fixed_stars.FixedStarCatalogue, jd: float, points, orb: float):
+    """روش مستقیم: یک se.fixstar_ut برای هر ستاره و مقایسه با همه نقاط."""
+    hits = []
+    for nom in catalogue.nomenclature:
+        star_lon = se.fixstar_ut(f",{nom}", jd, astrology_core.CALC_FLAGS)[0][0]
+        for point, degree in points.items():
+            distance = abs((star_lon - degree + 180.0) % 360.0 - 180.0)
+            if distance <= orb:
+                hits.append((point, nom))
+    return hits
+
+
+def main(n: int):
+    catalogue = fixed_stars.load_catalogue()
+    if catalogue is None:
+        print(f"catalogue not found: {fixed_stars.FIXED_STARS_FILE}")
+        return
+    rnd = random.Random(11)
+    jds = [rnd.uniform(2415020.5, 2488069.5) for _ in range(n)]
+    charts = [{name: rnd.uniform(0.0, 360.0) for name in astrology_core.BODY_NAMES} for _ in range(n)]
+    orb = fixed_stars.FIXED_STAR_ORB
+
+    start = time.perf_counter()
+    naive = [naive_conjunctions(catalogue, jd, points, orb) for jd, points in zip(jds, charts)]
+    naive_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = [fixed_stars.find_conjunctions(jd, points, orb) for jd, points in zip(jds, charts)]
+    index_time = time.perf_counter() - start
+
+    # دقت: اختلاف طول همه ستارگان با swisseph در چند لحظه نمونه
+    max_diff = 0.0
+    for jd in jds[:20]:
+        lon, _ = catalogue.ecliptic_positions(jd)
+        reference = np.array([se.fixstar_ut(f",{nom}", jd, astrology_core.CALC_FLAGS)[0][0] for nom in catalogue.nomenclature])
+        max_diff = max(max_diff, float(np.abs((lon - reference + 180.0) % 360.0 - 180.0).max()))
+
+    # نتایج فقط برای ستارگانی که دقیقاً روی مرز Orb هستند ممکن است متفاوت باشند
+    mismatched = sum(set(a) != {(h['point'], h['nomenclature']) for h in b} for a, b in zip(naive, indexed))
+    print(f"charts: {n}, stars: {len(catalogue)}, points per chart: {len(astrology_core.BODY_NAMES)}, orb: {orb}°")
+    print(f"naive fixstar_ut : {n / naive_time:>10.1f} charts/sec ({naive_time:.3f}s)")
+    print(f"sorted index     : {n / index_time:>10.1f} charts/sec ({index_time:.3f}s)")
+    print(f"max longitude difference vs swisseph: {max_diff * 3600:.2f}\"")
+    print(f"charts with different conjunction sets: {mismatched}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
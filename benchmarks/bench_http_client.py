@@ -0,0 +1,149 @@
+# ----------------------------------------------------------------------
+# benchmarks/bench_http_client.py - کلاینت HTTP مشترک (keep-alive) در برابر کلاینت تازه برای هر تماس Bot API
+# یک سرور محلی جایگزین تلگرام (uvicorn، با TLS گواهی خودامضا در صورت وجود openssl) در پردازه جدا اجرا
+# می‌شود و utils با TELEGRAM_API_URL به آن وصل می‌شود.
+# هر «جریان چارت» مانند هندلر: answerCallbackQuery، دو sendMessage و یک sendPhoto (آپلود PNG).
+#   fresh:  httpx.AsyncClient جداگانه برای هر تماس که پس از آن بسته می‌شود (رفتار قبلی utils)
+#   shared: کلاینت مشترک utils با اتصال‌های keep-alive
+# اجرا: python benchmarks/bench_http_client.py [تعداد جریان] [تعداد کاربر هم‌زمان] [--no-tls]
+# ----------------------------------------------------------------------
+
+import os
+import sys
+import time
+import json
+import shutil
+import socket
+import asyncio
+import tempfile
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+PHOTO_RESPONSE = json.dumps({"ok": True, "result": {"photo": [{"file_id": "small"}, {"file_id": "bench-file-id"}]}}).encode()
+OK_RESPONSE = json.dumps({"ok": True, "result": True}).encode()
+
+
+async def stub_app(scope, receive, send):
+    """سرور جایگزین Bot API: بدنه درخواست خوانده و پاسخ موفق برگردانده می‌شود."""
+    if scope["type"] != "http":
+        return
+    more = True
+    while more:
+        message = await receive()
+        more = message.get("more_body", False)
+    body = PHOTO_RESPONSE if scope["path"].endswith("/sendPhoto") else OK_RESPONSE
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(tls: bool, workdir: str) -> tuple:
+    """اجرای سرور جایگزین؛ بازگشت: (پردازه، آدرس پایه)."""
+    port = _free_port()
+    command = [sys.executable, "-m", "uvicorn", "bench_http_client:stub_app", "--app-dir", BENCH_DIR,
+               "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    scheme = "http"
+    if tls:
+        cert, key = os.path.join(workdir, "cert.pem"), os.path.join(workdir, "key.pem")
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=localhost",
+                        "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1", "-keyout", key, "-out", cert],
+                       check=True, capture_output=True)
+        # گواهی خودامضا برای کلاینت httpx (trust_env) معتبر می‌شود
+        os.environ["SSL_CERT_FILE"] = cert
+        command += ["--ssl-certfile", cert, "--ssl-keyfile", key]
+        scheme = "https"
+    process = subprocess.Popen(command)
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process, f"{scheme}://localhost:{port}"
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("stand-in Telegram server did not start")
+
+
+class FreshClients:
+    """جایگزین utils.get_http_client: کلاینت تازه برای هر تماس که پس از تماس بسته می‌شود (رفتار قبلی)."""
+
+    def __init__(self, utils):
+        self.utils = utils
+        self.open = {}
+
+    def __call__(self):
+        client = self.utils.httpx.AsyncClient(base_url=self.utils.TELEGRAM_API_URL)
+        self.open[asyncio.current_task()] = client
+        return client
+
+    async def close(self):
+        client = self.open.pop(asyncio.current_task(), None)
+        if client is not None:
+            await client.aclose()
+
+
+async def chart_flow(utils, chat_id: int, photo: bytes, fresh: bool) -> int:
+    calls = (
+        lambda: utils.answer_callback_query("TOKEN", "cb", text="..."),
+        lambda: utils.send_message("TOKEN", chat_id, "در حال محاسبه"),
+        lambda: utils.send_message("TOKEN", chat_id, "تفسیر"),
+        lambda: utils.send_photo_with_caption("TOKEN", chat_id, photo, "", notify_on_error=False),
+    )
+    failures = 0
+    for call in calls:
+        result = await call()
+        failures += result is False or (isinstance(result, dict) and not result.get("ok"))
+        if fresh:
+            await utils.get_http_client.close()
+    return failures
+
+
+async def run(n: int, concurrency: int, tls: bool):
+    import logging
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as workdir:
+        process, base_url = start_server(tls and shutil.which("openssl") is not None, workdir)
+        try:
+            os.environ["TELEGRAM_API_URL"] = base_url
+            import utils
+            utils.TELEGRAM_API_URL = base_url
+            photo = os.urandom(30_000)  # هم‌اندازه PNG پالتی چرخ (image_encoding)
+            shared_client = utils.get_http_client
+            print(f"server: {base_url}, flows: {n}, concurrent users: {concurrency}, calls per flow: 4")
+            for name, fresh in (("fresh", True), ("shared", False)):
+                utils.get_http_client = FreshClients(utils) if fresh else shared_client
+                await chart_flow(utils, 0, photo, fresh)  # گرم کردن
+                latencies, failures = [], 0
+
+                async def user(count: int):
+                    nonlocal failures
+                    for _ in range(count):
+                        start = time.perf_counter()
+                        failures += await chart_flow(utils, 0, photo, fresh)
+                        latencies.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                await asyncio.gather(*(user(n // concurrency) for _ in range(concurrency)))
+                elapsed = time.perf_counter() - start
+                await utils.close_http_client()
+                latencies.sort()
+                print(f"{name:7s}: mean {sum(latencies) / len(latencies) * 1000:7.2f} ms/flow  "
+                      f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:7.2f} ms  "
+                      f"throughput {len(latencies) / elapsed:7.1f} flows/s  failures {failures}")
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    asyncio.run(run(int(args[0]) if len(args) > 0 else 200,
+                    int(args[1]) if len(args) > 1 else 1,
+                    "--no-tls" not in sys.argv))
@@ -0,0 +1,89 @@
+# ----------------------------------------------------------------------
+# benchmarks/bench_image_cache.py - ارسال عکس چارت با image_cache (file_id تلگرام) در برابر رسم و آپلود هر بار
+# sendPhoto با تلگرام ساختگی جایگزین می‌شود: آپلود latency + حجم / پهنای باند، ارسال با file_id فقط latency.
+# جمعیت: درخواست‌های تکراری همان کاربران و چارت‌های مشترک (تولد هم‌روز با ساعت پیش‌فرض در یک شهر).
+# اجرا: python benchmarks/bench_image_cache.py [تعداد درخواست] [تعداد چارت متمایز]
+# ----------------------------------------------------------------------
+
+import os
+import sys
+import time
+import random
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import astrology_core  # noqa: E402
+import chart_executor  # noqa: E402
+import image_cache  # noqa: E402
+import utils  # noqa: E402
+from bench_natal_batch import make_births  # noqa: E402
+
+LATENCY = 0.08
+UPLOAD_BYTES_PER_SECOND = 2e6
+
+
+class FakeTelegram:
+    def __init__(self):
+        self.uploads = 0
+        self.file_id_sends = 0
+
+    async def send_photo_with_caption(self, bot_token, chat_id, photo, caption, reply_markup=None, notify_on_error=True):
+        if isinstance(photo, str):
+            self.file_id_sends += 1
+            await asyncio.sleep(LATENCY)
+            return {"ok": True, "result": {"photo": [{"file_id": photo}]}}
+        self.uploads += 1
+        await asyncio.sleep(LATENCY + len(photo) / UPLOAD_BYTES_PER_SECOND)
+        return {"ok": True, "result": {"photo": [{"file_id": f"small-{self.uploads}"}, {"file_id": f"file-{self.uploads}"}]}}
+
+
+async def main(n: int, distinct: int):
+    dates, times, lats, lons, zones = make_births(distinct, seed=21)
+    charts = [astrology_core.calculate_natal_chart(d, t, "تهران", la, lo, z) for d, t, la, lo, z in zip(dates, times, lats, lons, zones)]
+    rng = random.Random(21)
+    requests = [charts[int(rng.paretovariate(1.2)) % distinct] for _ in range(n)]
+
+    telegram = FakeTelegram()
+    utils.send_photo_with_caption = telegram.send_photo_with_caption
+
+    def renderer(chart):
+        async def render():
+            image_buffer, _, _ = await chart_executor.render_chart(chart, interpret=False)
+            return image_buffer.getvalue() if image_buffer else None
+        return render
+
+    # بدون کش: رسم و آپلود برای هر درخواست
+    start = time.perf_counter()
+    for chart in requests:
+        png = await renderer(chart)()
+        await utils.send_photo_with_caption("", 0, png, "")
+    uncached = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = image_cache.ImageCache(db_path=os.path.join(tmp, "images.db"))
+        await cache.init_db()
+        telegram.uploads = 0
+        start = time.perf_counter()
+        for chart in requests:
+            render = renderer(chart)
+            photo = await cache.prepare(chart, render)
+            await cache.send("", 0, photo, "", render)
+        cached = time.perf_counter() - start
+        await cache.flush()
+
+        # پس از ری‌استارت: file_id ها از جدول ChartImages خوانده می‌شوند
+        restarted = image_cache.ImageCache(db_path=cache.db_path)
+        photo = await restarted.prepare(requests[0], renderer(requests[0]))
+        stats = cache.stats()
+
+    print(f"requests: {n}, distinct charts: {distinct}, sent distinct: {len({image_cache.image_key(c) for c in requests})}")
+    print(f"render + upload every time: {uncached / n * 1000:7.1f} ms/request")
+    print(f"image_cache (file_id)     : {cached / n * 1000:7.1f} ms/request  renders {stats['renders']}  "
+          f"uploads {telegram.uploads}  file_id sends {stats['file_id_hits']}  hit rate {stats['file_id_hit_rate']:.2f}")
+    print(f"file_id after restart     : {photo['file_id'] is not None}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+                     int(sys.argv[2]) if len(sys.argv) > 2 else 100))
@@ -0,0 +1,53 @@
+# ----------------------------------------------------------------------
+# benchmarks/bench_image_encoding.py - حجم، زمان رمزگذاری و کیفیت قالب‌های image_encoding برای تصویر چارت
+# برای هر رسام، اندازه و قالب: میانگین حجم، زمان رمزگذاری، زمان آپلود تخمینی (UPLOAD_MBIT) و
+# PSNR نسبت به PNG کامل همان اندازه (inf = بدون افت).
+# اجرا: python benchmarks/bench_image_encoding.py [تعداد چارت] [پهنای باند آپلود به مگابیت بر ثانیه]
+# ----------------------------------------------------------------------
+
+import io
+import os
+import sys
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import astrology_core  # noqa: E402
+import chart_drawer_fa  # noqa: E402
+import chart_drawer_svg  # noqa: E402
+import image_encoding  # noqa: E402
+from bench_natal_batch import make_births  # noqa: E402
+
+FORMATS = ["png", "png8", "jpeg", "webp"]
+SIZES = [1000, 720]
+
+
+def psnr(reference: np.ndarray, data: bytes) -> float:
+    decoded = np.asarray(Image.open(io.BytesIO(data)).convert("RGB"), dtype=np.float64)
+    mse = np.mean((reference - decoded) ** 2)
+    return float("inf") if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+
+
+def main(n: int, upload_mbit: float):
+    dates, times, lats, lons, zones = make_births(n, seed=23)
+    charts = [astrology_core.calculate_natal_chart(d, t, "تهران", la, lo, z) for d, t, la, lo, z in zip(dates, times, lats, lons, zones)]
+    print(f"charts: {n}, upload bandwidth: {upload_mbit:g} Mbit/s")
+    print(f"{'renderer':10s} {'size':>5s} {'format':6s} {'kB':>7s} {'encode':>9s} {'upload':>9s} {'PSNR':>7s}")
+    for renderer, module in (("matplotlib", chart_drawer_fa), ("svg", chart_drawer_svg)):
+        images = [module.render_wheel_image(chart) for chart in charts]
+        for size in SIZES:
+            references = [np.asarray(image.resize((size, size), Image.LANCZOS) if image.size[0] != size else image,
+                                     dtype=np.float64) for image in images]
+            for fmt in FORMATS:
+                results = [image_encoding.encode(image, fmt, size) for image in images]
+                kb = np.mean([len(data) for data, _ in results]) / 1e3
+                encode_ms = np.mean([ms for _, ms in results])
+                quality = np.mean([psnr(ref, data) for ref, (data, _) in zip(references, results)])
+                upload_ms = kb * 8 / upload_mbit
+                print(f"{renderer:10s} {size:5d} {fmt:6s} {kb:7.1f} {encode_ms:7.1f}ms {upload_ms:7.0f}ms {quality:7.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 10.0)
@@ -0,0 +1,47 @@
+# ----------------------------------------------------------------------
+# benchmarks/bench_interpretation.py - مقایسه تفسیر فعلی (ساخت رشته + escape_markdown_v2) با قطعه‌های از پیش فراردهی‌شده
+# اجرا: python benchmarks/bench_interpretation.py [تعداد چارت]
+# ----------------------------------------------------------------------
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import astrology_core  # noqa: E402
+import astrology_interpretation  # noqa: E402
+import interpretation_fragments  # noqa: E402
+import utils  # noqa: E402
+from bench_natal_batch import make_births  # noqa: E402
+
+
+def main(n: int = 2000, repeat: int = 5):
+    dates, times, lats, lons, zones = make_births(n)
+    charts = [astrology_core.calculate_natal_chart(d, t, "تهران", la, lo, z) for d, t, la, lo, z in zip(dates, times, lats, lons, zones)]
+
+    start = time.perf_counter()
+    interpretation_fragments.load()
+    print(f"fragment store built in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def legacy():
+        return [utils.escape_markdown_v2(astrology_interpretation.interpret_natal_chart(c)) for c in charts]
+
+    def fragments():
+        return [interpretation_fragments.render_escaped(c) for c in charts]
+
+    results = {}
+    for name, func in (("interpret + escape", legacy), ("fragments", fragments)):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results[name] = func()
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:<20}: {best / n * 1e6:8.1f} us/chart")
+
+    mismatches = sum(a != b for a, b in zip(results["interpret + escape"], results["fragments"]))
+    size = sum(len(t.encode("utf-8")) for t in results["fragments"]) / n
+    print(f"mismatches: {mismatches} of {n} (mean message {size / 1e3:.1f} kB)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,70 @@
+# ----------------------------------------------------------------------
+# benchmarks/bench_interpretation_cache.py - نرخ hit و زمان پاسخ کش تفسیر (امضای چارت)
+# جمعیت ساختگی: تاریخ‌های تصادفی، بخشی با ساعت پیش‌فرض 12:00 و چند شهر مشترک (مانند bench_natal_batch).
+# اجرا: python benchmarks/bench_interpretation_cache.py [تعداد کاربر]
+# ----------------------------------------------------------------------
+
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import astrology_core  # noqa: E402
+import interpretation_cache  # noqa: E402
+import interpretation_fragments  # noqa: E402
+from bench_natal_batch import make_births  # noqa: E402
+
+
+async def main(n: int):
+    dates, times, lats, lons, zones = make_births(n, seed=11)
+    # تاریخ‌های محدودتر تا تولدهای هم‌روز (مانند کاربران یک دهه) هم دیده شوند
+    dates = [f"1370/{d[5:]}" if i % 2 else d for i, d in enumerate(dates)]
+    charts = [astrology_core.calculate_natal_chart(d, t, "تهران", la, lo, z) for d, t, la, lo, z in zip(dates, times, lats, lons, zones)]
+    interpretation_fragments.load()
+
+    cache = interpretation_cache.InterpretationCache(db_path=None)
+
+    mismatches = 0
+    hit_time, miss_time, hits, misses = 0.0, 0.0, 0, 0
+    for chart in charts:
+        before = cache.counters['misses']
+        start = time.perf_counter()
+        text = await interpretation_cache.interpret_cached(chart, cache)
+        elapsed = time.perf_counter() - start
+        if cache.counters['misses'] > before:
+            miss_time, misses = miss_time + elapsed, misses + 1
+        else:
+            hit_time, hits = hit_time + elapsed, hits + 1
+        mismatches += text != interpretation_fragments.render_escaped(chart)
+
+    start = time.perf_counter()
+    for chart in charts:
+        interpretation_fragments.render_escaped(chart)
+    render_time = time.perf_counter() - start
+
+    stats = cache.stats()
+    print(f"users: {n}, distinct signatures: {misses}, hit rate {stats['hit_rate']:.1%}, mismatches {mismatches}")
+    print(f"hit  : {hit_time / max(hits, 1) * 1e6:8.1f} us  (l1)")
+    print(f"miss : {miss_time / max(misses, 1) * 1e6:8.1f} us  (signature + render)")
+    print(f"render_escaped (no cache): {render_time / n * 1e6:8.1f} us")
+
+    # لایه 2 (INTERPRETATION_CACHE_PERSISTENT=1) پس از ری‌استارت: LRU خالی، همه از دیتابیس
+    persistent = interpretation_cache.InterpretationCache(db_path=os.path.join(tempfile.mkdtemp(), "bench_interp.db"))
+    await persistent.init_db()
+    sample = charts[:200]
+    start = time.perf_counter()
+    for chart in sample:
+        await interpretation_cache.interpret_cached(chart, persistent)
+    miss_l2 = time.perf_counter() - start
+    await persistent.flush()
+    persistent.clear()
+    start = time.perf_counter()
+    for chart in sample:
+        await interpretation_cache.interpret_cached(chart, persistent)
+    print(f"with sqlite tier: miss {miss_l2 / len(sample) * 1e6:8.1f} us, hit after restart "
+          f"{(time.perf_counter() - start) / len(sample) * 1e6:8.1f} us (l2 hits {persistent.counters['l2_hits']})")
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 3000))
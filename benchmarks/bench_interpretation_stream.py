@@ -0,0 +1,95 @@
+# ----------------------------------------------------------------------
+# benchmarks/bench_interpretation_stream.py - ارسال تفسیر: یکجا پس از تصویر در برابر بخش به بخش هم‌زمان با رندر تصویر
+# send_message / send_photo_with_caption با تأخیر شبکه ساختگی جایگزین می‌شوند (بدون تماس با تلگرام).
+#   single:    رندر تصویر، ارسال عکس، سپس کل متن (مانند جریان قبلی هندلر؛ متن بلند در چند پیام)
+#   streaming: رندر تصویر در پس‌زمینه، ارسال بخش‌های تفسیر (interpretation_cache.iter_interpretation)، سپس عکس
+# بررسی: اتصال پیام‌ها برابر render_escaped و طول هر پیام حداکثر TELEGRAM_MESSAGE_LIMIT.
+# اجرا: python benchmarks/bench_interpretation_stream.py [تعداد چارت] [تأخیر هر درخواست به میلی‌ثانیه]
+# ----------------------------------------------------------------------
+
+import os
+import sys
+import time
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import astrology_core  # noqa: E402
+import chart_executor  # noqa: E402
+import interpretation_cache  # noqa: E402
+import interpretation_fragments  # noqa: E402
+import utils  # noqa: E402
+from bench_natal_batch import make_births  # noqa: E402
+
+
+class FakeTelegram:
+    """ثبت پیام‌ها و زمان رسیدن آن‌ها؛ هر درخواست latency ثانیه طول می‌کشد."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.messages = []
+        self.first_at = None
+        self.start = 0.0
+
+    def reset(self):
+        self.messages, self.first_at, self.start = [], None, time.perf_counter()
+
+    def _arrived(self):
+        if self.first_at is None:
+            self.first_at = time.perf_counter() - self.start
+
+    async def send_message(self, bot_token, chat_id, text, reply_markup=None):
+        await asyncio.sleep(self.latency)
+        self.messages.append(text)
+        self._arrived()
+        return True
+
+    async def send_photo_with_caption(self, bot_token, chat_id, photo, caption=None):
+        await asyncio.sleep(self.latency)
+        self._arrived()
+        return True
+
+
+async def single(chart, intro):
+    image, _, _ = await chart_executor.render_chart(chart, interpret=False)
+    await utils.send_photo_with_caption("", 0, photo=image, caption="")
+    text = intro + await interpretation_cache.interpret_cached(chart, interpretation_cache.InterpretationCache(db_path=None))
+    await utils.send_long_message("", 0, text)
+
+
+async def streaming(chart, intro):
+    image_task = asyncio.create_task(chart_executor.render_chart(chart, interpret=False))
+    cache = interpretation_cache.InterpretationCache(db_path=None)
+    await utils.send_message_stream("", 0, interpretation_cache.iter_interpretation(chart, prefix=intro, cache=cache))
+    image, _, _ = await image_task
+    await utils.send_photo_with_caption("", 0, photo=image, caption="")
+
+
+async def main(n: int, latency_ms: float):
+    dates, times, lats, lons, zones = make_births(n, seed=19)
+    charts = [astrology_core.calculate_natal_chart(d, t, "تهران", la, lo, z) for d, t, la, lo, z in zip(dates, times, lats, lons, zones)]
+    interpretation_fragments.load()
+    intro = utils.escape_markdown_v2("✨ **تفسیر کامل چارت تولد**\n\n")
+
+    telegram = FakeTelegram(latency_ms / 1000.0)
+    utils.send_message = telegram.send_message
+    utils.send_photo_with_caption = telegram.send_photo_with_caption
+    await chart_executor.render_chart(charts[0], interpret=False)  # گرم کردن thread رندر
+
+    print(f"charts: {n}, simulated request latency: {latency_ms:.0f} ms")
+    for name, flow in (("single", single), ("streaming", streaming)):
+        first, total, messages, mismatches, oversized = 0.0, 0.0, 0, 0, 0
+        for chart in charts:
+            telegram.reset()
+            await flow(chart, intro)
+            total += time.perf_counter() - telegram.start
+            first += telegram.first_at
+            messages += len(telegram.messages)
+            mismatches += "".join(telegram.messages) != intro + interpretation_fragments.render_escaped(chart)
+            oversized += sum(utils.telegram_length(m) > utils.TELEGRAM_MESSAGE_LIMIT for m in telegram.messages)
+        print(f"{name:10s}: first message {first / n * 1000:7.1f} ms  total {total / n * 1000:7.1f} ms  "
+              f"messages/chart {messages / n:.2f}  mismatches {mismatches}  oversized {oversized}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+                     float(sys.argv[2]) if len(sys.argv) > 2 else 80.0))
@@ -0,0 +1,63 @@
+# ----------------------------------------------------------------------
+# benchmarks/bench_natal_batch.py - مقایسه سرعت calculate_natal_chart و calculate_natal_charts_batch
+# اجرا: python benchmarks/bench_natal_batch.py [تعداد چارت]
+# ----------------------------------------------------------------------
+
+import os
+import sys
+import time
+import random
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import astrology_core  # noqa: E402
+
+
+def make_births(n: int, seed: int = 42):
+    """تولید تولدهای تصادفی؛ بخشی از آن‌ها با ساعت پیش‌فرض 12:00 و شهرهای مشترک (مانند داده واقعی)."""
+    rnd = random.Random(seed)
+    cities = [(34.09, 49.69), (35.68, 51.41), (36.31, 59.58), (29.60, 52.54)]
+    dates, times, lats, lons, zones = [], [], [], [], []
+    for _ in range(n):
+        dates.append(f"{rnd.randint(1330, 1400)}/{rnd.randint(1, 12):02d}/{rnd.randint(1, 29):02d}")
+        times.append("12:00" if rnd.random() < 0.3 else f"{rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}")
+        lat, lon = rnd.choice(cities)
+        lats.append(lat)
+        lons.append(lon)
+        zones.append("Asia/Tehran")
+    return dates, times, lats, lons, zones
+
+
+def main(n: int = 2000):
+    dates, times, lats, lons, zones = make_births(n)
+
+    start = time.perf_counter()
+    singles = [
+        astrology_core.calculate_natal_chart(d, t, "", la, lo, z)
+        for d, t, la, lo, z in zip(dates, times, lats, lons, zones)
+    ]
+    single_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = astrology_core.calculate_natal_charts_batch(dates, times, lats, lons, zones)
+    batch_elapsed = time.perf_counter() - start
+
+    # بررسی یکسان بودن اعداد دو مسیر
+    single_lons = np.array([[c['planets'][b]['degree'] for b in astrology_core.BODY_NAMES] for c in singles])
+    single_cusps = np.array([[c['houses']['cusps'][i] for i in range(1, 13)] for c in singles])
+    single_pf = np.array([c['arabic_parts']['part_of_fortune']['degree'] for c in singles])
+    max_diff = max(
+        np.abs(single_lons - batch['longitudes']).max(),
+        np.abs(single_cusps - batch['cusps']).max(),
+        np.abs(single_pf - batch['part_of_fortune']).max(),
+    )
+
+    print(f"charts: {n}")
+    print(f"single: {n / single_elapsed:10.1f} charts/sec ({single_elapsed:.3f}s)")
+    print(f"batch : {n / batch_elapsed:10.1f} charts/sec ({batch_elapsed:.3f}s)")
+    print(f"max abs difference: {max_diff:.3e} deg")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,68 @@
+# ----------------------------------------------------------------------
+# benchmarks/bench_synastry.py - زمان پاسخ top-k هم‌خوانی برای مجموعه‌های 1k/10k/100k چارت
+# مقایسه با محاسبه جفت‌به‌جفت (AspectEngine.find برای هر چارت)، دقت جدول امتیاز و recall پیش‌فیلتر برجی.
+# اجرا: python benchmarks/bench_synastry.py [اندازه‌ها، مثلاً 1000,10000,100000]
+# ----------------------------------------------------------------------
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import synastry  # noqa: E402
+
+
+def pairwise_score(target: np.ndarray, other: np.ndarray) -> float:
+    """امتیاز همان مدل با محاسبه دقیق زوایا برای یک جفت چارت (روش مستقیم)."""
+    score = 0.0
+    for aspect in synastry.SYNASTRY_ENGINE.find(target.tolist(), synastry.SYNASTRY_BODIES, other.tolist(), synastry.SYNASTRY_BODIES):
+        a = synastry.SYNASTRY_BODIES.index(aspect["p1"].lower())
+        b = synastry.SYNASTRY_BODIES.index(aspect["p2"].lower())
+        closeness = 1.0 - aspect["orb"] / synastry.SYNASTRY_ASPECT_ORBS[aspect["aspect"]]
+        score += synastry.PAIR_WEIGHT_MATRIX[a, b] * synastry.SYNASTRY_ASPECT_WEIGHTS[aspect["aspect"]] * closeness
+    return score
+
+
+def best_of(func, repeat: int = 5) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(sizes):
+    rnd = np.random.default_rng(3)
+    k = synastry.SYNASTRY_TOP_K
+    print(f"{'pool':>8} {'build ms':>9} {'top-k ms':>9} {'prefilter ms':>13} {'candidates':>11} {'recall':>7} {'pairwise ms':>12}")
+    for n in sizes:
+        lon = rnd.uniform(0, 360, size=(n, len(synastry.SYNASTRY_BODIES)))
+        start = time.perf_counter()
+        pool = synastry.SynastryPool(np.arange(n), lon)
+        build = time.perf_counter() - start
+        targets = rnd.uniform(0, 360, size=(10, len(synastry.SYNASTRY_BODIES)))
+
+        full = best_of(lambda: [pool.top_matches(t, k) for t in targets]) / len(targets)
+        pre = best_of(lambda: [pool.top_matches(t, k, prefilter=True) for t in targets]) / len(targets)
+        candidates = np.mean([len(pool.prefilter(t)) for t in targets])
+        recall = np.mean([
+            len({m["chat_id"] for m in pool.top_matches(t, k)} & {m["chat_id"] for m in pool.top_matches(t, k, prefilter=True)}) / k
+            for t in targets
+        ])
+
+        # روش جفت‌به‌جفت روی حداکثر 2000 چارت و برون‌یابی خطی به کل مجموعه
+        sample = min(n, 2000)
+        start = time.perf_counter()
+        exact = np.array([pairwise_score(targets[0], lon[i]) for i in range(sample)])
+        pairwise = (time.perf_counter() - start) * n / sample
+        table_error = np.abs(pool.score(targets[0])[:sample] - exact).max()
+
+        print(f"{n:>8} {build * 1000:>9.1f} {full * 1000:>9.2f} {pre * 1000:>13.2f} {candidates:>11.0f} {recall:>7.2f} {pairwise * 1000:>12.0f}"
+              f"   (max score error vs exact: {table_error:.4f})")
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1].split(",")] if len(sys.argv) > 1 else [1000, 10000, 100000])
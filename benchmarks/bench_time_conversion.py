@@ -0,0 +1,60 @@
+# ----------------------------------------------------------------------
+# benchmarks/bench_time_conversion.py - مقایسه تبدیل زمان با strptime/pytz و time_conversion.local_to_jd
+# اجرا: python benchmarks/bench_time_conversion.py [تعداد ردیف]
+# ----------------------------------------------------------------------
+
+import os
+import sys
+import time
+import random
+import datetime
+
+import numpy as np
+import pytz
+from persiantools import jdatetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import time_conversion  # noqa: E402
+
+
+def legacy_local_to_jd(date_str: str, time_str: str, zone: str) -> float:
+    """مسیر قبلی calculate_natal_chart (strptime، to_gregorian، localize، astimezone)."""
+    j_date = jdatetime.JalaliDate.strptime(date_str, '%Y/%m/%d')
+    j_time = datetime.datetime.strptime(time_str, '%H:%M')
+    dt_local = pytz.timezone(zone).localize(datetime.datetime.combine(j_date.to_gregorian(), j_time.time()))
+    dt_utc = dt_local.astimezone(pytz.utc).replace(tzinfo=None)
+    return (dt_utc - datetime.datetime(1970, 1, 1)).total_seconds() / 86400.0 + time_conversion.UNIX_EPOCH_JD
+
+
+def main(n: int):
+    rnd = random.Random(7)
+    zones_pool = ["Asia/Tehran", "Asia/Tehran", "Asia/Tehran", "Europe/London", "America/Toronto"]
+    dates = [f"{rnd.randint(1330, 1400)}/{rnd.randint(1, 12):02d}/{rnd.randint(1, 29):02d}" for _ in range(n)]
+    times = [f"{rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}" for _ in range(n)]
+    zones = [rnd.choice(zones_pool) for _ in range(n)]
+
+    start = time.perf_counter()
+    legacy = []
+    for d, t, z in zip(dates, times, zones):
+        try:
+            legacy.append(legacy_local_to_jd(d, t, z))
+        except (ValueError, pytz.exceptions.InvalidTimeError):
+            legacy.append(np.nan)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    jd, status = time_conversion.local_to_jd(dates, times, zones, ambiguous='later', nonexistent='nan',
+                                             invalid='nan', return_status=True)
+    vector_time = time.perf_counter() - start
+
+    ok = status == time_conversion.STATUS_OK
+    diff = np.abs(jd[ok] - np.asarray(legacy)[ok]) * 86400.0
+    print(f"rows: {n} (ambiguous: {int((status == time_conversion.STATUS_AMBIGUOUS).sum())}, "
+          f"nonexistent: {int((status == time_conversion.STATUS_NONEXISTENT).sum())}, invalid: {int((status == time_conversion.STATUS_INVALID).sum())})")
+    print(f"legacy : {n / legacy_time:>12.1f} rows/sec ({legacy_time:.3f}s)")
+    print(f"vector : {n / vector_time:>12.1f} rows/sec ({vector_time:.3f}s)")
+    print(f"max abs difference: {diff.max() if len(diff) else 0.0:.3e} s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
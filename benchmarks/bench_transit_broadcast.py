@@ -0,0 +1,99 @@
+# ----------------------------------------------------------------------
+# benchmarks/bench_transit_broadcast.py - توان عملیاتی مراحل transit_broadcast و ادامه از checkpoint
+# یک دیتابیس موقت با N کاربر ساختگی ساخته می‌شود؛ ارسال واقعی انجام نمی‌شود (تابع ارسال فقط ثبت می‌کند).
+# اجرا: python benchmarks/bench_transit_broadcast.py [تعداد کاربر]
+# ----------------------------------------------------------------------
+
+import os
+import sys
+import time
+import random
+import asyncio
+import datetime
+import tempfile
+from collections import Counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import astrology_core  # noqa: E402
+import chart_result  # noqa: E402
+import state_manager  # noqa: E402
+import transit_broadcast  # noqa: E402
+
+
+def synthetic_blob(rnd: random.Random) -> bytes:
+    lon = np.array([rnd.uniform(0, 360) for _ in astrology_core.BODY_NAMES])
+    asc = rnd.uniform(0, 360)
+    cusps = (asc + np.arange(12) * 30.0) % 360.0
+    chart = chart_result.ChartResult.from_arrays(rnd.uniform(2415020.5, 2460000.5), 35.7, 51.4, b'P', lon,
+                                                 np.zeros(len(lon)), cusps, np.array([asc, (asc + 270.0) % 360.0]))
+    return chart.to_bytes()
+
+
+def naive_aspects(sky: np.ndarray, rows):
+    """روش مستقیم: بازسازی ChartResult و یک AspectEngine.find برای هر کاربر."""
+    total = 0
+    for _, blob in rows:
+        chart = chart_result.ChartResult.from_bytes(blob)
+        natal = np.append(chart.longitudes, [chart.ascendant, chart.midheaven])
+        total += len(transit_broadcast.TRANSIT_ENGINE.find(sky, transit_broadcast.TRANSIT_BODIES, natal, transit_broadcast.NATAL_POINTS,
+                                                           top_k=transit_broadcast.TRANSIT_MAX_ASPECTS))
+    return total
+
+
+async def main(n: int):
+    db_path = os.path.join(tempfile.mkdtemp(), "bench_broadcast.db")
+    await state_manager.init_db(db_path)
+    rnd = random.Random(5)
+    start = time.perf_counter()
+    for chat_id in range(1, n + 1):
+        await state_manager.save_user_chart(chat_id * 7, synthetic_blob(rnd), db_path=db_path)
+        # پیام روزانه اختیاری است (/transit_on)؛ همه کاربران ساختگی مشترک می‌شوند
+        await state_manager.set_transit_subscription(chat_id * 7, True, db_path)
+    print(f"users: {n} (setup {time.perf_counter() - start:.1f}s)")
+
+    run_date = datetime.date(2026, 3, 20)
+    sky = transit_broadcast.compute_sky(transit_broadcast.run_jd(run_date))
+    rows = await state_manager.load_user_charts(db_path=db_path)
+    start = time.perf_counter()
+    naive_total = naive_aspects(sky, rows)
+    naive_time = time.perf_counter() - start
+    _, natal = transit_broadcast.natal_matrix(rows)
+    start = time.perf_counter()
+    vector_total = sum(len(transit_broadcast.transit_hits(sky, natal[i:i + transit_broadcast.BROADCAST_BATCH_SIZE])["user"])
+                       for i in range(0, len(natal), transit_broadcast.BROADCAST_BATCH_SIZE))
+    vector_time = time.perf_counter() - start
+    print(f"aspects per user loop : {n / naive_time:>10.0f} users/sec ({naive_total} hits)")
+    print(f"aspects vectorized    : {n / vector_time:>10.0f} users/sec ({vector_total} hits)")
+
+    # اجرای کامل با قطع در میانه و ادامه از checkpoint
+    delivered = Counter()
+    stop_after = n // 2
+
+    async def interrupted_send(chat_id: int, text: str) -> bool:
+        if sum(delivered.values()) >= stop_after:
+            raise asyncio.CancelledError()
+        delivered[chat_id] += 1
+        return True
+
+    async def send(chat_id: int, text: str) -> bool:
+        delivered[chat_id] += 1
+        return True
+
+    try:
+        await transit_broadcast.run_broadcast(run_date, send=interrupted_send, rate=0, db_path=db_path)
+    except asyncio.CancelledError:
+        checkpoint = await state_manager.get_broadcast_checkpoint(run_date.isoformat(), db_path)
+        print(f"interrupted after {sum(delivered.values())} messages; checkpoint: chat {checkpoint['last_chat_id'] if checkpoint else None}")
+    result = await transit_broadcast.run_broadcast(run_date, send=send, rate=0, db_path=db_path)
+    again = await transit_broadcast.run_broadcast(run_date, send=send, rate=0, db_path=db_path)
+    duplicates = sum(count - 1 for count in delivered.values() if count > 1)
+    print(f"resumed after chat {result['resumed_after']}: {result['sent']} sent in total, {len(delivered)} users reached, "
+          f"{duplicates} duplicates, rerun of finished day sent {again['users']}")
+    for stage, row in result["stages"].items():
+        print(f"  {stage:<8} {row['items']:>8} items {row['seconds']:>9.3f}s {row['per_second']:>12.1f}/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
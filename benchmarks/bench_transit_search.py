@@ -0,0 +1,112 @@
+# ----------------------------------------------------------------------
+# benchmarks/bench_transit_search.py - درستی نزدیک ایستگاه‌ها و سرعت اسکن یک‌ساله transit_search
+# 1. ایستگاه‌ها: هدف‌هایی کمی پیش از طول ایستگاه (عطارد 2024-04-01، پلوتو 2024-05-02) با آغازهای مختلف
+#    اسکن؛ هر هدف باید دو بار (پیش و پس از ایستگاه) پیدا شود. اگر یکی گم شود با کد 1 خارج می‌شود.
+# 2. اسکن یک‌ساله همه اجسام: یک اسکن برای هر جسم (find_transits) در برابر سه اسکن جدا
+#    (find_aspect_hits، find_sign_ingresses، find_house_crossings) با شمارش فراخوانی‌های اپمریس.
+# اجرا: python benchmarks/bench_transit_search.py
+# ----------------------------------------------------------------------
+
+import os
+import sys
+import time
+import heapq
+import logging
+
+import numpy as np
+import swisseph as se
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import astrology_core  # noqa: E402
+import transit_search  # noqa: E402
+
+# (جسم، تخمین لحظه ایستگاه، فاصله هدف‌ها پیش از طول ایستگاه (درجه))
+STATIONS = (
+    ("mercury", se.julday(2024, 4, 1, 22.0), (0.01, 0.02, 0.05, 0.1, 0.2, 0.3)),
+    ("pluto", se.julday(2024, 5, 2, 0.0), (0.001, 0.003, 0.01)),
+)
+START_OFFSETS_DAYS = np.linspace(0.0, 5.0, 11)
+
+
+def find_station(body: str, jd_guess: float) -> float:
+    code = astrology_core.PLANETS_MAP[body]
+
+    def speed(jd: float) -> float:
+        return transit_search._body_position(code, jd)[1]
+
+    a, b = jd_guess - 3.0, jd_guess + 3.0
+    return transit_search.brent_root(speed, a, b, speed(a), speed(b), 1e-6)
+
+
+def check_stations() -> int:
+    missed_total = 0
+    for body, jd_guess, deltas in STATIONS:
+        jd_station = find_station(body, jd_guess)
+        lon_station = transit_search._body_position(astrology_core.PLANETS_MAP[body], jd_station)[0]
+        missed = probes = 0
+        for delta in deltas:
+            target = (lon_station - delta) % 360.0
+            for offset in START_OFFSETS_DAYS:
+                probes += 1
+                events = list(transit_search._scan_targets(body, np.array([target]), [{}],
+                                                           jd_station - 10.0 - offset, jd_station + 30.0, 1.0 / 86400.0))
+                # یک عبور مستقیم پیش از ایستگاه و یک عبور رجعی پس از آن
+                if [ev["retrograde"] for ev in events] != [False, True]:
+                    missed += 1
+        print(f"{body:8s} station {transit_search.jd_to_datetime(jd_station):%Y-%m-%d %H:%M} UTC: "
+              f"{probes - missed}/{probes} probes found both crossings")
+        missed_total += missed
+    return missed_total
+
+
+def separate_scans(chart, start_jd: float, end_jd: float):
+    """روش قبلی: سه اسکن جدا برای هر جسم."""
+    points = transit_search._natal_points(chart)
+    cusps = chart['houses']['cusps']
+    streams = []
+    for body in astrology_core.BODY_NAMES:
+        streams.append(transit_search.find_aspect_hits(body, points, start_jd, end_jd))
+        streams.append(transit_search.find_sign_ingresses(body, start_jd, end_jd))
+        streams.append(transit_search.find_house_crossings(body, cusps, start_jd, end_jd))
+    return heapq.merge(*streams, key=lambda ev: ev["jd_utc"])
+
+
+def bench_year_scan():
+    chart = astrology_core.calculate_natal_chart("1370/05/12", "14:30", "Tehran", 35.69, 51.39, "Asia/Tehran")
+    start_jd = se.julday(2024, 1, 1, 0.0)
+    end_jd = start_jd + 365.25
+
+    calls = {"n": 0}
+    positions = astrology_core.SwissEphemerisBackend.positions
+
+    def counted(self, jd_utc, body_codes):
+        calls["n"] += 1
+        return positions(self, jd_utc, body_codes)
+
+    astrology_core.SwissEphemerisBackend.positions = counted
+    try:
+        results = {}
+        for name, scan in (("separate", lambda: separate_scans(chart, start_jd, end_jd)),
+                           ("single", lambda: transit_search.find_transits(chart, start_jd, end_jd))):
+            calls["n"] = 0
+            start = time.perf_counter()
+            events = list(scan())
+            elapsed = time.perf_counter() - start
+            results[name] = events
+            print(f"{name:8s}: {len(events):5d} events  {elapsed:6.2f} s  {calls['n']:6d} position calls")
+    finally:
+        astrology_core.SwissEphemerisBackend.positions = positions
+
+    def key(ev):
+        return (ev["body"], ev["type"], ev.get("aspect"), ev.get("natal_point"), ev.get("sign"), ev.get("house"),
+                round(ev["jd_utc"] * 1440))
+    same = {key(ev) for ev in results["separate"]} == {key(ev) for ev in results["single"]}
+    print(f"same events: {same}")
+    return same
+
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    missed = check_stations()
+    same = bench_year_scan()
+    sys.exit(1 if missed or not same else 0)
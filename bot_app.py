@@ -18,6 +18,15 @@ import keyboards
 import state_manager 
 from handlers import astro_handlers, sajil_handlers 
 import astrology_core
+import time_conversion
+import chart_cache
+import chart_index
+import chart_executor
+import fixed_stars
+import interpretation_fragments
+import interpretation_cache
+import image_cache
+import image_encoding
 
 # --- تنظیمات ضروری ---
 BOT_TOKEN = os.environ.get("BOT_TOKEN")
@@ -60,6 +69,15 @@ async def handle_start_command(chat_id: int):
     await save_user_state(chat_id, state)
 
 
+async def handle_transit_subscription(chat_id: int, subscribed: bool):
+    """فعال/غیرفعال کردن پیام روزانه ترانزیت (دستورهای /transit_on و /transit_off)."""
+    if await state_manager.set_transit_subscription(chat_id, subscribed):
+        text = "✅ پیام روزانه ترانزیت فعال شد." if subscribed else "✅ پیام روزانه ترانزیت لغو شد. برای فعال‌سازی دوباره: /transit_on"
+    else:
+        text = "ℹ️ ابتدا از منوی اصلی چارت تولد خود را محاسبه کنید."
+    await utils.send_message(BOT_TOKEN, chat_id, utils.escape_markdown_v2(text), keyboards.main_menu_keyboard())
+
+
 async def handle_text_message(chat_id: int, text: str):
     """هندل کردن پیام‌های متنی بر اساس وضعیت فعلی کاربر."""
     state = await get_user_state(chat_id)
@@ -82,7 +100,10 @@ async def handle_text_message(chat_id: int, text: str):
             return 
 
         else:
-            msg = utils.escape_markdown_v2("❌ فرمت تاریخ نامعتبر است.\n لطفاً تاریخ را به صورت YYYY/MM/DD (مثلاً 1370/01/01) وارد کنید.")
+            msg = utils.escape_markdown_v2(
+                "❌ فرمت تاریخ نامعتبر است.\n لطفاً تاریخ را به صورت YYYY/MM/DD (مثلاً 1370/01/01) وارد کنید.\n"
+                f"سال‌های پشتیبانی‌شده: {time_conversion.JALALI_FIRST_YEAR} تا {time_conversion.JALALI_LAST_YEAR}"
+            )
             await utils.send_message(BOT_TOKEN, chat_id, msg)
             await save_user_state(chat_id, state) 
             return 
@@ -290,10 +311,15 @@ async def handle_callback_query(chat_id: int, callback_id: str, data: str):
 async def lifespan(app: FastAPI):
     # 💡 فراخوانی ایجاد دیتابیس در هنگام شروع برنامه
     await state_manager.init_db() 
+    await chart_cache.init_db()
+    await chart_index.init_db()
+    await interpretation_cache.init_db()
+    await image_cache.init_db()
+    # کلاینت HTTP مشترک تماس‌های Bot API (اتصال‌های keep-alive به api.telegram.org)
+    utils.start_http_client()
     print("INFO: FastAPI Bot Application Starting... Database initialized.")
-    # تنظیمات کتابخانه محاسباتی (اختیاری، اگر در astrology_core است)
+    # گرم کردن فایل‌های اپمریس (خواندن فایل‌های لازم و باز کردن آن‌ها در swisseph پیش از اولین درخواست)
     try:
-        # فرض می‌کنیم این خط تنظیمات سوپرامریس را انجام می‌دهد
         await astrology_core.setup_ephemeris()
         logging.info("✅ سوپرامریس (Swiss Ephemeris) با موفقیت تنظیم شد.")
     except AttributeError:
@@ -301,11 +327,35 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logging.error(f"Ephemeris setup failed: {e}")
 
+    # کاتالوگ ستارگان ثابت یک بار خوانده و به آرایه‌های NumPy تبدیل می‌شود
+    fixed_stars.load_catalogue()
+    # متن‌های تفسیر یک بار فراردهی (MarkdownV2) و به قطعه‌های بایتی تبدیل می‌شوند
+    interpretation_fragments.load()
+
+    # process pool محاسبه و ترسیم چارت (workers با swisseph و matplotlib از پیش بارگذاری‌شده)
+    chart_executor.start()
+    # calc_service (چارت نجومی) هنوز هندلری ندارد و اینجا شروع نمی‌شود تا process pool بی‌کار نسازد
+
     yield
     print("INFO: FastAPI Bot Application Shutting Down...")
+    await interpretation_cache.shutdown()
+    await image_cache.shutdown()
+    await chart_executor.shutdown()
+    await utils.close_http_client()
 
 app = FastAPI(lifespan=lifespan)
 
+@app.get(f"/{BOT_TOKEN}/stats")
+async def stats_handler():
+    """شمارنده‌های کش‌ها و صف محاسبه (مسیر با توکن بات محافظت می‌شود)."""
+    return {
+        "chart_cache": chart_cache.chart_cache.stats(),
+        "interpretation_cache": interpretation_cache.interpretation_cache.stats(),
+        "image_cache": image_cache.image_cache.stats(),
+        "image_encoding": image_encoding.metrics.stats(),
+        "chart_executor": chart_executor.chart_executor.stats(),
+    }
+
 @app.post(f"/{BOT_TOKEN}")
 async def webhook_handler(request: Request):
     """هندلر اصلی وب‌هوک تلگرام."""
@@ -319,6 +369,9 @@ async def webhook_handler(request: Request):
         
         if text.startswith('/start'):
             await handle_start_command(chat_id)
+
+        elif text.startswith('/transit_off') or text.startswith('/transit_on'):
+            await handle_transit_subscription(chat_id, subscribed=text.startswith('/transit_on'))
         
         else:
              state = await get_user_state(chat_id)
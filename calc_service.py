@@ -0,0 +1,295 @@
+# ----------------------------------------------------------------------
+# calc_service.py - محاسبه چارت با پیکربندی‌های مختلف swisseph (استوایی/نجومی) به صورت هم‌زمان
+#
+# swisseph وضعیت سراسری دارد (مسیر اپمریس با set_ephe_path، حالت نجومی و آیانامسا با set_sid_mode) و
+# این وضعیت برای هر thread جداست. بنابراین چارت استوایی و نجومی نمی‌توانند بدون تداخل از یک وضعیت مشترک
+# استفاده کنند. این سرویس برای هر پیکربندی (CalcConfig) یک process pool جدا دارد که workerهای آن
+# پیکربندی را یک بار هنگام شروع ثابت می‌کنند؛ هر درخواست به pool پیکربندی خودش فرستاده می‌شود.
+#   - پیکربندی استوایی پیش‌فرض به process pool اصلی chart_executor می‌رود (وقتی شروع شده باشد).
+#   - pool پیکربندی‌های دیگر هنگام اولین درخواست ساخته می‌شود (حداکثر CALC_MAX_POOLS)؛ CALC_PINNED_CONFIGS
+#     از ابتدا ساخته می‌شوند (مثلاً "sidereal:lahiri,sidereal:raman").
+#   - در غیر این صورت (سرویس شروع نشده یا سقف pool ها پر است) محاسبه در یک thread اختصاصی انجام می‌شود و
+#     پیکربندی زیر قفل عوض می‌شود؛ تعداد و زمان تعویض‌ها در stats ثبت می‌شود.
+#
+# سیستم خانه‌ها وضعیت سراسری نیست (ورودی se.houses_ex است)، پس هر worker هر سیستم خانه‌ای را محاسبه می‌کند.
+#
+# هر pool پیکربندی مانند chart_executor صف محدود دارد (CALC_WORKERS_PER_CONFIG + CALC_QUEUE_SIZE کار هم‌زمان؛
+# بیش از آن ChartExecutorBusy). هنوز هیچ هندلری از این سرویس استفاده نمی‌کند، پس bot_app آن را شروع نمی‌کند؛
+# قابلیتی که چارت نجومی ارائه دهد باید start/shutdown را در lifespan اضافه کند (benchmarks/bench_calc_service.py).
+# ----------------------------------------------------------------------
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, NamedTuple, Optional, List, Union
+
+import swisseph as se
+
+import astrology_core
+import chart_executor
+
+logging.basicConfig(level=logging.INFO)
+
+# --- تنظیمات (قابل تغییر با متغیرهای محیطی) ---
+CALC_PINNED_CONFIGS = os.environ.get("CALC_PINNED_CONFIGS", "")
+CALC_WORKERS_PER_CONFIG = int(os.environ.get("CALC_WORKERS_PER_CONFIG", "1"))
+CALC_MAX_POOLS = int(os.environ.get("CALC_MAX_POOLS", "3"))
+CALC_QUEUE_SIZE = int(os.environ.get("CALC_QUEUE_SIZE", str(chart_executor.CHART_QUEUE_SIZE)))
+
+# نام آیانامسا -> ثابت swisseph
+AYANAMSA_MODES = {
+    "lahiri": se.SIDM_LAHIRI,
+    "fagan_bradley": se.SIDM_FAGAN_BRADLEY,
+    "raman": se.SIDM_RAMAN,
+    "krishnamurti": se.SIDM_KRISHNAMURTI,
+    "true_citra": se.SIDM_TRUE_CITRA,
+}
+DEFAULT_AYANAMSA = "lahiri"
+
+
+class CalcConfig(NamedTuple):
+    """وضعیت سراسری swisseph که یک worker را مشخص می‌کند: زودیاک ('tropical' یا 'sidereal') و آیانامسا."""
+    zodiac: str = "tropical"
+    ayanamsa: Optional[str] = None
+
+    @property
+    def flags(self) -> int:
+        """پرچم‌های اضافی calc_ut برای این پیکربندی (zodiac_flags در astrology_core)."""
+        return se.FLG_SIDEREAL if self.zodiac == "sidereal" else 0
+
+    def __str__(self) -> str:
+        return self.zodiac if self.ayanamsa is None else f"{self.zodiac}:{self.ayanamsa}"
+
+
+TROPICAL = CalcConfig()
+
+
+def make_config(zodiac: str = "tropical", ayanamsa: Optional[str] = None) -> CalcConfig:
+    """ساخت CalcConfig معتبر؛ آیانامسای چارت استوایی نادیده گرفته می‌شود."""
+    zodiac = zodiac.lower()
+    if zodiac == "tropical":
+        return TROPICAL
+    if zodiac != "sidereal":
+        raise ValueError(f"Unknown zodiac '{zodiac}'. Use 'tropical' or 'sidereal'.")
+    ayanamsa = (ayanamsa or DEFAULT_AYANAMSA).lower()
+    if ayanamsa not in AYANAMSA_MODES:
+        raise ValueError(f"Unknown ayanamsa '{ayanamsa}'. Available: {list(AYANAMSA_MODES)}")
+    return CalcConfig("sidereal", ayanamsa)
+
+
+def parse_config(text: str) -> CalcConfig:
+    """'tropical' یا 'sidereal' یا 'sidereal:raman' -> CalcConfig."""
+    zodiac, _, ayanamsa = text.strip().partition(":")
+    return make_config(zodiac, ayanamsa or None)
+
+
+def apply_config(config: CalcConfig) -> None:
+    """تنظیم حالت نجومی swisseph در thread جاری (مسیر اپمریس جداگانه و فقط یک بار برای هر thread تنظیم می‌شود)."""
+    if config.zodiac == "sidereal":
+        se.set_sid_mode(AYANAMSA_MODES[config.ayanamsa], 0, 0)
+    else:
+        # بازگشت به پیش‌فرض swisseph؛ روی چارت استوایی اثری ندارد ولی get_ayanamsa_ut را قابل پیش‌بینی نگه می‌دارد
+        se.set_sid_mode(se.SIDM_FAGAN_BRADLEY, 0, 0)
+
+
+# --- کد سمت worker (هر پردازه یک پیکربندی ثابت دارد) ---
+
+_worker_config: Optional[CalcConfig] = None
+
+
+def _init_calc_worker(config: CalcConfig):
+    """ثابت کردن پیکربندی swisseph و گرم کردن فایل‌های اپمریس و کاتالوگ ستارگان در worker."""
+    global _worker_config
+    import fixed_stars
+    import ephemeris_files
+    fixed_stars.load_catalogue()
+    ephemeris_files.warm_up()
+    apply_config(config)
+    _worker_config = config
+    astrology_core.compute_chart_arrays(2451545.0, 0.0, 0.0, b'P', "swisseph", config.flags)
+
+
+def _calculate_job(config: CalcConfig, args: tuple, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    global _worker_config
+    if config != _worker_config:
+        # فقط در صورت اشتباه در مسیریابی رخ می‌دهد؛ نتیجه با پیکربندی درست محاسبه می‌شود
+        logging.warning(f"Calc worker pinned to '{_worker_config}' received '{config}'; switching.")
+        apply_config(config)
+        _worker_config = config
+    return astrology_core.calculate_natal_chart(*args, zodiac_flags=config.flags, **kwargs)
+
+
+# --- محاسبه با تعویض پیکربندی زیر قفل ---
+
+class SwitchingCalculator:
+    """
+    یک thread اختصاصی که پیکربندی را پیش از هر محاسبه در صورت نیاز عوض می‌کند.
+    قفل تعویض پیکربندی و محاسبه را یکجا نگه می‌دارد تا هیچ چارتی با پیکربندی دیگری محاسبه نشود.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.jobs = 0
+        self.switches = 0
+        self.switch_seconds = 0.0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        return self._executor
+
+    def calculate(self, config: CalcConfig, args: tuple, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            if not getattr(self._local, "path_set", False):
+                chart_executor._init_thread()
+                self._local.path_set = True
+            if getattr(self._local, "config", None) != config:
+                start = time.perf_counter()
+                apply_config(config)
+                self.switch_seconds += time.perf_counter() - start
+                self.switches += 1
+                self._local.config = config
+            self.jobs += 1
+            return astrology_core.calculate_natal_chart(*args, zodiac_flags=config.flags, **kwargs)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+# --- کد سمت حلقه رویداد ---
+
+class CalcService:
+    """مسیریابی درخواست‌ها به pool پیکربندی مطابق یا به SwitchingCalculator."""
+
+    def __init__(self, workers_per_config: int = CALC_WORKERS_PER_CONFIG, max_pools: int = CALC_MAX_POOLS,
+                 job_timeout: float = chart_executor.CHART_JOB_TIMEOUT_SECONDS, queue_size: int = CALC_QUEUE_SIZE):
+        self.workers_per_config = max(1, workers_per_config)
+        self.max_pools = max(0, max_pools)
+        self.job_timeout = job_timeout
+        self.queue_size = max(0, queue_size)
+        self._pools: Dict[CalcConfig, ProcessPoolExecutor] = {}
+        # جای کارهای هر pool (مانند chart_executor تا پایان واقعی کار در worker نگه داشته می‌شود)
+        self._slots: Dict[CalcConfig, asyncio.Semaphore] = {}
+        self.rejected = 0
+        self._switching = SwitchingCalculator()
+        self._running = False
+        self.routes: Dict[str, int] = {"chart_executor": 0, "pinned": 0, "switched": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self, configs: Union[str, List[CalcConfig]] = CALC_PINNED_CONFIGS):
+        if isinstance(configs, str):
+            configs = [parse_config(c) for c in configs.split(",") if c.strip()]
+        self._running = True
+        for config in configs:
+            if config not in self._pools and len(self._pools) < self.max_pools:
+                self._start_pool(config)
+        logging.info(f"Calc service started: pinned pools {[str(c) for c in self._pools]}, max {self.max_pools}.")
+
+    def _start_pool(self, config: CalcConfig) -> ProcessPoolExecutor:
+        pool = ProcessPoolExecutor(max_workers=self.workers_per_config, initializer=_init_calc_worker, initargs=(config,))
+        for _ in range(self.workers_per_config):
+            pool.submit(int)
+        self._pools[config] = pool
+        logging.info(f"Calc pool for '{config}' started with {self.workers_per_config} workers.")
+        return pool
+
+    async def shutdown(self):
+        self._running = False
+        pools, self._pools = list(self._pools.values()), {}
+        loop = asyncio.get_running_loop()
+        for pool in pools:
+            await loop.run_in_executor(None, lambda p=pool: p.shutdown(wait=True, cancel_futures=True))
+        await loop.run_in_executor(None, self._switching.shutdown)
+        logging.info("Calc service stopped.")
+
+    async def calculate_natal_chart(self, config: CalcConfig, *args, timeout: Optional[float] = None, **kwargs) -> Dict[str, Any]:
+        """معادل astrology_core.calculate_natal_chart با پیکربندی config."""
+        timeout = timeout or self.job_timeout
+        if config == TROPICAL and chart_executor.chart_executor.running:
+            self.routes["chart_executor"] += 1
+            return await chart_executor.calculate_natal_chart(*args, timeout=timeout, **kwargs)
+
+        pool = self._pools.get(config)
+        if pool is None and self._running and len(self._pools) < self.max_pools:
+            pool = self._start_pool(config)
+        if pool is None:
+            self.routes["switched"] += 1
+            future = self._switching.executor.submit(self._switching.calculate, config, args, kwargs)
+        else:
+            slots = self._slots.setdefault(config, asyncio.Semaphore(self.workers_per_config + self.queue_size))
+            if slots.locked():
+                self.rejected += 1
+                raise chart_executor.ChartExecutorBusy(f"'{config}' queue is full ({self.workers_per_config + self.queue_size} jobs in flight).")
+            await slots.acquire()
+            self.routes["pinned"] += 1
+            try:
+                try:
+                    future = pool.submit(_calculate_job, config, args, kwargs)
+                except BrokenProcessPool:
+                    pool = self._restart_pool(config, pool)
+                    future = pool.submit(_calculate_job, config, args, kwargs)
+            except BaseException:
+                slots.release()
+                raise
+            loop = asyncio.get_running_loop()
+            future.add_done_callback(lambda _: chart_executor._release_slot(loop, slots))
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise chart_executor.ChartJobTimeout(f"'{config}' chart exceeded {timeout:.0f}s.")
+        except BrokenProcessPool:
+            if pool is not None:
+                self._restart_pool(config, pool)
+            raise
+
+    def _restart_pool(self, config: CalcConfig, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """جایگزینی pool خراب؛ اگر درخواست دیگری آن را قبلاً جایگزین کرده باشد همان pool جدید برگردانده می‌شود."""
+        current = self._pools.get(config)
+        if current is not None and current is not broken:
+            return current
+        logging.error(f"Calc worker for '{config}' died; restarting its process pool.")
+        self._pools.pop(config, None)
+        broken.shutdown(wait=False, cancel_futures=True)
+        return self._start_pool(config)
+
+    def stats(self) -> Dict[str, Any]:
+        switching = self._switching
+        return {
+            "pools": [str(c) for c in self._pools],
+            "routes": dict(self.routes),
+            "rejected": self.rejected,
+            "switched_jobs": switching.jobs,
+            "switches": switching.switches,
+            "switch_ms_total": switching.switch_seconds * 1000,
+            "switch_ms_mean": switching.switch_seconds * 1000 / switching.switches if switching.switches else 0.0,
+        }
+
+
+# نمونه سراسری (تا زمانی که هندلری از آن استفاده کند در lifespan شروع نمی‌شود)
+calc_service = CalcService()
+
+
+def start():
+    calc_service.start()
+
+
+async def shutdown():
+    await calc_service.shutdown()
+
+
+async def calculate_natal_chart(config: CalcConfig, *args, **kwargs) -> Dict[str, Any]:
+    return await calc_service.calculate_natal_chart(config, *args, **kwargs)
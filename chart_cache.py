@@ -0,0 +1,214 @@
+# ----------------------------------------------------------------------
+# chart_cache.py - کش دو لایه نتایج چارت تولد
+# لایه 1: LRU درون‌پردازه‌ای با محدودیت اندازه و TTL
+# لایه 2: جدول aiosqlite که پس از ری‌استارت هم باقی می‌ماند
+# هر دو لایه چارت را به شکل فشرده ChartResult (آرایه float64) نگه می‌دارند؛ لایه 2 خروجی to_bytes را ذخیره می‌کند.
+# کلید فقط برای موقعیت اجسام گرد می‌شود: در hit، خانه‌ها، آسندانت و سهم سعادت برای لحظه و مختصات دقیق
+# درخواست دوباره محاسبه می‌شوند (se.houses_ex، چند ده میکروثانیه). خطای باقی‌مانده فقط در اجسام است
+# (حداکثر نیم دقیقه زمان؛ ماه حدود 16 ثانیه قوس، بقیه کمتر) که برج و خانه را عملاً تغییر نمی‌دهد.
+# ----------------------------------------------------------------------
+
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Union, Callable, Awaitable
+
+import aiosqlite
+
+import astrology_core
+import chart_executor
+import chart_result
+import state_manager
+
+logging.basicConfig(level=logging.INFO)
+
+# --- تنظیمات (قابل تغییر با متغیرهای محیطی) ---
+CHART_CACHE_MAX_SIZE = int(os.environ.get("CHART_CACHE_MAX_SIZE", "2048"))
+CHART_CACHE_TTL_SECONDS = float(os.environ.get("CHART_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# دقت گرد کردن لحظه تولد (دقیقه) و مختصات (تعداد رقم اعشار)
+CHART_CACHE_JD_RESOLUTION_MINUTES = float(os.environ.get("CHART_CACHE_JD_RESOLUTION_MINUTES", "1"))
+CHART_CACHE_COORD_DECIMALS = int(os.environ.get("CHART_CACHE_COORD_DECIMALS", "2"))
+# با مقدار 0 لایه دوم (دیتابیس) غیرفعال می‌شود
+CHART_CACHE_PERSISTENT = os.environ.get("CHART_CACHE_PERSISTENT", "1") != "0"
+
+
+class ChartCache:
+    """کش چارت با کلید (JD گرد شده، عرض و طول گرد شده، سیستم خانه، پرچم‌ها)."""
+
+    def __init__(self, max_size: int = CHART_CACHE_MAX_SIZE, ttl_seconds: float = CHART_CACHE_TTL_SECONDS,
+                 jd_resolution_minutes: float = CHART_CACHE_JD_RESOLUTION_MINUTES,
+                 coord_decimals: int = CHART_CACHE_COORD_DECIMALS,
+                 db_path: Optional[str] = state_manager.DATABASE_NAME if CHART_CACHE_PERSISTENT else None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.jd_resolution = jd_resolution_minutes / 1440.0
+        self.coord_decimals = coord_decimals
+        self.db_path = db_path
+        # key -> (زمان ذخیره، ChartResult)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.counters = {'l1_hits': 0, 'l2_hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0}
+
+    # --- کلید ---
+    def make_key(self, jd_utc: float, latitude: float, longitude: float, house_system: Union[bytes, str] = b'P', flags: int = astrology_core.CALC_FLAGS) -> str:
+        """ساخت کلید نرمال‌شده کش."""
+        if isinstance(house_system, bytes):
+            house_system = house_system.decode()
+        jd_bucket = round(jd_utc / self.jd_resolution)
+        lat = round(float(latitude), self.coord_decimals)
+        lon = round(float(longitude), self.coord_decimals)
+        return f"v{astrology_core.CHART_SCHEMA_VERSION}|{jd_bucket}|{lat:.{self.coord_decimals}f}|{lon:.{self.coord_decimals}f}|{house_system}|{flags}"
+
+    # --- لایه 1 ---
+    def _get_l1(self, key: str) -> Optional[chart_result.ChartResult]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, chart = entry
+        if time.time() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            self.counters['expired'] += 1
+            return None
+        self._entries.move_to_end(key)
+        return chart
+
+    def _put_l1(self, key: str, chart: chart_result.ChartResult, stored_at: Optional[float] = None):
+        self._entries[key] = (stored_at if stored_at is not None else time.time(), chart)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    # --- لایه 2 ---
+    async def init_db(self):
+        """ایجاد جدول ChartResults و حذف رکوردهای منقضی (جدول JSON قدیمی ChartCache حذف می‌شود)."""
+        if not self.db_path:
+            return
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("DROP TABLE IF EXISTS ChartCache")
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS ChartResults (
+                    cache_key TEXT PRIMARY KEY,
+                    chart_blob BLOB NOT NULL,
+                    stored_at REAL NOT NULL
+                )
+            """)
+            await db.execute("DELETE FROM ChartResults WHERE stored_at < ?", (time.time() - self.ttl_seconds,))
+            await db.commit()
+
+    async def _get_l2(self, key: str) -> Optional[tuple]:
+        if not self.db_path:
+            return None
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                async with db.execute("SELECT chart_blob, stored_at FROM ChartResults WHERE cache_key = ?", (key,)) as cursor:
+                    row = await cursor.fetchone()
+        except Exception as e:
+            logging.error(f"Chart cache read failed: {e}")
+            return None
+        if not row or time.time() - row[1] > self.ttl_seconds:
+            return None
+        try:
+            return chart_result.ChartResult.from_bytes(row[0]), row[1]
+        except ValueError as e:
+            logging.warning(f"Discarding unreadable chart cache entry {key}: {e}")
+            return None
+
+    async def _put_l2(self, key: str, chart: chart_result.ChartResult, stored_at: float):
+        if not self.db_path:
+            return
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.execute(
+                    """
+                    INSERT INTO ChartResults (cache_key, chart_blob, stored_at) VALUES (?, ?, ?)
+                    ON CONFLICT(cache_key) DO UPDATE SET chart_blob = excluded.chart_blob, stored_at = excluded.stored_at
+                    """,
+                    (key, chart.to_bytes(), stored_at)
+                )
+                await db.commit()
+        except Exception as e:
+            logging.error(f"Chart cache write failed: {e}")
+
+    # --- رابط عمومی ---
+    async def get(self, key: str) -> Optional[chart_result.ChartResult]:
+        """جستجو در لایه 1 و سپس لایه 2 (و ارتقای نتیجه لایه 2 به لایه 1)."""
+        chart = self._get_l1(key)
+        if chart is not None:
+            self.counters['l1_hits'] += 1
+            return chart
+        found = await self._get_l2(key)
+        if found is not None:
+            chart, stored_at = found
+            self.counters['l2_hits'] += 1
+            self._put_l1(key, chart, stored_at)
+            return chart
+        self.counters['misses'] += 1
+        return None
+
+    async def put(self, key: str, chart: Union[chart_result.ChartResult, Dict[str, Any]], house_system: Union[bytes, str] = b'P'):
+        """house_system: سیستم خانه‌ای که چارت دیکشنری با آن محاسبه شده است (در خروجی calculate_natal_chart نیست)."""
+        if isinstance(chart, dict):
+            chart = chart_result.ChartResult.from_dict(chart, house_system=house_system)
+        stored_at = time.time()
+        self._put_l1(key, chart, stored_at)
+        await self._put_l2(key, chart, stored_at)
+
+    def clear(self):
+        """پاک کردن لایه 1 (لایه 2 دست نخورده می‌ماند)."""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """شمارنده‌های hit/miss برای تعیین اندازه مناسب کش."""
+        lookups = self.counters['l1_hits'] + self.counters['l2_hits'] + self.counters['misses']
+        hits = self.counters['l1_hits'] + self.counters['l2_hits']
+        return {
+            **self.counters,
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'lookups': lookups,
+            'hit_rate': hits / lookups if lookups else 0.0,
+        }
+
+
+# نمونه پیش‌فرض مورد استفاده هندلرها
+chart_cache = ChartCache()
+
+
+async def init_db():
+    """ایجاد جدول کش (از lifespan در bot_app فراخوانی می‌شود)."""
+    await chart_cache.init_db()
+
+
+async def calculate_natal_chart_cached(birth_date_jalali: str, birth_time_str: str, city_name: str, latitude: Union[float, int], longitude: Union[float, int], timezone_str: str, house_system: bytes = b'P', cache: Optional[ChartCache] = None,
+                                       compute: Optional[Callable[..., Awaitable[Dict[str, Any]]]] = None) -> Dict[str, Any]:
+    """
+    نسخه کش‌شده astrology_core.calculate_natal_chart با همان ورودی و خروجی.
+    چارت‌های دارای خطا کش نمی‌شوند. در hit فقط اجسام از کش می‌آیند و خانه‌ها برای jd_utc، عرض و طول
+    دقیق همین درخواست محاسبه می‌شوند.
+    compute: تابع async محاسبه در صورت عدم وجود در کش؛ پیش‌فرض chart_executor.calculate_natal_chart
+    (process pool، یا thread pool اگر executor شروع نشده باشد) تا حلقه رویداد مسدود نشود.
+    """
+    cache = cache or chart_cache
+    compute = compute or chart_executor.calculate_natal_chart
+    try:
+        jd_utc, _ = astrology_core.local_to_jd_utc(birth_date_jalali, birth_time_str, timezone_str)
+    except Exception:
+        # پیام خطای استاندارد را خود تابع اصلی تولید می‌کند
+        return await compute(birth_date_jalali, birth_time_str, city_name, latitude, longitude, timezone_str, house_system)
+
+    key = cache.make_key(jd_utc, latitude, longitude, house_system)
+    chart = await cache.get(key)
+    if chart is None:
+        chart = await compute(birth_date_jalali, birth_time_str, city_name, latitude, longitude, timezone_str, house_system)
+        if 'error' in chart:
+            return chart
+        await cache.put(key, chart, house_system)
+        return chart
+
+    # چارت تازه برای هر درخواست با خانه‌های لحظه و مختصات دقیق همین کاربر
+    cusps, angles, house_error = astrology_core.compute_houses(jd_utc, latitude, longitude, house_system)
+    result = chart.with_houses(jd_utc, latitude, longitude, cusps, angles, city_name, house_error).to_dict()
+    result['latitude'] = latitude
+    result['longitude'] = longitude
+    return result
@@ -3,9 +3,18 @@ import matplotlib.pyplot as plt
 import math
 from typing import Dict, Any, List, Tuple, Union
 import io
+import os
+import threading
 import matplotlib.font_manager as fm
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.transforms import IdentityTransform
+from PIL import Image
 import logging
 
+import image_encoding
+
 logging.basicConfig(level=logging.INFO)
 
 # 💥💥💥 تغییر حیاتی: ساده‌سازی تنظیم فونت برای جلوگیری از کرش در زمان Import 💥💥💥
@@ -28,36 +37,13 @@ except Exception as e:
 
 # --- 1. نمادها و ثابت‌های گرافیکی فارسی ---
 
-# نام و نماد برج‌های فلکی (Zodiac Signs) - نام‌ها برای برچسب‌گذاری
-SIGN_NAMES_FA = [
-    'حمل ♈', 'ثور ♉', 'جوزا ♊', 'سرطان ♋', 'اسد ♌', 'سنبله ♍', 
-    'میزان ♎', 'عقرب ♏', 'قوس ♐', 'جدی ♑', 'دلو ♒', 'حوت ♓'
-]
-
-# نمادهای Unicode برای سیارات و نقاط
-PLANET_SYMBOLS = {
-    'sun': '☉', 'moon': '☽', 'mercury': '☿', 'venus': '♀', 'mars': '♂',
-    'jupiter': '♃', 'saturn': '♄', 'uranus': '⛢', 'neptune': '♆', 'pluto': '♇',
-    'true_node': '☊', 'part_of_fortune': '⨳'
-}
-
-# نام‌های فارسی برای زوایا (Aspects)
-ASPECT_NAMES_FA = {
-    "Conjunction": 'اتصال',  # 0°
-    "Sextile": 'تثلیث کوچک',# 60°
-    "Square": 'تربیع',      # 90°
-    "Trine": 'تثلیث',       # 120°
-    "Opposition": 'مقابله',  # 180°
-}
-
-# رنگ‌های استاندارد برای زوایا (Aspects)
-ASPECT_COLORS = {
-    "Conjunction": 'black', 
-    "Sextile": 'blue',      
-    "Square": 'red',        
-    "Trine": 'green',       
-    "Opposition": 'orange', 
-}
+# نمادها، رنگ‌ها و شعاع حلقه‌ها در chart_layout تعریف شده‌اند (مشترک با chart_drawer_svg)
+from chart_layout import (  # noqa: E402
+    SIGN_NAMES_FA, PLANET_SYMBOLS, ASPECT_NAMES_FA, ASPECT_COLORS, ELEMENT_COLORS,
+    R_ZODIAC, R_HOUSES, R_PLANETS, R_ASPECTS, R_LIMIT,
+    SIGN_FONT_SIZE, PLANET_FONT_SIZE, HOUSE_FONT_SIZE, DEGREE_FONT_SIZE,
+    format_degree_in_sign, sign_glyph, wheel_overlay,
+)
 
 # --- 2. توابع کمکی ---
 
@@ -82,33 +68,139 @@ def get_degree_in_sign(degree: float) -> str:
     return f"{int(deg_in_sign)}° {int(minutes)}'"
 
 # --- 3. تابع اصلی ترسیم چارت ---
-
-def draw_chart_wheel_fa(chart_data: Dict[str, Any]) -> io.BytesIO:
-    """
-    نمودار دایره‌ای چارت تولد را با برچسب‌های فارسی رسم می‌کند.
-
-    بازگشت: یک شیء باینری (BytesIO) حاوی تصویر PNG.
-    """
-    
-    fig, ax = plt.subplots(figsize=(10, 10), subplot_kw={'projection': 'polar'})
+#
+# لایه‌های ثابت چرخ (حلقه برج‌ها، حلقه خانه‌ها، مرز و نماد برج‌ها، درجه‌بندی) به چارت وابسته نیستند:
+# یک بار در هر thread روی یک بوم Agg رسم و به صورت raster (copy_from_bbox) نگه داشته می‌شوند.
+# برای هر چارت همان raster بازگردانده (restore_region) و فقط کاسپ‌ها، سیارات، زوایا و برچسب‌ها
+# روی آن رسم (draw_artist) و سپس از محورها حذف می‌شوند؛ بنابراین هیچ شکلی باقی نمی‌ماند
+# (شکل‌ها با matplotlib.figure.Figure و نه pyplot ساخته می‌شوند و در فهرست سراسری pyplot نیستند).
+# نمادهای برج‌ها بدون نام فارسی رسم می‌شوند: matplotlib حروف فارسی را به هم نمی‌چسباند (بدون shaping).
+
+# با 0 برای هر چارت یک شکل کامل ساخته و پس از رسم آزاد می‌شود (برای مقایسه در benchmarks/bench_chart_drawer.py)
+CHART_WHEEL_CACHE = os.environ.get("CHART_WHEEL_CACHE", "1") == "1"
+
+FIGURE_SIZE = (10, 10)
+# اندازه پیکسلی تصویر = FIGURE_SIZE * FIGURE_DPI (CHART_IMAGE_SIZE در image_encoding)
+FIGURE_DPI = image_encoding.CHART_IMAGE_SIZE / FIGURE_SIZE[0]
+
+def _draw_static_layers(ax):
+    """لایه‌های ثابت چرخ (مشترک همه چارت‌ها)."""
     ax.set_theta_zero_location("W")  # 0 درجه در سمت چپ (غرب/آسندانت) قرار می‌گیرد
     ax.set_theta_direction(-1)       # چرخش ساعتگرد (جهت استاندارد نجومی)
-    ax.set_xticks(np.deg2rad(np.arange(0, 360, 30))) 
-    ax.set_xticklabels([]) 
-    ax.set_yticks([]) 
-    ax.set_ylim(0, 1.2) 
-
-    # --- متغیرهای شعاعی ---
-    R_ZODIAC = 1.0     # شعاع دایره بیرونی (برج‌ها)
-    R_HOUSES = 0.8     # شعاع دایره داخلی (خانه‌ها)
-    R_PLANETS = 0.6    # شعاع حلقه سیارات
-    R_ASPECTS = 0.4    # شعاع داخلی برای رسم زوایا (Aspects)
+    ax.set_xticks(np.deg2rad(np.arange(0, 360, 30)))
+    ax.set_xticklabels([])
+    ax.set_yticks([])
+    ax.set_ylim(0, R_LIMIT)
+    # مرز برج‌ها جداگانه رسم می‌شود؛ شبکه و قاب قطبی محور فقط شلوغی اضافه می‌کنند
+    ax.grid(False)
+    ax.spines['polar'].set_visible(False)
 
     # 1. رسم دایره‌های اصلی
-    ax.plot(np.linspace(0, 2*np.pi, 100), np.full(100, R_ZODIAC), color='gray', linewidth=1)
-    ax.plot(np.linspace(0, 2*np.pi, 100), np.full(100, R_HOUSES), color='black', linewidth=1.5)
+    circle = np.linspace(0, 2 * np.pi, 361)
+    ax.plot(circle, np.full(circle.size, R_ZODIAC), color='gray', linewidth=1)
+    ax.plot(circle, np.full(circle.size, R_HOUSES), color='black', linewidth=1.5)
     # دایره داخلی برای زوایا
-    ax.plot(np.linspace(0, 2*np.pi, 100), np.full(100, R_ASPECTS), color='gray', linestyle='--', linewidth=0.5)
+    ax.plot(circle, np.full(circle.size, R_ASPECTS), color='gray', linestyle='--', linewidth=0.5)
+
+    # 2. مرز برج‌ها، درجه‌بندی 5 درجه‌ای و نماد هر برج در میانه حلقه برج‌ها
+    for degree in range(0, 360, 5):
+        inner = R_HOUSES if degree % 30 == 0 else R_ZODIAC - 0.03
+        ax.plot([np.deg2rad(degree)] * 2, [inner, R_ZODIAC], color='gray', linewidth=1 if degree % 30 == 0 else 0.5)
+    for i, name in enumerate(SIGN_NAMES_FA):
+        ax.text(np.deg2rad(i * 30 + 15), (R_ZODIAC + R_HOUSES) / 2, sign_glyph(i),
+                fontsize=SIGN_FONT_SIZE, ha='center', va='center', color=ELEMENT_COLORS[i % 4])
+
+
+def _overlay_artists(ax, chart_data: Dict[str, Any]) -> list:
+    """عناصر وابسته به چارت (chart_layout.wheel_overlay)، افزوده به ax برای رسم تکی."""
+    overlay = wheel_overlay(chart_data)
+    texts = [ax.text(np.deg2rad(degree), R_ASPECTS + 0.05, label,
+                     fontsize=HOUSE_FONT_SIZE, ha='center', va='center', color='dimgray')
+             for degree, label in overlay['house_labels']]
+    for _, display, symbol, color, label in overlay['planets']:
+        texts.append(ax.text(np.deg2rad(display), R_PLANETS + 0.05, symbol,
+                             fontsize=PLANET_FONT_SIZE, ha='center', va='center', color=color))
+        texts.append(ax.text(np.deg2rad(display), R_PLANETS - 0.06, label,
+                             fontsize=DEGREE_FONT_SIZE, ha='center', va='center', color='dimgray'))
+
+    cusp_lines = [[(np.deg2rad(degree), R_ASPECTS), (np.deg2rad(degree), outer)] for degree, outer, _ in overlay['cusps']]
+    planet_ticks = [[(np.deg2rad(degree), R_HOUSES - 0.03), (np.deg2rad(degree), R_HOUSES)]
+                    for degree, *_ in overlay['planets']]
+    # وتر مستقیم بین دو نقطه روی دایره زوایا (در مختصات پیکسل، چون خط قطبی منحنی رسم می‌شود)
+    aspects = overlay['aspects']
+    aspect_lines = ax.transData.transform(
+        [(np.deg2rad(degree), R_ASPECTS) for p1, p2, _ in aspects for degree in (p1, p2)]
+    ).reshape(-1, 2, 2) if aspects else []
+
+    # خط‌ها به صورت چند مجموعه (هر مجموعه یک artist) رسم می‌شوند
+    collections = [
+        LineCollection(cusp_lines, colors='black', linewidths=[width for *_, width in overlay['cusps']],
+                       transform=ax.transData),
+        LineCollection(planet_ticks, colors='black', linewidths=1.5, transform=ax.transData),
+        LineCollection(aspect_lines, colors=[color for *_, color in aspects],
+                       linewidths=1.0, alpha=0.8, transform=IdentityTransform()),
+    ]
+    return [ax.add_collection(c, autolim=False) for c in collections] + texts
+
+
+class WheelCanvas:
+    """بوم Agg با لایه‌های ثابت رسم‌شده و raster آن‌ها؛ هر thread نمونه خود را دارد (بوم‌ها thread-safe نیستند)."""
+
+    def __init__(self):
+        self.figure = Figure(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_subplot(projection='polar')
+        _draw_static_layers(self.ax)
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+
+    def render(self, chart_data: Dict[str, Any]) -> Image.Image:
+        """رسم لایه چارت روی raster ثابت؛ عناصر چارت در هر حالت (حتی با خطا) از محورها حذف می‌شوند."""
+        self.canvas.restore_region(self.background)
+        artists = []
+        try:
+            artists = _overlay_artists(self.ax, chart_data)
+            for artist in artists:
+                self.ax.draw_artist(artist)
+            # convert یک کپی از بافر بوم می‌سازد (بوم برای چارت بعدی دوباره استفاده می‌شود)
+            return Image.frombuffer("RGBA", self.canvas.get_width_height(), self.canvas.buffer_rgba(),
+                                    "raw", "RGBA", 0, 1).convert("RGB")
+        finally:
+            for artist in artists:
+                artist.remove()
+
+    def close(self):
+        self.figure.clear()
+        self.background = None
+
+
+_local = threading.local()
+
+
+def get_wheel_canvas() -> WheelCanvas:
+    """بوم کش‌شده thread جاری (در اولین استفاده ساخته می‌شود)."""
+    wheel = getattr(_local, 'wheel', None)
+    if wheel is None:
+        wheel = _local.wheel = WheelCanvas()
+    return wheel
+
+
+def render_wheel_image(chart_data: Dict[str, Any]) -> Image.Image:
+    """تصویر رسم‌شده چرخ (پیش از رمزگذاری در image_encoding)."""
+    if CHART_WHEEL_CACHE:
+        return get_wheel_canvas().render(chart_data)
+    wheel = WheelCanvas()
+    try:
+        return wheel.render(chart_data)
+    finally:
+        wheel.close()
 
 
-    # 2. رسم و بر
+def draw_chart_wheel_fa(chart_data: Dict[str, Any]) -> io.BytesIO:
+    """
+    نمودار دایره‌ای چارت تولد را با برچسب‌های فارسی رسم می‌کند.
+
+    بازگشت: یک شیء باینری (BytesIO) حاوی تصویر با قالب CHART_IMAGE_FORMAT (پیش‌فرض PNG پالتی).
+    """
+    data, _ = image_encoding.encode(render_wheel_image(chart_data))
+    return io.BytesIO(data)
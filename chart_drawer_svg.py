@@ -0,0 +1,209 @@
+# ----------------------------------------------------------------------
+# chart_drawer_svg.py - رسام سبک چرخ چارت بدون matplotlib (SVG و raster با Pillow)
+#
+# همان چرخ chart_drawer_fa (حلقه‌ها، نماد برج‌ها، نماد سیارات، وتر زوایا با ASPECT_COLORS) از روی
+# chart_layout به صورت فهرستی از شکل‌های ساده (دایره، خط، متن) ساخته می‌شود. همین فهرست هم به SVG
+# (render_svg) و هم با ابزارهای رسم Pillow (ImageDraw) به PNG (draw_chart_wheel_svg) تبدیل می‌شود؛
+# وارد کردن matplotlib و ساخت محور قطبی لازم نیست.
+#
+# لایه‌های ثابت یک بار در هر thread رسم می‌شوند و هر چارت روی یک کپی آن‌ها رسم می‌شود (مانند chart_drawer_fa).
+# Pillow خط و دایره را بدون anti-aliasing رسم می‌کند؛ با CHART_SVG_SUPERSAMPLE=2 تصویر در دو برابر اندازه
+# رسم و سپس کوچک می‌شود (لبه‌های نرم‌تر، کندتر). شفافیت وتر زوایا فقط در خروجی SVG اعمال می‌شود.
+#
+# انتخاب رسام: CHART_RENDERER=svg در chart_executor (پیش‌فرض: matplotlib).
+# ----------------------------------------------------------------------
+
+import os
+import io
+import math
+import logging
+import threading
+import importlib.util
+from typing import Dict, Any, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from PIL import Image, ImageDraw, ImageFont
+
+import image_encoding
+from chart_layout import (
+    ELEMENT_COLORS, R_ZODIAC, R_HOUSES, R_PLANETS, R_ASPECTS, R_LIMIT,
+    SIGN_FONT_SIZE, PLANET_FONT_SIZE, HOUSE_FONT_SIZE, DEGREE_FONT_SIZE,
+    sign_glyph, wheel_overlay,
+)
+
+logging.basicConfig(level=logging.INFO)
+
+# --- تنظیمات (قابل تغییر با متغیرهای محیطی) ---
+CHART_SVG_SIZE = int(os.environ.get("CHART_SVG_SIZE", str(image_encoding.CHART_IMAGE_SIZE)))
+CHART_SVG_SUPERSAMPLE = int(os.environ.get("CHART_SVG_SUPERSAMPLE", "1"))
+# فونت با نمادهای نجومی (DejaVu Sans)؛ در صورت نبود از مسیرهای سیستم یا فونت همراه matplotlib (بدون import آن)
+CHART_FONT_PATH = os.environ.get("CHART_FONT_PATH", "")
+
+FONT_FAMILY = "DejaVu Sans"
+# نسبت شعاع R_LIMIT به اندازه تصویر (حاشیه مانند شکل matplotlib)
+WHEEL_RADIUS_FRACTION = 0.385
+# تبدیل point به پیکسل در اندازه 1000 (همان dpi=100 شکل 10 اینچی chart_drawer_fa)
+POINTS_PER_IMAGE = 720.0
+
+# شکل‌ها: ('circle', شعاع، رنگ، ضخامت، خط‌چین) / ('line', نقطه1، نقطه2، رنگ، ضخامت، شفافیت) / ('text', نقطه، متن، اندازه، رنگ)
+Shape = tuple
+
+
+def find_font_path() -> Optional[str]:
+    candidates = [
+        CHART_FONT_PATH,
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+        "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    ]
+    spec = importlib.util.find_spec("matplotlib")
+    if spec and spec.submodule_search_locations:
+        candidates.append(os.path.join(list(spec.submodule_search_locations)[0], "mpl-data", "fonts", "ttf", "DejaVuSans.ttf"))
+    for path in candidates:
+        if path and os.path.exists(path):
+            return path
+    return None
+
+
+def _point(degree: float, radius: float) -> Tuple[float, float]:
+    """مختصات واحد (مرکز 0.5، 0.5؛ محور y رو به پایین) یک درجه دایره‌البروجی؛ 0 در چپ، افزایش ساعتگرد."""
+    theta = math.radians(degree)
+    scale = WHEEL_RADIUS_FRACTION / R_LIMIT
+    return 0.5 - radius * scale * math.cos(theta), 0.5 - radius * scale * math.sin(theta)
+
+
+def static_shapes() -> List[Shape]:
+    """لایه‌های ثابت چرخ (مشترک همه چارت‌ها)."""
+    shapes: List[Shape] = [
+        ('circle', R_ZODIAC, 'gray', 1.0, False),
+        ('circle', R_HOUSES, 'black', 1.5, False),
+        ('circle', R_ASPECTS, 'gray', 0.5, True),
+    ]
+    for degree in range(0, 360, 5):
+        inner = R_HOUSES if degree % 30 == 0 else R_ZODIAC - 0.03
+        shapes.append(('line', _point(degree, inner), _point(degree, R_ZODIAC), 'gray', 1.0 if degree % 30 == 0 else 0.5, 1.0))
+    for i in range(12):
+        shapes.append(('text', _point(i * 30 + 15, (R_ZODIAC + R_HOUSES) / 2), sign_glyph(i), SIGN_FONT_SIZE, ELEMENT_COLORS[i % 4]))
+    return shapes
+
+
+def overlay_shapes(chart_data: Dict[str, Any]) -> List[Shape]:
+    """لایه وابسته به چارت (chart_layout.wheel_overlay)."""
+    overlay = wheel_overlay(chart_data)
+    shapes: List[Shape] = []
+    for degree, outer, width in overlay['cusps']:
+        shapes.append(('line', _point(degree, R_ASPECTS), _point(degree, outer), 'black', width, 1.0))
+    for degree, *_ in overlay['planets']:
+        shapes.append(('line', _point(degree, R_HOUSES - 0.03), _point(degree, R_HOUSES), 'black', 1.5, 1.0))
+    for p1, p2, color in overlay['aspects']:
+        shapes.append(('line', _point(p1, R_ASPECTS), _point(p2, R_ASPECTS), color, 1.0, 0.8))
+    for degree, label in overlay['house_labels']:
+        shapes.append(('text', _point(degree, R_ASPECTS + 0.05), label, HOUSE_FONT_SIZE, 'dimgray'))
+    for _, display, symbol, color, label in overlay['planets']:
+        shapes.append(('text', _point(display, R_PLANETS + 0.05), symbol, PLANET_FONT_SIZE, color))
+        shapes.append(('text', _point(display, R_PLANETS - 0.06), label, DEGREE_FONT_SIZE, 'dimgray'))
+    return shapes
+
+
+# --- SVG ---
+
+def _svg_shape(shape: Shape, size: int) -> str:
+    px = size / POINTS_PER_IMAGE
+    if shape[0] == 'circle':
+        _, radius, color, width, dashed = shape
+        dash = f' stroke-dasharray="{3.7 * width * px:.1f} {1.6 * width * px:.1f}"' if dashed else ''
+        return (f'<circle cx="{size / 2}" cy="{size / 2}" r="{radius * WHEEL_RADIUS_FRACTION / R_LIMIT * size:.2f}" '
+                f'fill="none" stroke="{color}" stroke-width="{width * px:.2f}"{dash}/>')
+    if shape[0] == 'line':
+        _, (x1, y1), (x2, y2), color, width, opacity = shape
+        alpha = f' stroke-opacity="{opacity}"' if opacity < 1.0 else ''
+        return (f'<line x1="{x1 * size:.2f}" y1="{y1 * size:.2f}" x2="{x2 * size:.2f}" y2="{y2 * size:.2f}" '
+                f'stroke="{color}" stroke-width="{width * px:.2f}"{alpha}/>')
+    _, (x, y), text, font_size, color = shape
+    return (f'<text x="{x * size:.2f}" y="{y * size:.2f}" font-size="{font_size * px:.1f}" fill="{color}" '
+            f'text-anchor="middle" dominant-baseline="central">{escape(text)}</text>')
+
+
+def render_svg(chart_data: Dict[str, Any], size: int = CHART_SVG_SIZE) -> str:
+    """چرخ چارت به صورت سند SVG."""
+    body = "\n".join(_svg_shape(shape, size) for shape in static_shapes() + overlay_shapes(chart_data))
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 {size} {size}" '
+            f'font-family="{FONT_FAMILY}">\n<rect width="100%" height="100%" fill="white"/>\n{body}\n</svg>\n')
+
+
+# --- raster با Pillow ---
+
+class WheelImage:
+    """تصویر لایه‌های ثابت و قلم‌های Pillow؛ هر thread نمونه خود را دارد."""
+
+    def __init__(self, size: int = CHART_SVG_SIZE, supersample: int = CHART_SVG_SUPERSAMPLE):
+        self.size = size
+        self.scale = size * max(1, supersample)
+        self.font_path = find_font_path()
+        if self.font_path is None:
+            logging.warning("No TrueType font with astrological glyphs found; set CHART_FONT_PATH.")
+        self._fonts: Dict[float, ImageFont.ImageFont] = {}
+        self.background = Image.new("RGB", (self.scale, self.scale), "white")
+        self._draw_shapes(ImageDraw.Draw(self.background), static_shapes())
+
+    def _font(self, font_size: float):
+        font = self._fonts.get(font_size)
+        if font is None:
+            size_px = font_size * self.scale / POINTS_PER_IMAGE
+            font = self._fonts[font_size] = (ImageFont.truetype(self.font_path, round(size_px)) if self.font_path
+                                             else ImageFont.load_default(round(size_px)))
+        return font
+
+    def _draw_shapes(self, draw: ImageDraw.ImageDraw, shapes: List[Shape]):
+        px = self.scale / POINTS_PER_IMAGE
+        center = self.scale / 2
+        for shape in shapes:
+            if shape[0] == 'circle':
+                _, radius, color, width, dashed = shape
+                r = radius * WHEEL_RADIUS_FRACTION / R_LIMIT * self.scale
+                box = (center - r, center - r, center + r, center + r)
+                line_width = max(1, round(width * px))
+                if dashed:
+                    for start in range(0, 360, 4):
+                        draw.arc(box, start, start + 2.5, fill=color, width=line_width)
+                else:
+                    draw.ellipse(box, outline=color, width=line_width)
+            elif shape[0] == 'line':
+                _, (x1, y1), (x2, y2), color, width, _ = shape
+                draw.line([(x1 * self.scale, y1 * self.scale), (x2 * self.scale, y2 * self.scale)],
+                          fill=color, width=max(1, round(width * px)))
+            else:
+                _, (x, y), text, font_size, color = shape
+                draw.text((x * self.scale, y * self.scale), text, fill=color, font=self._font(font_size), anchor="mm")
+
+    def render(self, chart_data: Dict[str, Any]) -> Image.Image:
+        image = self.background.copy()
+        self._draw_shapes(ImageDraw.Draw(image), overlay_shapes(chart_data))
+        if self.scale != self.size:
+            image = image.resize((self.size, self.size), Image.LANCZOS)
+        return image
+
+
+_local = threading.local()
+
+
+def get_wheel_canvas() -> WheelImage:
+    """تصویر لایه‌های ثابت thread جاری (در اولین استفاده ساخته می‌شود)."""
+    wheel = getattr(_local, 'wheel', None)
+    if wheel is None:
+        wheel = _local.wheel = WheelImage()
+    return wheel
+
+
+def render_wheel_image(chart_data: Dict[str, Any]) -> Image.Image:
+    """تصویر رسم‌شده چرخ (پیش از رمزگذاری در image_encoding)."""
+    return get_wheel_canvas().render(chart_data)
+
+
+def draw_chart_wheel_svg(chart_data: Dict[str, Any]) -> io.BytesIO:
+    """
+    نمودار دایره‌ای چارت تولد (همان چرخ draw_chart_wheel_fa) بدون matplotlib.
+
+    بازگشت: یک شیء باینری (BytesIO) حاوی تصویر با قالب CHART_IMAGE_FORMAT (پیش‌فرض PNG پالتی).
+    """
+    data, _ = image_encoding.encode(render_wheel_image(chart_data))
+    return io.BytesIO(data)
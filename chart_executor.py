@@ -0,0 +1,254 @@
+# ----------------------------------------------------------------------
+# chart_executor.py - اجرای محاسبه و ترسیم چارت خارج از حلقه رویداد asyncio
+#
+# کارهای سنگین CPU (swisseph، matplotlib، تولید تفسیر) در یک process pool اجرا می‌شوند تا
+# رندر چارت یک کاربر وب‌هوک بقیه کاربران را متوقف نکند. هر worker هنگام شروع یک بار
+# swisseph (مسیر اپمریس)، matplotlib (بک‌اند Agg) و ماژول ترسیم را بارگذاری می‌کند.
+# رسام با CHART_RENDERER انتخاب می‌شود: matplotlib (chart_drawer_fa) یا svg (chart_drawer_svg، بدون matplotlib).
+#
+# صف محدود: حداکثر CHART_WORKERS + CHART_QUEUE_SIZE کار هم‌زمان پذیرفته می‌شود؛
+# کار اضافی بلافاصله با ChartExecutorBusy رد می‌شود (به جای انباشت بی‌پایان در حافظه).
+# هر کار محدودیت زمانی CHART_JOB_TIMEOUT_SECONDS دارد (ChartJobTimeout).
+# چارت‌های نجومی (sidereal) و پیکربندی‌های دیگر swisseph از طریق calc_service.py اجرا می‌شوند.
+# ----------------------------------------------------------------------
+
+import os
+import io
+import asyncio
+import logging
+import importlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional, Tuple, Union
+
+import astrology_core
+import image_encoding
+
+logging.basicConfig(level=logging.INFO)
+
+# --- تنظیمات (قابل تغییر با متغیرهای محیطی) ---
+CHART_WORKERS = int(os.environ.get("CHART_WORKERS", str(os.cpu_count() or 1)))
+CHART_QUEUE_SIZE = int(os.environ.get("CHART_QUEUE_SIZE", "32"))
+CHART_JOB_TIMEOUT_SECONDS = float(os.environ.get("CHART_JOB_TIMEOUT_SECONDS", "30"))
+CHART_RENDERER = os.environ.get("CHART_RENDERER", "matplotlib")
+
+# رسام -> ماژول (هر دو render_wheel_image و get_wheel_canvas دارند)
+RENDERERS = {
+    "matplotlib": "chart_drawer_fa",
+    "svg": "chart_drawer_svg",
+}
+if CHART_RENDERER not in RENDERERS:
+    raise ValueError(f"Unknown CHART_RENDERER '{CHART_RENDERER}' (expected one of {sorted(RENDERERS)}).")
+
+
+class ChartExecutorBusy(Exception):
+    """صف کارهای چارت پر است."""
+
+
+class ChartJobTimeout(Exception):
+    """کار چارت در زمان مجاز تمام نشد."""
+
+
+# --- کد سمت worker ---
+
+def _init_worker():
+    """بارگذاری اولیه ماژول‌های سنگین در هر پردازه worker (فقط یک بار)."""
+    if CHART_RENDERER == "matplotlib":
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot  # noqa: F401
+    _renderer_module().get_wheel_canvas()  # رسم لایه‌های ثابت چرخ یک بار در هر worker
+    import interpretation_fragments
+    interpretation_fragments.load()
+    import fixed_stars
+    fixed_stars.load_catalogue()
+    # فایل‌های اپمریس بازه پشتیبانی‌شده در کش سیستم‌عامل و در swisseph همین پردازه باز می‌شوند
+    import ephemeris_files
+    ephemeris_files.warm_up()
+    astrology_core.get_position_backend().positions([2451545.0], astrology_core.BODY_CODES)
+
+
+def _init_thread():
+    """
+    تنظیم مسیر اپمریس در thread های جایگزین (وقتی process pool شروع نشده است).
+    وضعیت swisseph برای هر thread جداست؛ بدون این کار calc_ut در thread جدید بی‌صدا از Moshier استفاده می‌کند.
+    """
+    import swisseph as se
+    se.set_ephe_path(astrology_core.EPHE_PATH)
+
+
+def _calculate_chart_job(*args, **kwargs) -> Dict[str, Any]:
+    return astrology_core.calculate_natal_chart(*args, **kwargs)
+
+
+def _renderer_module():
+    return importlib.import_module(RENDERERS[CHART_RENDERER])
+
+
+def draw_chart(chart_data: Dict[str, Any]) -> Tuple[bytes, float]:
+    """
+    ترسیم چارت با رسام انتخاب‌شده (CHART_RENDERER) و رمزگذاری با image_encoding.
+    بازگشت: (بایت‌های تصویر، زمان رمزگذاری به میلی‌ثانیه).
+    """
+    return image_encoding.encode(_renderer_module().render_wheel_image(chart_data))
+
+
+def _render_chart_job(chart_data: Dict[str, Any], interpret: bool = True) -> Tuple[Optional[bytes], Optional[str], Optional[str], Optional[float]]:
+    """
+    ترسیم تصویر و تولید تفسیر یک چارت.
+    بازگشت: (بایت‌های تصویر یا None، متن تفسیر فراردهی‌شده برای MarkdownV2 یا None، پیام خطای تفسیر یا None،
+    زمان رمزگذاری تصویر به میلی‌ثانیه یا None).
+    خطای ترسیم فقط لاگ می‌شود تا تفسیر متنی همچنان ارسال شود.
+    با interpret=False فقط تصویر ساخته می‌شود (تفسیر از interpretation_cache در حلقه رویداد می‌آید).
+    """
+    import interpretation_fragments
+
+    image_bytes, encode_ms = None, None
+    try:
+        image_bytes, encode_ms = draw_chart(chart_data)
+    except Exception as draw_e:
+        logging.error(f"FATAL: Chart drawing failed: {draw_e}", exc_info=True)
+
+    if not interpret:
+        return image_bytes, None, None, encode_ms
+    try:
+        return image_bytes, interpretation_fragments.render_escaped(chart_data), None, encode_ms
+    except Exception as interp_e:
+        logging.error(f"FATAL: Interpretation failed: {interp_e}", exc_info=True)
+        return image_bytes, None, str(interp_e), encode_ms
+
+
+# --- کد سمت حلقه رویداد ---
+
+def _release_slot(loop: asyncio.AbstractEventLoop, slots: asyncio.Semaphore):
+    """آزاد کردن جای یک کار از thread مدیریت process pool (done callback آینده)."""
+    try:
+        loop.call_soon_threadsafe(slots.release)
+    except RuntimeError:
+        # حلقه رویداد بسته شده است (پایان برنامه)
+        pass
+
+
+class ChartExecutor:
+    """process pool با صف محدود و محدودیت زمانی برای هر کار."""
+
+    def __init__(self, workers: int = CHART_WORKERS, queue_size: int = CHART_QUEUE_SIZE,
+                 job_timeout: float = CHART_JOB_TIMEOUT_SECONDS):
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.job_timeout = job_timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self.submitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def running(self) -> bool:
+        return self._pool is not None
+
+    def start(self):
+        if self._pool is not None:
+            return
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        self._slots = asyncio.Semaphore(self.workers + self.queue_size)
+        # ساخت پردازه‌ها از همین حالا تا اولین کاربر هزینه راه‌اندازی را نپردازد
+        for _ in range(self.workers):
+            self._pool.submit(int)
+        logging.info(f"Chart executor started: {self.workers} workers, queue size {self.queue_size}.")
+
+    async def shutdown(self):
+        if self._pool is None:
+            return
+        pool, self._pool = self._pool, None
+        await asyncio.get_running_loop().run_in_executor(None, lambda: pool.shutdown(wait=True, cancel_futures=True))
+        logging.info("Chart executor stopped.")
+
+    def _restart_pool(self):
+        logging.error("Chart worker process died; restarting the process pool.")
+        old_pool = self._pool
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        old_pool.shutdown(wait=False, cancel_futures=True)
+
+    async def submit(self, func, *args, timeout: Optional[float] = None, **kwargs):
+        """
+        اجرای func در یک worker و انتظار برای نتیجه.
+        اگر executor شروع نشده باشد (مثلاً اسکریپت‌های خارج از FastAPI)، کار در یک thread pool با مسیر اپمریس تنظیم‌شده اجرا می‌شود.
+        """
+        loop = asyncio.get_running_loop()
+        if self._pool is None:
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(max_workers=self.workers, initializer=_init_thread)
+            return await loop.run_in_executor(self._threads, lambda: func(*args, **kwargs))
+
+        if self._slots.locked():
+            self.rejected += 1
+            raise ChartExecutorBusy(f"Chart queue is full ({self.workers + self.queue_size} jobs in flight).")
+
+        slots = self._slots
+        await slots.acquire()
+        self.submitted += 1
+        try:
+            try:
+                future = self._pool.submit(func, *args, **kwargs)
+            except BrokenProcessPool:
+                self._restart_pool()
+                future = self._pool.submit(func, *args, **kwargs)
+        except BaseException:
+            slots.release()
+            raise
+        # جای کار تا پایان واقعی آن در worker نگه داشته می‌شود (نه فقط تا پایان انتظار فراخواننده)؛
+        # کاری که پس از timeout هنوز در حال اجراست همچنان یک جا از workers + queue_size را اشغال می‌کند
+        future.add_done_callback(lambda _: _release_slot(loop, slots))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.job_timeout)
+        except asyncio.TimeoutError:
+            # کاری که هنوز شروع نشده لغو می‌شود (و جایش آزاد می‌شود)؛ کار در حال اجرا تا پایان در worker می‌ماند
+            future.cancel()
+            self.timed_out += 1
+            raise ChartJobTimeout(f"{getattr(func, '__name__', func)} exceeded {timeout or self.job_timeout:.0f}s.")
+        except BrokenProcessPool:
+            self._restart_pool()
+            raise
+
+    async def calculate_natal_chart(self, *args, **kwargs) -> Dict[str, Any]:
+        """معادل astrology_core.calculate_natal_chart که در یک worker اجرا می‌شود."""
+        return await self.submit(_calculate_chart_job, *args, **kwargs)
+
+    async def render_chart(self, chart_data: Dict[str, Any], interpret: bool = True) -> Tuple[Optional[io.BytesIO], Optional[str], Optional[str]]:
+        """ترسیم تصویر و تولید تفسیر در یک worker؛ بازگشت: (BytesIO تصویر یا None، تفسیر فراردهی‌شده، خطای تفسیر)."""
+        image_bytes, interpretation, interp_error, encode_ms = await self.submit(_render_chart_job, chart_data, interpret)
+        if image_bytes:
+            # رمزگذاری در worker انجام می‌شود؛ آمار در پردازه اصلی جمع می‌شود
+            image_encoding.metrics.record(image_encoding.CHART_IMAGE_FORMAT, len(image_bytes), encode_ms)
+        return (io.BytesIO(image_bytes) if image_bytes else None), interpretation, interp_error
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+# نمونه سراسری که توسط lifespan در bot_app شروع و متوقف می‌شود
+chart_executor = ChartExecutor()
+
+
+def start():
+    chart_executor.start()
+
+
+async def shutdown():
+    await chart_executor.shutdown()
+
+
+async def calculate_natal_chart(*args, **kwargs) -> Dict[str, Any]:
+    return await chart_executor.calculate_natal_chart(*args, **kwargs)
+
+
+async def render_chart(chart_data: Dict[str, Any], interpret: bool = True) -> Tuple[Optional[io.BytesIO], Optional[str], Optional[str]]:
+    return await chart_executor.render_chart(chart_data, interpret)
@@ -0,0 +1,204 @@
+# ----------------------------------------------------------------------
+# chart_index.py - جدول‌های ایندکس‌شده ویژگی‌های چارت کاربران برای جستجو ("چارت‌هایی با ...")
+#
+# برای هر کاربر (آخرین چارت ذخیره‌شده در UserCharts):
+#   ChartPlacements: هر نقطه (سیارات، سهم سعادت، آسندانت، میدهون) با برج (0 تا 11)، خانه (1 تا 12 یا NULL) و درجه
+#   ChartAspects:    همه زوایای داخل Orb چارت (ASPECT_ENGINE بدون محدودیت top_k)، جفت نقاط به ترتیب الفبایی؛
+#                    بنابراین max_orb بزرگ‌تر از ASPECT_ORBS (و OUTER_ASPECT_MAX_ORB برای سیارات بیرونی) اثری ندارد
+# هر شرط پرس‌وجو یک زیرپرس‌وجو روی ایندکس مربوط است و شرط‌ها با INTERSECT ترکیب می‌شوند؛
+# هیچ JSON یا blob چارتی هنگام جستجو خوانده نمی‌شود (ChartQuery.explain طرح اجرای SQLite را نشان می‌دهد).
+#
+# مثال:
+#   await ChartQuery().placement('sun', sign='LEO').placement('moon', house=8).run()
+#   await ChartQuery().aspect('venus', 'mars', 'Trine', max_orb=2.0).count()
+#
+# ساخت دوباره ایندکس از UserCharts: python chart_index.py rebuild
+# ----------------------------------------------------------------------
+
+import sys
+import asyncio
+import logging
+from typing import List, Optional, Tuple, Union
+
+import aiosqlite
+import numpy as np
+
+import astrology_core
+import chart_result
+import state_manager
+
+logging.basicConfig(level=logging.INFO)
+
+# نقاطی که علاوه بر BODY_NAMES ذخیره می‌شوند (ترتیب ستون‌های signs/houses در ChartResult: اجسام و سپس سهم سعادت)
+INDEX_POINTS = astrology_core.BODY_NAMES + ["part_of_fortune", "ascendant", "midheaven"]
+
+
+async def init_db(db_path: Optional[str] = None):
+    """ایجاد جدول‌ها و ایندکس‌ها (از lifespan در bot_app فراخوانی می‌شود)."""
+    async with aiosqlite.connect(db_path or state_manager.DATABASE_NAME) as db:
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS ChartPlacements (
+                chat_id INTEGER NOT NULL,
+                body TEXT NOT NULL,
+                sign INTEGER NOT NULL,
+                house INTEGER,
+                degree REAL NOT NULL,
+                PRIMARY KEY (chat_id, body)
+            ) WITHOUT ROWID
+        """)
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_placements_sign ON ChartPlacements (body, sign, chat_id)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_placements_house ON ChartPlacements (body, house, chat_id)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_placements_degree ON ChartPlacements (body, degree, chat_id)")
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS ChartAspects (
+                chat_id INTEGER NOT NULL,
+                p1 TEXT NOT NULL,
+                p2 TEXT NOT NULL,
+                aspect TEXT NOT NULL,
+                orb REAL NOT NULL,
+                PRIMARY KEY (chat_id, p1, p2, aspect)
+            ) WITHOUT ROWID
+        """)
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_aspects_pair ON ChartAspects (p1, p2, aspect, orb, chat_id)")
+        await db.commit()
+
+
+def _sign_index(sign: Union[int, str]) -> int:
+    return sign if isinstance(sign, int) else astrology_core.SIGN_NAMES.index(sign.upper())
+
+
+def _pair(a: str, b: str) -> Tuple[str, str]:
+    return (a, b) if a <= b else (b, a)
+
+
+def chart_rows(chat_id: int, chart: chart_result.ChartResult) -> Tuple[List[tuple], List[tuple]]:
+    """ردیف‌های ChartPlacements و ChartAspects یک چارت."""
+    pof = chart.part_of_fortune
+    degrees = np.append(chart.longitudes, [pof[0] if pof else np.nan, chart.ascendant, chart.midheaven])
+    signs = chart.signs.tolist()
+    houses = chart.houses.tolist() if chart.has_houses else [None] * len(signs)
+    placements = []
+    for p, name in enumerate(INDEX_POINTS):
+        degree = float(degrees[p])
+        if np.isnan(degree):
+            continue
+        if p < len(signs):
+            placements.append((chat_id, name, signs[p], houses[p], degree))
+        else:
+            placements.append((chat_id, name, int(degree // 30.0) % 12, None, degree))
+
+    ok = ~np.isnan(chart.longitudes)
+    names = [name for name, good in zip(astrology_core.BODY_NAMES, ok) if good]
+    hits = astrology_core.ASPECT_ENGINE.match(chart.longitudes[ok], names)
+    aspects = []
+    for i, j, k, orb in zip(hits["i"].tolist(), hits["j"].tolist(), hits["aspect"].tolist(), hits["orb"].tolist()):
+        p1, p2 = _pair(names[i], names[j])
+        aspects.append((chat_id, p1, p2, astrology_core.ASPECT_ENGINE.aspect_names[k], orb))
+    return placements, aspects
+
+
+async def _write_rows(db: aiosqlite.Connection, chat_ids: List[int], placements: List[tuple], aspects: List[tuple]):
+    await db.executemany("DELETE FROM ChartPlacements WHERE chat_id = ?", [(c,) for c in chat_ids])
+    await db.executemany("DELETE FROM ChartAspects WHERE chat_id = ?", [(c,) for c in chat_ids])
+    await db.executemany("INSERT INTO ChartPlacements (chat_id, body, sign, house, degree) VALUES (?, ?, ?, ?, ?)", placements)
+    await db.executemany("INSERT INTO ChartAspects (chat_id, p1, p2, aspect, orb) VALUES (?, ?, ?, ?, ?)", aspects)
+
+
+async def index_chart(chat_id: int, chart: chart_result.ChartResult, db_path: Optional[str] = None):
+    """جایگزینی ردیف‌های ایندکس یک کاربر با چارت جدید."""
+    placements, aspects = chart_rows(chat_id, chart)
+    async with aiosqlite.connect(db_path or state_manager.DATABASE_NAME) as db:
+        await _write_rows(db, [chat_id], placements, aspects)
+        await db.commit()
+
+
+async def rebuild(db_path: Optional[str] = None, batch_size: int = 1000) -> int:
+    """ساخت دوباره ایندکس همه کاربران از UserCharts (blob فشرده، بدون JSON). تعداد کاربران."""
+    rows = await state_manager.load_user_charts(subscribed_only=False, db_path=db_path)
+    async with aiosqlite.connect(db_path or state_manager.DATABASE_NAME) as db:
+        for first in range(0, len(rows), batch_size):
+            placements, aspects, chat_ids = [], [], []
+            for chat_id, blob in rows[first:first + batch_size]:
+                p, a = chart_rows(chat_id, chart_result.ChartResult.from_bytes(blob))
+                placements.extend(p)
+                aspects.extend(a)
+                chat_ids.append(chat_id)
+            await _write_rows(db, chat_ids, placements, aspects)
+        await db.commit()
+    logging.info(f"Chart index rebuilt for {len(rows)} users.")
+    return len(rows)
+
+
+class ChartQuery:
+    """ترکیب شرط‌ها (AND) روی ChartPlacements و ChartAspects."""
+
+    def __init__(self):
+        self._parts: List[Tuple[str, tuple]] = []
+
+    def placement(self, body: str, sign: Union[int, str, None] = None, house: Optional[int] = None,
+                  min_degree: Optional[float] = None, max_degree: Optional[float] = None) -> "ChartQuery":
+        """نقطه body در برج sign (نام یا ایندکس)، خانه house و/یا بازه درجه (طول دایره‌البروجی)."""
+        if sign is not None:
+            self._parts.append(("SELECT chat_id FROM ChartPlacements WHERE body = ? AND sign = ?", (body, _sign_index(sign))))
+        if house is not None:
+            self._parts.append(("SELECT chat_id FROM ChartPlacements WHERE body = ? AND house = ?", (body, house)))
+        if min_degree is not None or max_degree is not None:
+            low = 0.0 if min_degree is None else min_degree
+            high = 360.0 if max_degree is None else max_degree
+            self._parts.append(("SELECT chat_id FROM ChartPlacements WHERE body = ? AND degree BETWEEN ? AND ?", (body, low, high)))
+        return self
+
+    def aspect(self, body1: str, body2: str, aspect: Optional[str] = None, max_orb: Optional[float] = None) -> "ChartQuery":
+        """زاویه aspect (مثلاً 'Trine'؛ None = هر زاویه) بین دو نقطه با Orb حداکثر max_orb."""
+        p1, p2 = _pair(body1, body2)
+        sql = "SELECT chat_id FROM ChartAspects WHERE p1 = ? AND p2 = ?"
+        params: tuple = (p1, p2)
+        if aspect is not None:
+            sql += " AND aspect = ?"
+            params += (aspect.title(),)
+        if max_orb is not None:
+            sql += " AND orb <= ?"
+            params += (max_orb,)
+        self._parts.append((sql, params))
+        return self
+
+    def sql(self) -> Tuple[str, tuple]:
+        if not self._parts:
+            raise ValueError("ChartQuery needs at least one condition.")
+        sql = "\nINTERSECT\n".join(part for part, _ in self._parts)
+        params = tuple(p for _, part_params in self._parts for p in part_params)
+        return sql, params
+
+    async def run(self, limit: Optional[int] = None, db_path: Optional[str] = None) -> List[int]:
+        """chat_id کاربران منطبق (به ترتیب صعودی)."""
+        sql, params = self.sql()
+        sql = f"SELECT chat_id FROM ({sql}) ORDER BY chat_id"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        async with aiosqlite.connect(db_path or state_manager.DATABASE_NAME) as db:
+            async with db.execute(sql, params) as cursor:
+                return [row[0] for row in await cursor.fetchall()]
+
+    async def count(self, db_path: Optional[str] = None) -> int:
+        sql, params = self.sql()
+        async with aiosqlite.connect(db_path or state_manager.DATABASE_NAME) as db:
+            async with db.execute(f"SELECT COUNT(*) FROM ({sql})", params) as cursor:
+                return (await cursor.fetchone())[0]
+
+    async def explain(self, db_path: Optional[str] = None) -> List[str]:
+        """طرح اجرای SQLite (برای اطمینان از استفاده از ایندکس‌ها)."""
+        sql, params = self.sql()
+        async with aiosqlite.connect(db_path or state_manager.DATABASE_NAME) as db:
+            async with db.execute(f"EXPLAIN QUERY PLAN {sql}", params) as cursor:
+                return [row[3] for row in await cursor.fetchall()]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "rebuild":
+        async def _rebuild():
+            await state_manager.init_db()
+            await init_db()
+            print(f"indexed {await rebuild()} charts")
+        asyncio.run(_rebuild())
+    else:
+        print("usage: python chart_index.py rebuild")
@@ -0,0 +1,126 @@
+# ----------------------------------------------------------------------
+# chart_layout.py - چیدمان چرخ چارت، مشترک رسام‌ها (بدون matplotlib)
+#
+# نمادها، رنگ‌ها، شعاع حلقه‌ها و محاسبه لایه وابسته به چارت (کاسپ‌ها، شماره خانه‌ها، جای نماد سیارات،
+# وترهای زوایا) یک بار اینجا تعریف می‌شوند تا chart_drawer_fa (matplotlib) و chart_drawer_svg (SVG/Pillow)
+# یک چرخ یکسان رسم کنند. زاویه‌ها درجه دایره‌البروجی‌اند: 0 (حمل) در سمت چپ و افزایش ساعتگرد.
+# ----------------------------------------------------------------------
+
+from typing import Dict, Any, List
+
+# --- 1. نمادها و ثابت‌های گرافیکی فارسی ---
+
+# نام و نماد برج‌های فلکی (Zodiac Signs) - نام‌ها برای برچسب‌گذاری
+SIGN_NAMES_FA = [
+    'حمل ♈', 'ثور ♉', 'جوزا ♊', 'سرطان ♋', 'اسد ♌', 'سنبله ♍',
+    'میزان ♎', 'عقرب ♏', 'قوس ♐', 'جدی ♑', 'دلو ♒', 'حوت ♓'
+]
+
+# نمادهای Unicode برای سیارات و نقاط
+PLANET_SYMBOLS = {
+    'sun': '☉', 'moon': '☽', 'mercury': '☿', 'venus': '♀', 'mars': '♂',
+    'jupiter': '♃', 'saturn': '♄', 'uranus': '⛢', 'neptune': '♆', 'pluto': '♇',
+    'true_node': '☊', 'part_of_fortune': '⨳'
+}
+
+# نام‌های فارسی برای زوایا (Aspects)
+ASPECT_NAMES_FA = {
+    "Conjunction": 'اتصال',  # 0°
+    "Sextile": 'تثلیث کوچک',# 60°
+    "Square": 'تربیع',      # 90°
+    "Trine": 'تثلیث',       # 120°
+    "Opposition": 'مقابله',  # 180°
+}
+
+# رنگ‌های استاندارد برای زوایا (Aspects)
+ASPECT_COLORS = {
+    "Conjunction": 'black',
+    "Sextile": 'blue',
+    "Square": 'red',
+    "Trine": 'green',
+    "Opposition": 'orange',
+}
+
+# --- متغیرهای شعاعی ---
+R_ZODIAC = 1.0     # شعاع دایره بیرونی (برج‌ها)
+R_HOUSES = 0.8     # شعاع دایره داخلی (خانه‌ها)
+R_PLANETS = 0.6    # شعاع حلقه سیارات
+R_ASPECTS = 0.4    # شعاع داخلی برای رسم زوایا (Aspects)
+R_LIMIT = 1.05     # حد شعاعی محور
+
+# رنگ نماد برج‌ها و سیارات بر اساس عنصر برج (sign_index % 4: آتش، خاک، باد، آب)
+ELEMENT_COLORS = ['firebrick', 'saddlebrown', 'goldenrod', 'steelblue']
+
+# کمترین فاصله زاویه‌ای نمادهای سیارات روی حلقه (درجه)
+PLANET_MIN_SEPARATION = 8.0
+
+# اندازه قلم‌ها (point) و ضخامت خطوط (point)
+SIGN_FONT_SIZE = 20
+PLANET_FONT_SIZE = 16
+HOUSE_FONT_SIZE = 9
+DEGREE_FONT_SIZE = 6
+
+
+def format_degree_in_sign(deg_in_sign: float) -> str:
+    """درجه درون برج (فیلد degree_in_sign هسته) به شکل '25° 30''"""
+    minutes = (deg_in_sign - int(deg_in_sign)) * 60
+    return f"{int(deg_in_sign)}° {int(minutes)}'"
+
+
+def sign_glyph(sign_index: int) -> str:
+    """نماد برج (بخش آخر SIGN_NAMES_FA)؛ نام فارسی رسم نمی‌شود چون هیچ‌کدام از رسام‌ها حروف را به هم نمی‌چسبانند."""
+    return SIGN_NAMES_FA[sign_index].split()[-1]
+
+
+def spread_degrees(degrees: List[float], min_separation: float = PLANET_MIN_SEPARATION) -> List[float]:
+    """زاویه نمایش نمادها (به ترتیب ورودی)؛ نمادهای نزدیک به هم تا min_separation از هم فاصله می‌گیرند."""
+    order = sorted(range(len(degrees)), key=lambda i: degrees[i])
+    shown = [degrees[i] for i in order]
+    for _ in range(len(shown)):
+        moved = False
+        for k in range(1, len(shown)):
+            gap = shown[k] - shown[k - 1]
+            if gap < min_separation:
+                shift = (min_separation - gap) / 2
+                shown[k - 1] -= shift
+                shown[k] += shift
+                moved = True
+        if not moved:
+            break
+    result = [0.0] * len(degrees)
+    for position, i in enumerate(order):
+        result[i] = shown[position]
+    return result
+
+
+def wheel_overlay(chart_data: Dict[str, Any]) -> Dict[str, list]:
+    """
+    لایه وابسته به چارت:
+      cusps:        (درجه، شعاع بیرونی، ضخامت) - آسندانت و میدهون پررنگ و تا حلقه برج‌ها
+      house_labels: (درجه میانه خانه، شماره)
+      planets:      (درجه واقعی، درجه نمایش، نماد، رنگ، برچسب درجه درون برج)
+      aspects:      (درجه نقطه اول، درجه نقطه دوم، رنگ)
+    """
+    cusps = chart_data.get('houses', {}).get('cusps') or {}
+    overlay = {'cusps': [], 'house_labels': [], 'planets': [], 'aspects': []}
+
+    for house, degree in cusps.items():
+        outer, width = (R_ZODIAC, 2.0) if house in (1, 10) else (R_HOUSES, 0.8)
+        overlay['cusps'].append((degree, outer, width))
+        following = cusps.get(house % 12 + 1)
+        if following is not None:
+            overlay['house_labels'].append((degree + ((following - degree) % 360.0) / 2, str(house)))
+
+    # سیارات با فیلدهای از پیش محاسبه‌شده هسته (sign_index، degree_in_sign)
+    planets = [(name, data) for name, data in chart_data.get('planets', {}).items()
+               if name in PLANET_SYMBOLS and data.get('degree') is not None]
+    shown = spread_degrees([data['degree'] for _, data in planets])
+    for (name, data), display in zip(planets, shown):
+        color = ELEMENT_COLORS[data['sign_index'] % 4] if 'sign_index' in data else 'black'
+        deg_in_sign = data['degree_in_sign'] if 'degree_in_sign' in data else data['degree'] % 30
+        label = format_degree_in_sign(deg_in_sign) + (' ℞' if data.get('speed', 0.0) < 0 else '')
+        overlay['planets'].append((data['degree'], display, PLANET_SYMBOLS[name], color, label))
+
+    for aspect in chart_data.get('aspects', []):
+        overlay['aspects'].append((aspect['p1_deg'], aspect['p2_deg'], ASPECT_COLORS.get(aspect['aspect'], 'gray')))
+    return overlay
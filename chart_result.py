@@ -0,0 +1,329 @@
+# ----------------------------------------------------------------------
+# chart_result.py - نمایش فشرده چارت تولد (ChartResult) بر پایه آرایه float64
+#
+# همه اعداد یک چارت در یک آرایه پیوسته 51 تایی float64 نگه داشته می‌شوند:
+#   [0:4]    jd_utc، عرض، طول جغرافیایی، کد سیستم خانه (ord)
+#   [4:37]   اجسام × [طول، عرض دایره‌البروجی، سرعت] (ترتیب astrology_core.BODY_NAMES)
+#   [37:49]  کاپس خانه‌های 1 تا 12
+#   [49:51]  آسندانت و میدهون
+# backend های موقعیت فعلی فقط طول و سرعت برمی‌گردانند؛ ستون عرض دایره‌البروجی تا آن زمان NaN است.
+#
+# برج‌ها، خانه‌ها، زوایا، سهم سعادت و خلاصه عناصر فقط در اولین دسترسی محاسبه و نگه داشته می‌شوند.
+# to_bytes/from_bytes یک هدر کوتاه + همان آرایه است (from_bytes بدون کپی روی بافر ورودی کار می‌کند).
+# to_dict همان ساختار دیکشنری calculate_natal_chart را برای فراخوان‌های موجود می‌سازد.
+# فقط چارت استوایی (tropical) ذخیره می‌شود: پرچم‌های زودیاک و آیانامسا در آرایه نیستند و from_dict چارت
+# نجومی (sidereal) را نمی‌پذیرد، چون to_dict و fixed_stars آن را در چارچوب استوایی بازسازی می‌کردند.
+# ----------------------------------------------------------------------
+
+import struct
+from typing import Dict, Any, List, Optional, Sequence, Union
+
+import numpy as np
+
+import astrology_core
+import time_conversion
+
+N_BODIES = len(astrology_core.BODY_NAMES)
+_BODY_SLICE = slice(4, 4 + 3 * N_BODIES)
+_CUSP_SLICE = slice(_BODY_SLICE.stop, _BODY_SLICE.stop + 12)
+_ANGLE_SLICE = slice(_CUSP_SLICE.stop, _CUSP_SLICE.stop + 2)
+DATA_LENGTH = _ANGLE_SLICE.stop
+# ستون طول دایره‌البروجی اجسام و ستون‌های آسندانت/میدهون در آرایه data (برای ماتریس چند چارت)
+LONGITUDE_COLUMNS = np.arange(_BODY_SLICE.start, _BODY_SLICE.stop, 3)
+ANGLE_COLUMNS = np.arange(_ANGLE_SLICE.start, _ANGLE_SLICE.stop)
+
+# هدر باینری: شناسه، نسخه، طول نام شهر (بایت)، طول پیام خطای خانه‌ها (بایت)
+_MAGIC = b'CHRT'
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct('<4sHHH')
+
+PLANET_ERROR = "❌ خطا در محاسبه موقعیت سیاره"
+PART_OF_FORTUNE_ERROR = "❌ خطا در محاسبه سهم سعادت"
+
+
+class ChartResult:
+    """چارت تولد با داده‌های عددی در یک آرایه float64 و فیلدهای مشتق‌شده تنبل."""
+
+    __slots__ = ('data', 'city_name', 'house_error',
+                 '_signs', '_houses', '_aspects', '_part_of_fortune', '_summary', '_fixed_stars')
+
+    def __init__(self, data: np.ndarray, city_name: str = "", house_error: Optional[str] = None):
+        if data.shape != (DATA_LENGTH,):
+            raise ValueError(f"ChartResult data must have shape ({DATA_LENGTH},), not {data.shape}.")
+        self.data = data
+        self.city_name = city_name
+        self.house_error = house_error
+        self._signs = None
+        self._houses = None
+        self._aspects = None
+        self._part_of_fortune = None
+        self._summary = None
+        self._fixed_stars = None
+
+    # --- ساخت ---
+    @classmethod
+    def from_arrays(cls, jd_utc: float, latitude: float, longitude: float, house_system: bytes,
+                    body_lon: np.ndarray, body_speed: np.ndarray, cusps: np.ndarray, angles: np.ndarray,
+                    body_lat: Optional[np.ndarray] = None, city_name: str = "", house_error: Optional[str] = None) -> "ChartResult":
+        data = np.empty(DATA_LENGTH, dtype=np.float64)
+        data[:4] = (jd_utc, latitude, longitude, ord(house_system.decode() if isinstance(house_system, bytes) else house_system))
+        bodies = data[_BODY_SLICE].reshape(N_BODIES, 3)
+        bodies[:, 0] = body_lon
+        bodies[:, 1] = np.nan if body_lat is None else body_lat
+        bodies[:, 2] = body_speed
+        data[_CUSP_SLICE] = cusps
+        data[_ANGLE_SLICE] = angles
+        return cls(data, city_name, house_error)
+
+    @classmethod
+    def from_dict(cls, chart: Dict[str, Any], house_system: Union[bytes, str, None] = None) -> "ChartResult":
+        """
+        تبدیل خروجی دیکشنری calculate_natal_chart به ChartResult.
+        house_system: سیستم خانه‌ای که چارت با آن محاسبه شده است (calculate_natal_chart آن را برنمی‌گرداند؛
+        بدون آن کلید 'house_system' دیکشنری و در نبود آن Placidus فرض می‌شود).
+        ValueError برای چارت نجومی (دارای 'ayanamsa').
+        """
+        if chart.get('ayanamsa') is not None:
+            raise ValueError("Sidereal charts cannot be stored as ChartResult (tropical frame only).")
+        if house_system is None:
+            house_system = chart.get('house_system', 'P')
+        planets = chart.get('planets', {})
+        body_lon = [planets.get(name, {}).get('degree', np.nan) for name in astrology_core.BODY_NAMES]
+        body_speed = [planets.get(name, {}).get('speed', np.nan) for name in astrology_core.BODY_NAMES]
+        houses = chart.get('houses', {})
+        house_error = houses.get('error')
+        if house_error:
+            cusps, angles = np.full(12, np.nan), np.full(2, np.nan)
+        else:
+            cusps = [houses['cusps'][i] for i in range(1, 13)]
+            angles = [houses['ascendant'], houses['midheaven']]
+        return cls.from_arrays(chart['jd_utc'], chart['latitude'], chart['longitude'], house_system,
+                               body_lon, body_speed, cusps, angles, city_name=chart.get('city_name', ''), house_error=house_error)
+
+    def with_houses(self, jd_utc: float, latitude: float, longitude: float, cusps: np.ndarray, angles: np.ndarray,
+                    city_name: str = "", house_error: Optional[str] = None) -> "ChartResult":
+        """چارت تازه با همین اجسام و لحظه، مختصات و خانه‌های داده‌شده (سیستم خانه تغییر نمی‌کند)."""
+        data = self.data.copy()
+        data[:3] = (jd_utc, latitude, longitude)
+        data[_CUSP_SLICE] = cusps
+        data[_ANGLE_SLICE] = angles
+        return type(self)(data, city_name, house_error)
+
+    # --- فیلدهای پایه (view روی آرایه، بدون کپی) ---
+    @property
+    def jd_utc(self) -> float:
+        return float(self.data[0])
+
+    @property
+    def latitude(self) -> float:
+        return float(self.data[1])
+
+    @property
+    def longitude(self) -> float:
+        return float(self.data[2])
+
+    @property
+    def house_system(self) -> bytes:
+        return chr(int(self.data[3])).encode()
+
+    @property
+    def bodies(self) -> np.ndarray:
+        """(B, 3): طول، عرض دایره‌البروجی و سرعت روزانه."""
+        return self.data[_BODY_SLICE].reshape(N_BODIES, 3)
+
+    @property
+    def longitudes(self) -> np.ndarray:
+        return self.bodies[:, 0]
+
+    @property
+    def speeds(self) -> np.ndarray:
+        return self.bodies[:, 2]
+
+    @property
+    def cusps(self) -> np.ndarray:
+        return self.data[_CUSP_SLICE]
+
+    @property
+    def ascendant(self) -> float:
+        return float(self.data[_ANGLE_SLICE][0])
+
+    @property
+    def midheaven(self) -> float:
+        return float(self.data[_ANGLE_SLICE][1])
+
+    @property
+    def has_houses(self) -> bool:
+        return self.house_error is None and not np.isnan(self.cusps).any()
+
+    # --- فیلدهای مشتق‌شده (تنبل) ---
+    @property
+    def part_of_fortune(self) -> Optional[tuple]:
+        """(درجه، تولد روز) یا None اگر خورشید یا ماه محاسبه نشده باشد."""
+        if self._part_of_fortune is None:
+            sun, moon = self.longitudes[0], self.longitudes[1]
+            if np.isnan(sun) or np.isnan(moon):
+                self._part_of_fortune = ()
+            else:
+                # مانند calculate_natal_chart: در صورت خطای خانه‌ها آسندانت و کاپس 7 صفر در نظر گرفته می‌شوند
+                asc = 0.0 if np.isnan(self.data[_ANGLE_SLICE][0]) else self.ascendant
+                desc = 0.0 if np.isnan(self.cusps[6]) else float(self.cusps[6])
+                degree, is_day = astrology_core.part_of_fortune(float(sun), float(moon), asc, desc)
+                self._part_of_fortune = (float(degree), bool(is_day))
+        return self._part_of_fortune or None
+
+    def _point_degrees(self) -> np.ndarray:
+        """طول اجسام و در انتها سهم سعادت (NaN در صورت نبود)."""
+        pof = self.part_of_fortune
+        return np.append(self.longitudes, pof[0] if pof else np.nan)
+
+    @property
+    def signs(self) -> np.ndarray:
+        """ایندکس برج (B+1,) برای اجسام و سهم سعادت؛ -1 برای نقاط محاسبه‌نشده."""
+        if self._signs is None:
+            degrees = self._point_degrees()
+            self._signs = np.where(np.isnan(degrees), -1, astrology_core.sign_indices(np.nan_to_num(degrees)))
+        return self._signs
+
+    @property
+    def houses(self) -> np.ndarray:
+        """شماره خانه (B+1,) برای اجسام و سهم سعادت؛ 0 اگر خانه‌ها یا نقطه محاسبه نشده باشند."""
+        if self._houses is None:
+            degrees = self._point_degrees()
+            if self.has_houses:
+                self._houses = np.where(np.isnan(degrees), 0, astrology_core.house_placement(np.nan_to_num(degrees), self.cusps))
+            else:
+                self._houses = np.zeros(len(degrees), dtype=np.int64)
+        return self._houses
+
+    @property
+    def aspects(self) -> List[Dict[str, Any]]:
+        if self._aspects is None:
+            ok = ~np.isnan(self.longitudes)
+            names = [name for name, good in zip(astrology_core.BODY_NAMES, ok) if good and name in astrology_core.ASPECT_PLANETS]
+            degrees = [float(self.longitudes[astrology_core.BODY_NAMES.index(name)]) for name in names]
+            self._aspects = astrology_core.ASPECT_ENGINE.find(degrees, names, top_k=5)
+        return self._aspects
+
+    @property
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        if self._summary is None:
+            columns = [astrology_core.BODY_NAMES.index(name) for name in astrology_core.SUMMARY_BODIES]
+            elements, qualities = astrology_core.sign_summary(self.signs[columns])
+            self._summary = {
+                'elements': dict(zip(astrology_core.ELEMENT_NAMES, elements.tolist())),
+                'qualities': dict(zip(astrology_core.QUALITY_NAMES, qualities.tolist())),
+            }
+        return self._summary
+
+    @property
+    def fixed_stars(self) -> List[Dict[str, Any]]:
+        """اتصال سیارات و زوایا با ستارگان ثابت (مانند فیلد 'fixed_stars' چارت)."""
+        if self._fixed_stars is None:
+            points = {name: lon for name, lon in zip(astrology_core.BODY_NAMES, self.longitudes.tolist()) if not np.isnan(lon)}
+            if self.has_houses:
+                points['ascendant'] = self.ascendant
+                points['midheaven'] = self.midheaven
+            self._fixed_stars = astrology_core.fixed_star_conjunctions(self.jd_utc, points)
+        return self._fixed_stars
+
+    # --- ذخیره‌سازی ---
+    def to_bytes(self) -> bytes:
+        city = self.city_name.encode('utf-8')
+        error = (self.house_error or "").encode('utf-8')
+        return b''.join((_HEADER.pack(_MAGIC, _FORMAT_VERSION, len(city), len(error)), self.data.tobytes(), city, error))
+
+    @classmethod
+    def from_bytes(cls, buffer: Union[bytes, bytearray, memoryview]) -> "ChartResult":
+        """بازسازی از خروجی to_bytes؛ آرایه داده یک view فقط‌خواندنی روی همان بافر است (بدون کپی)."""
+        magic, version, city_len, error_len = _HEADER.unpack_from(buffer, 0)
+        if magic != _MAGIC or version != _FORMAT_VERSION:
+            raise ValueError("Buffer is not a serialized ChartResult of a supported version.")
+        data = np.frombuffer(buffer, dtype=np.float64, count=DATA_LENGTH, offset=_HEADER.size)
+        tail = _HEADER.size + data.nbytes
+        city = bytes(buffer[tail:tail + city_len]).decode('utf-8')
+        error = bytes(buffer[tail + city_len:tail + city_len + error_len]).decode('utf-8') or None
+        return cls(data, city, error)
+
+    # --- سازگاری با کد موجود ---
+    def to_dict(self) -> Dict[str, Any]:
+        """ساختار دیکشنری calculate_natal_chart (برای هندلرها، تفسیر و ترسیم)."""
+        signs = self.signs.tolist()
+        houses = self.houses.tolist()
+        has_houses = self.has_houses
+
+        def placement(index: int, degree: float) -> Dict[str, Any]:
+            return {
+                "sign": astrology_core.SIGN_NAMES[signs[index]],
+                "sign_index": signs[index],
+                "degree_in_sign": degree % 30.0,
+                "house": houses[index] if has_houses else None,
+            }
+
+        planets = {}
+        for b, name in enumerate(astrology_core.BODY_NAMES):
+            lon, _, speed = self.bodies[b].tolist()
+            if np.isnan(lon):
+                planets[name] = {"error": PLANET_ERROR}
+            else:
+                planets[name] = {"degree": lon, "speed": speed, "status": "N/A (Calculated)", **placement(b, lon)}
+
+        if has_houses:
+            asc, mc = self.ascendant, self.midheaven
+            angle_signs = astrology_core.sign_indices([asc, mc]).tolist()
+            houses_dict = {
+                'ascendant': asc,
+                'midheaven': mc,
+                'cusps': {i + 1: cusp for i, cusp in enumerate(self.cusps.tolist())},
+                'error': None,
+                'ascendant_sign': astrology_core.SIGN_NAMES[angle_signs[0]],
+                'midheaven_sign': astrology_core.SIGN_NAMES[angle_signs[1]],
+            }
+        else:
+            houses_dict = {'ascendant': 0.0, 'midheaven': 0.0, 'cusps': {i: 0.0 for i in range(1, 13)}, 'error': self.house_error}
+
+        pof = self.part_of_fortune
+        if pof:
+            pof_dict = {"degree": pof[0], "is_day_birth": pof[1], **placement(N_BODIES, pof[0])}
+        else:
+            pof_dict = {"error": PART_OF_FORTUNE_ERROR}
+
+        return {
+            "datetime_utc": time_conversion.jd_to_utc_datetime(self.jd_utc).isoformat(),
+            "jd_utc": self.jd_utc,
+            "city_name": self.city_name,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "planets": planets,
+            "houses": houses_dict,
+            "aspects": [dict(aspect) for aspect in self.aspects],
+            "arabic_parts": {"part_of_fortune": pof_dict},
+            "summary": {key: dict(value) for key, value in self.summary.items()},
+            "fixed_stars": [dict(hit) for hit in self.fixed_stars],
+        }
+
+    def __repr__(self) -> str:
+        return f"ChartResult(jd_utc={self.jd_utc:.5f}, lat={self.latitude:.4f}, lon={self.longitude:.4f}, city={self.city_name!r})"
+
+
+def data_matrix(buffers: Sequence[Union[bytes, bytearray, memoryview]]) -> np.ndarray:
+    """آرایه‌های data چند چارت ذخیره‌شده (خروجی to_bytes) در یک ماتریس (N, DATA_LENGTH)، بدون ساخت شیء ChartResult."""
+    matrix = np.empty((len(buffers), DATA_LENGTH), dtype=np.float64)
+    for row, buffer in enumerate(buffers):
+        magic, version, _, _ = _HEADER.unpack_from(buffer, 0)
+        if magic != _MAGIC or version != _FORMAT_VERSION:
+            raise ValueError(f"Row {row} is not a serialized ChartResult of a supported version.")
+        matrix[row] = np.frombuffer(buffer, dtype=np.float64, count=DATA_LENGTH, offset=_HEADER.size)
+    return matrix
+
+
+def calculate_chart_result(birth_date_jalali: str, birth_time_str: str, city_name: str, latitude: Union[float, int],
+                           longitude: Union[float, int], timezone_str: str, house_system: bytes = b'P',
+                           backend: Union[str, astrology_core.PositionBackend, None] = None) -> ChartResult:
+    """
+    مانند astrology_core.calculate_natal_chart اما با خروجی ChartResult.
+    خطای تبدیل زمان به صورت استثنا (ValueError یا خطاهای pytz) صادر می‌شود.
+    """
+    jd_utc, _ = astrology_core.local_to_jd_utc(birth_date_jalali, birth_time_str, timezone_str)
+    lon_row, speed_row, cusps, ascmc, house_error = astrology_core.compute_chart_arrays(jd_utc, latitude, longitude, house_system, backend)
+    return ChartResult.from_arrays(jd_utc, latitude, longitude, house_system, lon_row, speed_row, cusps, ascmc,
+                                   city_name=city_name, house_error=house_error)
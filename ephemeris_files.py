@@ -0,0 +1,203 @@
+# ----------------------------------------------------------------------
+# ephemeris_files.py - انتخاب، کوچک‌سازی و گرم کردن فایل‌های اپمریس سوئیس (se1)
+#
+# هر فایل se1 بازه 600 ساله‌ای را پوشش می‌دهد: sepl_18 / semo_18 سال‌های 1800 تا 2400،
+# seplm06 سال‌های 600- تا 0 و ... . بازه پیش‌فرض همان بازه تاریخ‌های شمسی پشتیبانی‌شده در
+# time_conversion (1200 تا 1600 شمسی = 1821 تا 2222 میلادی) است که فقط sepl_18 و semo_18
+# (حدود 1.8 مگابایت از 64 مگابایت ephe_data) را لازم دارد.
+#
+# گزارش فایل‌های لازم:   python ephemeris_files.py report [سال شروع] [سال پایان]
+# ساخت پوشه کوچک‌شده:    python ephemeris_files.py build <پوشه مقصد> [سال شروع] [سال پایان]
+# بررسی یک پوشه:          python ephemeris_files.py verify <پوشه> [سال شروع] [سال پایان]
+# (با EPHE_PATH=<پوشه مقصد> برنامه از پوشه کوچک‌شده استفاده می‌کند.)
+#
+# در lifespan (astrology_core.setup_ephemeris) و هنگام شروع هر worker (chart_executor) فایل‌های لازم
+# یک بار خوانده می‌شوند تا در کش سیستم‌عامل باشند و با یک محاسبه در هر بازه در swisseph باز می‌شوند؛
+# بنابراین اولین کاربر هزینه باز کردن و خواندن سرد فایل را نمی‌پردازد.
+# ----------------------------------------------------------------------
+
+import os
+import sys
+import time
+import shutil
+import logging
+from typing import Dict, Any, List
+
+import swisseph as se
+
+import astrology_core
+import time_conversion
+
+logging.basicConfig(level=logging.INFO)
+
+# --- تنظیمات (قابل تغییر با متغیرهای محیطی) ---
+EPHE_YEAR_FROM = int(os.environ.get("EPHE_YEAR_FROM", str(time_conversion.JALALI_FIRST_YEAR + 621)))
+EPHE_YEAR_TO = int(os.environ.get("EPHE_YEAR_TO", str(time_conversion.JALALI_LAST_YEAR + 622)))
+# با مقدار 0 گرم کردن فایل‌ها هنگام شروع برنامه انجام نمی‌شود
+EPHE_WARMUP = os.environ.get("EPHE_WARMUP", "1") != "0"
+
+FILE_SPAN_YEARS = 600
+# پیشوند فایل‌ها: سیارات (شامل خورشید) و ماه (گره شمالی حقیقی هم از فایل ماه استفاده می‌کند)
+FILE_PREFIXES = ("sepl", "semo")
+# فایل‌های غیر se1 که همراه پوشه کوچک‌شده کپی می‌شوند
+EXTRA_FILES = ("sefstars.txt",)
+READ_CHUNK_BYTES = 1 << 20
+MOON_FILE_BODIES = (se.MOON, se.MEAN_NODE, se.TRUE_NODE)
+
+
+def file_blocks(year_from: int, year_to: int) -> List[int]:
+    """شماره بازه‌های 600 ساله (به سده) که سال‌های year_from تا year_to را پوشش می‌دهند؛ مثلاً [18]."""
+    first = (year_from // FILE_SPAN_YEARS) * 6
+    last = (year_to // FILE_SPAN_YEARS) * 6
+    return list(range(first, last + 1, 6))
+
+
+def file_name(prefix: str, block: int) -> str:
+    """نام فایل se1 یک بازه: sepl_18.se1 یا برای پیش از میلاد seplm06.se1."""
+    return f"{prefix}_{block:02d}.se1" if block >= 0 else f"{prefix}m{-block:02d}.se1"
+
+
+def required_files(year_from: int = EPHE_YEAR_FROM, year_to: int = EPHE_YEAR_TO) -> List[str]:
+    """نام فایل‌های se1 لازم برای بازه سال‌ها (به ترتیب زمانی)."""
+    return [file_name(prefix, block) for block in file_blocks(year_from, year_to) for prefix in FILE_PREFIXES]
+
+
+def _sample_jds(year_from: int, year_to: int) -> List[float]:
+    """اول و وسط و آخر هر بازه 600 ساله که با بازه سال‌ها هم‌پوشانی دارد (محدود به همان بازه)."""
+    jds = []
+    for block in file_blocks(year_from, year_to):
+        start = max(year_from, block * 100)
+        end = min(year_to, block * 100 + FILE_SPAN_YEARS - 1)
+        for year in (start, (start + end) // 2, end):
+            jds.append(se.julday(year, 7, 1, 12.0))
+    return jds
+
+
+def probe_files(year_from: int = EPHE_YEAR_FROM, year_to: int = EPHE_YEAR_TO) -> Dict[str, Any]:
+    """
+    بررسی تجربی با swisseph: در نمونه‌هایی از بازه همه اجسام محاسبه و فایل باز شده (se.get_current_file_data)
+    ثبت می‌شود. 'fallback' تعداد محاسباتی است که به دلیل نبود فایل به مدل Moshier (دقت کمتر) برگشته‌اند.
+    """
+    used, fallback = set(), 0
+    for jd in _sample_jds(year_from, year_to):
+        for planet_code in astrology_core.BODY_CODES:
+            retflag = se.calc_ut(jd, planet_code, astrology_core.CALC_FLAGS)[1]
+            if not retflag & se.FLG_SWIEPH:
+                fallback += 1
+                continue
+            # ماه و گره‌ها از فایل ماه (fno=1) و بقیه از فایل سیارات (fno=0) خوانده می‌شوند
+            path = se.get_current_file_data(1 if planet_code in MOON_FILE_BODIES else 0)[0]
+            if path:
+                used.add(os.path.basename(path))
+    return {"files": sorted(used), "fallback": fallback}
+
+
+def report(year_from: int = EPHE_YEAR_FROM, year_to: int = EPHE_YEAR_TO, ephe_path: str = astrology_core.EPHE_PATH) -> Dict[str, Any]:
+    """فایل‌های لازم برای بازه، حجم آن‌ها و حجم کل پوشه اپمریس."""
+    needed = required_files(year_from, year_to)
+    present = [name for name in needed if os.path.exists(os.path.join(ephe_path, name))]
+    all_files = [name for name in os.listdir(ephe_path) if name.endswith(".se1")] if os.path.isdir(ephe_path) else []
+    return {
+        "years": (year_from, year_to),
+        "required": needed,
+        "missing": [name for name in needed if name not in present],
+        "required_bytes": sum(os.path.getsize(os.path.join(ephe_path, name)) for name in present),
+        "total_files": len(all_files),
+        "total_bytes": sum(os.path.getsize(os.path.join(ephe_path, name)) for name in all_files),
+    }
+
+
+def build_trimmed_dir(target: str, year_from: int = EPHE_YEAR_FROM, year_to: int = EPHE_YEAR_TO,
+                      source: str = astrology_core.EPHE_PATH) -> List[str]:
+    """کپی فایل‌های لازم بازه (و sefstars.txt) به پوشه target. فهرست فایل‌های کپی‌شده را برمی‌گرداند."""
+    os.makedirs(target, exist_ok=True)
+    copied = []
+    for name in required_files(year_from, year_to) + list(EXTRA_FILES):
+        src = os.path.join(source, name)
+        if not os.path.exists(src):
+            logging.warning(f"Ephemeris file {src} not found; dates in its range will fall back to Moshier.")
+            continue
+        shutil.copy2(src, os.path.join(target, name))
+        copied.append(name)
+    logging.info(f"Trimmed ephemeris directory {target}: {len(copied)} files for {year_from}-{year_to}.")
+    return copied
+
+
+def read_files(year_from: int = EPHE_YEAR_FROM, year_to: int = EPHE_YEAR_TO, ephe_path: str = astrology_core.EPHE_PATH) -> int:
+    """خواندن کامل فایل‌های لازم تا در کش سیستم‌عامل قرار گیرند (مستقل از swisseph؛ در هر thread قابل اجراست). تعداد بایت خوانده‌شده."""
+    read_bytes = 0
+    for name in required_files(year_from, year_to):
+        path = os.path.join(ephe_path, name)
+        try:
+            with open(path, "rb") as f:
+                while True:
+                    chunk = f.read(READ_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    read_bytes += len(chunk)
+        except OSError as e:
+            logging.warning(f"Ephemeris warm-up could not read {path}: {e}")
+    return read_bytes
+
+
+def open_files(year_from: int = EPHE_YEAR_FROM, year_to: int = EPHE_YEAR_TO, ephe_path: str = astrology_core.EPHE_PATH) -> Dict[str, Any]:
+    """
+    باز کردن فایل‌ها در swisseph با یک محاسبه در هر بازه. وضعیت swisseph (مسیر و فایل‌های باز) برای هر thread
+    جداست، پس این تابع باید در همان thread یا پردازه‌ای اجرا شود که بعداً محاسبه می‌کند.
+    """
+    se.set_ephe_path(ephe_path)
+    probe = probe_files(year_from, year_to)
+    if probe["fallback"]:
+        logging.warning(f"Ephemeris files missing for part of {year_from}-{year_to}: {probe['fallback']} sample calculations used Moshier.")
+    return probe
+
+
+def warm_up(year_from: int = EPHE_YEAR_FROM, year_to: int = EPHE_YEAR_TO, ephe_path: str = astrology_core.EPHE_PATH) -> Dict[str, Any]:
+    """read_files و سپس open_files در thread جاری. بازگشت: حجم خوانده‌شده، فایل‌های باز شده، تعداد برگشت به Moshier و زمان (ثانیه)."""
+    start = time.perf_counter()
+    read_bytes = read_files(year_from, year_to, ephe_path)
+    probe = open_files(year_from, year_to, ephe_path)
+    return {"read_bytes": read_bytes, "files": probe["files"], "fallback": probe["fallback"], "seconds": time.perf_counter() - start}
+
+
+def verify_directory(path: str, year_from: int = EPHE_YEAR_FROM, year_to: int = EPHE_YEAR_TO) -> Dict[str, Any]:
+    """بررسی اینکه پوشه path برای بازه کافی است (هیچ محاسبه‌ای به Moshier برنگردد). مسیر قبلی بازگردانده می‌شود."""
+    se.set_ephe_path(path)
+    try:
+        return probe_files(year_from, year_to)
+    finally:
+        se.set_ephe_path(astrology_core.EPHE_PATH)
+
+
+def _years_from_argv(args: List[str]) -> tuple:
+    year_from = int(args[0]) if len(args) > 0 else EPHE_YEAR_FROM
+    year_to = int(args[1]) if len(args) > 1 else EPHE_YEAR_TO
+    return year_from, year_to
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "report"
+
+    if command == "build":
+        target = sys.argv[2]
+        year_from, year_to = _years_from_argv(sys.argv[3:])
+        copied = build_trimmed_dir(target, year_from, year_to)
+        print(f"copied: {', '.join(copied)}")
+        result = verify_directory(target, year_from, year_to)
+        print(f"verify: files used {result['files']}, Moshier fallbacks {result['fallback']}")
+    elif command == "verify":
+        target = sys.argv[2]
+        year_from, year_to = _years_from_argv(sys.argv[3:])
+        result = verify_directory(target, year_from, year_to)
+        print(f"files used {result['files']}, Moshier fallbacks {result['fallback']}")
+        sys.exit(1 if result["fallback"] else 0)
+    else:
+        year_from, year_to = _years_from_argv(sys.argv[2:])
+        info = report(year_from, year_to)
+        print(f"years {year_from}-{year_to}: {', '.join(info['required'])}")
+        if info["missing"]:
+            print(f"missing: {', '.join(info['missing'])}")
+        print(f"required size: {info['required_bytes'] / 1e6:.1f} MB of {info['total_bytes'] / 1e6:.1f} MB ({info['total_files']} se1 files)")
+        print(f"used by swisseph: {', '.join(probe_files(year_from, year_to)['files'])}")
+        warm = warm_up(year_from, year_to)
+        print(f"warm-up: {warm['read_bytes'] / 1e6:.1f} MB read in {warm['seconds'] * 1000:.1f} ms")
@@ -2,19 +2,52 @@
 
 import astrology_core
 import astrology_interpretation 
+import chart_cache
+import chart_index
+import chart_executor
+import interpretation_cache
+import image_cache
+import state_manager
+from chart_result import ChartResult
 import utils
 import keyboards
-# 💥💥💥 ایمپورت ماژول ترسیم چارت (جدید) 💥💥💥
-# این خط همان خطی است که احتمالاً خطای زمان شروع برنامه را ایجاد می‌کند
-from chart_drawer_fa import draw_chart_wheel_fa 
 from persiantools.jdatetime import JalaliDateTime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, AsyncIterator
+import os
+import asyncio
 import logging 
 import io 
 
 # تنظیم لاگینگ
 logging.basicConfig(level=logging.INFO)
 
+# ارسال تفسیر به صورت بخش به بخش (پیام اول بدون انتظار برای کل متن و تصویر)؛ با 0 کل متن یکجا ساخته می‌شود
+INTERPRETATION_STREAMING = os.environ.get("INTERPRETATION_STREAMING", "1") == "1"
+
+# سیستم خانه چارت‌های کاربران (Placidus)؛ همراه چارت در UserCharts ذخیره می‌شود
+CHART_HOUSE_SYSTEM = b'P'
+
+
+def _interpretation_error_message(error) -> str:
+    return utils.escape_markdown_v2(f"✅ محاسبه چارت موفق بود، اما خطایی در تولید تفسیر رخ داد: `{error}`")
+
+
+def _image_renderer(chart_result: Dict[str, Any]):
+    """رسم تصویر چارت در process pool (فقط در صورت نبود file_id و PNG در image_cache فراخوانی می‌شود)."""
+    async def render() -> Optional[bytes]:
+        image_buffer, _, _ = await chart_executor.render_chart(chart_result, interpret=False)
+        return image_buffer.getvalue() if image_buffer else None
+    return render
+
+
+async def _logged_sections(sections: AsyncIterator[str]) -> AsyncIterator[str]:
+    """بخش‌های تفسیر؛ خطای تولید ثبت می‌شود و ارسال با بخش‌های تا آن لحظه پایان می‌یابد."""
+    try:
+        async for section in sections:
+            yield section
+    except Exception as interp_e:
+        logging.error(f"FATAL: Interpretation failed: {interp_e}", exc_info=True)
+
 
 async def handle_chart_calculation(chat_id: int, state: dict, save_user_state_func):
     """
@@ -52,16 +85,20 @@ async def handle_chart_calculation(chat_id: int, state: dict, save_user_state_fu
         
         chart_result = None
         interpretation_text = ""
+        interpretation_stream: Optional[AsyncIterator[str]] = None
+        photo_task: Optional[asyncio.Task] = None
         msg = ""
 
-        # 3. فراخوانی تابع محاسبه چارت (Core)
-        chart_result = astrology_core.calculate_natal_chart(
+        # 3. فراخوانی تابع محاسبه چارت (Core) از طریق کش دو لایه
+        chart_result = await chart_cache.calculate_natal_chart_cached(
             birth_date_jalali=birth_date_str, 
             birth_time_str=birth_time, 
             city_name=city_name,
             latitude=float(latitude), 
             longitude=float(longitude), 
-            timezone_str=timezone
+            timezone_str=timezone,
+            house_system=CHART_HOUSE_SYSTEM,
+            compute=chart_executor.calculate_natal_chart
         )
 
         
@@ -71,62 +108,92 @@ async def handle_chart_calculation(chat_id: int, state: dict, save_user_state_fu
             msg = utils.escape_markdown_v2(f"❌ *خطای سیستمی در محاسبه چارت*:\n`{chart_result['error']}`")
         
         elif chart_result:
-            
-            # 💥💥💥 4.1. تولید تصویر چارت (گرافیک) 💥💥💥
-            image_buffer: Optional[io.BytesIO] = None
+
+            # ذخیره چارت کاربر برای پیام روزانه ترانزیت (transit_broadcast) و جستجوی ویژگی‌ها (chart_index)
             try:
-                # فراخوانی تابع ترسیم چارت
-                image_buffer = draw_chart_wheel_fa(chart_result) 
-            except Exception as draw_e:
-                logging.error(f"FATAL: Chart drawing failed: {draw_e}", exc_info=True)
-            
+                stored_chart = ChartResult.from_dict(chart_result, house_system=CHART_HOUSE_SYSTEM)
+                await state_manager.save_user_chart(chat_id, stored_chart.to_bytes())
+                await chart_index.index_chart(chat_id, stored_chart)
+            except Exception as e:
+                logging.error(f"Failed to store chart for chat {chat_id}: {e}")
             
-            # 💥💥💥 4.2. تولید تفسیر متنی 💥💥💥
-            try:
-                # فرض بر وجود astrology_interpretation.interpret_natal_chart است
-                interpretation_text = astrology_interpretation.interpret_natal_chart(chart_result)
-                
-                final_interpretation_message = (
-                    f"✨ **تفسیر کامل چارت تولد**\n"
-                    f"تاریخ: {birth_date_str}، زمان: {birth_time}\n"
-                    f"شهر: {city_name}\n\n"
-                    f"{interpretation_text}"
-                )
-                
-                msg = utils.escape_markdown_v2(final_interpretation_message)
-                
-            except Exception as interp_e:
-                error_msg_interp = f"✅ محاسبه چارت موفق بود، اما خطایی در تولید تفسیر رخ داد: `{interp_e}`"
-                logging.error(f"FATAL: Interpretation failed: {interp_e}", exc_info=True)
-                msg = utils.escape_markdown_v2(error_msg_interp)
+            # 💥💥💥 4.1. تولید تصویر چارت در process pool (خارج از حلقه رویداد)، هم‌زمان با ارسال تفسیر 💥💥💥
+            # اگر همین چارت قبلاً ارسال شده باشد، file_id تلگرام از image_cache می‌آید و رسم انجام نمی‌شود
+            render_image = _image_renderer(chart_result)
+            photo_task = asyncio.create_task(image_cache.image_cache.prepare(chart_result, render_image))
+
+            # 4.2. تفسیر متنی از کش امضای چارت (در صورت نبود: قطعه‌های از پیش فراردهی‌شده)
+            # متن تفسیر از قطعه‌های از پیش فراردهی‌شده ساخته شده است؛ فقط سرآغاز پیام فراردهی می‌شود
+            interpretation_intro = utils.escape_markdown_v2(
+                f"✨ **تفسیر کامل چارت تولد**\n"
+                f"تاریخ: {birth_date_str}، زمان: {birth_time}\n"
+                f"شهر: {city_name}\n\n"
+            )
+            if INTERPRETATION_STREAMING:
+                interpretation_stream = interpretation_cache.iter_interpretation(chart_result, prefix=interpretation_intro)
+            else:
+                try:
+                    interpretation_text = await interpretation_cache.interpret_cached(chart_result)
+                    msg = interpretation_intro + interpretation_text
+                except Exception as interp_e:
+                    logging.error(f"FATAL: Interpretation failed: {interp_e}", exc_info=True)
+                    msg = _interpretation_error_message(interp_e)
 
         
         # 5. ارسال خروجی نهایی به کاربر
-        if image_buffer:
-            
-            # 5.1. ارسال عکس با یک کپشن کوتاه
-            caption_short = utils.escape_markdown_v2(
-                f"✨ **نمودار چارت تولد شما**\n"
-                f"تاریخ: {birth_date_str}، زمان: {birth_time}"
-            )
-            
-            # استفاده از تابع جدید ارسال عکس
-            await utils.send_photo_with_caption(
-                utils.BOT_TOKEN, 
-                chat_id, 
-                photo=image_buffer, 
-                caption=caption_short
+        # 5.1. عکس با یک کپشن کوتاه، پیش از پیام دارای کیبورد (تنها پیام تفسیر معمولاً همان است، پس عکس اول می‌آید)؛
+        # رندر هم‌زمان با تولید و ارسال پیام‌های قبلی تفسیر انجام می‌شود
+        photo_sent = False
+
+        async def send_photo():
+            nonlocal photo_sent
+            if photo_sent or photo_task is None:
+                return
+            photo_sent = True
+            try:
+                photo = await photo_task
+            except Exception as e:
+                # خطای رسم (مثلاً ChartJobTimeout) نباید ارسال ادامه تفسیر و کیبورد را متوقف کند
+                logging.error(f"Chart image for chat {chat_id} not rendered: {e}")
+                return
+            if photo and (photo['file_id'] or photo['png']):
+                caption_short = utils.escape_markdown_v2(
+                    f"✨ **نمودار چارت تولد شما**\n"
+                    f"تاریخ: {birth_date_str}، زمان: {birth_time}"
+                )
+
+                # ارسال با file_id (بدون آپلود) یا آپلود تصویر و ذخیره file_id پاسخ
+                await image_cache.image_cache.send(
+                    utils.BOT_TOKEN,
+                    chat_id,
+                    photo,
+                    caption_short,
+                    render_image
+                )
+
+        # 5.2. ارسال تفسیر متنی کامل (در چند پیام در صورت عبور از سقف 4096 کاراکتر تلگرام)
+        if interpretation_stream is not None:
+            sent = await utils.send_message_stream(
+                utils.BOT_TOKEN,
+                chat_id,
+                _logged_sections(interpretation_stream),
+                keyboards.main_menu_keyboard(),
+                before_last=send_photo
             )
-        
-        # 5.2. ارسال تفسیر متنی کامل 
+            if not sent:
+                msg = _interpretation_error_message("no interpretation message was delivered")
         if msg:
-             await utils.send_message(
+             await utils.send_long_message(
                 utils.BOT_TOKEN, 
                 chat_id, 
                 msg, 
-                keyboards.main_menu_keyboard()
+                keyboards.main_menu_keyboard(),
+                before_last=send_photo
              )
-        elif not image_buffer:
+        # اگر هیچ پیامی ارسال نشد (مثلاً خطای شبکه پیش از آخرین پیام)، عکس همین‌جا فرستاده می‌شود
+        await send_photo()
+
+        if photo_task is None and not msg and interpretation_stream is None:
              await utils.send_message(
                 utils.BOT_TOKEN, 
                 chat_id, 
@@ -135,6 +202,11 @@ async def handle_chart_calculation(chat_id: int, state: dict, save_user_state_fu
              )
 
 
+    except (chart_executor.ChartExecutorBusy, chart_executor.ChartJobTimeout) as e:
+        logging.warning(f"Chart job for chat {chat_id} not completed: {e}")
+        busy_msg = utils.escape_markdown_v2("⏳ سرور در حال حاضر مشغول است. لطفاً چند لحظه دیگر دوباره تلاش کنید.")
+        await utils.send_message(utils.BOT_TOKEN, chat_id, busy_msg, keyboards.main_menu_keyboard())
+
     except Exception as e:
         error_msg = utils.escape_markdown_v2(f"❌ *خطای سیستمی بحرانی*:\nربات ناگهان متوقف شد. لطفاً دوباره تلاش کنید.")
         logging.critical(f"CRITICAL: Handler crashed completely outside inner block: {e}", exc_info=True)
@@ -0,0 +1,262 @@
+# ----------------------------------------------------------------------
+# image_cache.py - کش تصویر چارت و file_id تلگرام
+#
+# کلید: هش هندسه چارت (wheel_geometry)؛ یعنی هر آنچه روی چرخ رسم می‌شود (درجه‌ها با دقت 0.01 و برچسب‌ها
+# همان‌طور که نمایش داده می‌شوند) به همراه شناسه رسام (IMAGE_RENDERER_ID). چارت‌های تکراری یا اشتراکی
+# (هم‌تولدی‌ها، درخواست دوباره) کلید یکسان دارند.
+#
+#   file_id: پاسخ sendPhoto تلگرام شناسه فایل آپلودشده را برمی‌گرداند؛ ارسال‌های بعدی فقط همین شناسه را
+#            می‌فرستند (بدون رسم و بدون آپلود). در حافظه (LRU) و جدول aiosqlite ChartImages نگه داشته می‌شود.
+#   PNG:     بایت‌های تصویر در LRU درون‌پردازه‌ای با سقف حجم (IMAGE_CACHE_MAX_BYTES)، برای وقتی که file_id
+#            هنوز در دست نیست (مثلاً آپلود ناموفق) یا تلگرام آن را نپذیرد.
+# ----------------------------------------------------------------------
+
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Set, Callable, Awaitable
+
+import aiosqlite
+
+import chart_executor
+import image_encoding
+import state_manager
+import utils
+
+logging.basicConfig(level=logging.INFO)
+
+# --- تنظیمات (قابل تغییر با متغیرهای محیطی) ---
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get("IMAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+IMAGE_CACHE_MAX_FILE_IDS = int(os.environ.get("IMAGE_CACHE_MAX_FILE_IDS", "100000"))
+IMAGE_CACHE_TTL_SECONDS = float(os.environ.get("IMAGE_CACHE_TTL_SECONDS", str(180 * 24 * 3600)))
+# با مقدار 0 file_id ها فقط در حافظه نگه داشته می‌شوند
+IMAGE_CACHE_PERSISTENT = os.environ.get("IMAGE_CACHE_PERSISTENT", "1") != "0"
+# شناسه هر رسام (به همراه قالب و اندازه image_encoding)؛ با تغییر ظاهر چرخ تغییر داده شود تا تصاویر قدیمی دوباره استفاده نشوند
+IMAGE_RENDERER_IDS = {"matplotlib": "wheel_fa:1", "svg": "wheel_svg:1"}
+IMAGE_RENDERER_ID = f"{IMAGE_RENDERER_IDS[chart_executor.CHART_RENDERER]}:{image_encoding.encoding_id()}"
+
+
+def wheel_geometry(chart_data: Dict[str, Any]) -> tuple:
+    """
+    عناصر لایه چارت (chart_layout.wheel_overlay): کاسپ‌ها، سیارات (درجه، برج، درجه و دقیقه درون برج، رجعت) و زوایا.
+    این تابع عمداً matplotlib را وارد نمی‌کند (حلقه رویداد بدون رسام).
+    """
+    cusps = chart_data.get('houses', {}).get('cusps') or {}
+    planets = []
+    for name, data in chart_data.get('planets', {}).items():
+        if data.get('degree') is None:
+            continue
+        deg_in_sign = data['degree_in_sign'] if 'degree_in_sign' in data else data['degree'] % 30
+        planets.append((name, round(data['degree'], 2), data.get('sign_index'), int(deg_in_sign),
+                        int((deg_in_sign - int(deg_in_sign)) * 60), data.get('speed', 0.0) < 0))
+    return (
+        tuple((house, round(degree, 2)) for house, degree in cusps.items()),
+        tuple(planets),
+        tuple((a['aspect'], round(a['p1_deg'], 2), round(a['p2_deg'], 2)) for a in chart_data.get('aspects', [])),
+    )
+
+
+def image_key(chart_data: Dict[str, Any], renderer: str = IMAGE_RENDERER_ID) -> str:
+    digest = hashlib.blake2b(repr(wheel_geometry(chart_data)).encode("utf-8"), digest_size=16).hexdigest()
+    return f"{renderer}:{digest}"
+
+
+def photo_file_id(response: Dict[str, Any]) -> Optional[str]:
+    """file_id بزرگ‌ترین اندازه عکس در پاسخ sendPhoto."""
+    photos = (response.get('result') or {}).get('photo') or []
+    return photos[-1].get('file_id') if photos else None
+
+
+class ImageCache:
+    """file_id ها (LRU با سقف تعداد + جدول ChartImages) و بایت‌های PNG (LRU با سقف حجم)."""
+
+    def __init__(self, max_bytes: int = IMAGE_CACHE_MAX_BYTES, max_file_ids: int = IMAGE_CACHE_MAX_FILE_IDS,
+                 ttl_seconds: float = IMAGE_CACHE_TTL_SECONDS,
+                 db_path: Optional[str] = state_manager.DATABASE_NAME if IMAGE_CACHE_PERSISTENT else None):
+        self.max_bytes = max_bytes
+        self.max_file_ids = max_file_ids
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self._file_ids: "OrderedDict[str, str]" = OrderedDict()
+        self._images: "OrderedDict[str, bytes]" = OrderedDict()
+        self._image_bytes = 0
+        self.counters = {'file_id_hits': 0, 'png_hits': 0, 'renders': 0, 'uploads': 0,
+                         'file_id_rejected': 0, 'evictions': 0}
+        self._pending_writes: Set[asyncio.Task] = set()
+
+    # --- دیتابیس ---
+    async def init_db(self):
+        """ایجاد جدول ChartImages و حذف رکوردهای منقضی."""
+        if not self.db_path:
+            return
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS ChartImages (
+                    image_key TEXT PRIMARY KEY,
+                    file_id TEXT NOT NULL,
+                    stored_at REAL NOT NULL
+                )
+            """)
+            await db.execute("DELETE FROM ChartImages WHERE stored_at < ?", (time.time() - self.ttl_seconds,))
+            await db.commit()
+
+    async def _db_file_id(self, key: str) -> Optional[str]:
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                async with db.execute("SELECT file_id, stored_at FROM ChartImages WHERE image_key = ?", (key,)) as cursor:
+                    row = await cursor.fetchone()
+        except Exception as e:
+            logging.error(f"Image cache read failed: {e}")
+            return None
+        if not row or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return row[0]
+
+    async def _db_write(self, sql: str, params: tuple):
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.execute(sql, params)
+                await db.commit()
+        except Exception as e:
+            logging.error(f"Image cache write failed: {e}")
+
+    def _schedule_write(self, sql: str, params: tuple):
+        """نوشتن در پس‌زمینه تا ارسال عکس منتظر دیتابیس نماند."""
+        if not self.db_path:
+            return
+        task = asyncio.get_running_loop().create_task(self._db_write(sql, params))
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+
+    # --- file_id ---
+    async def get_file_id(self, key: str) -> Optional[str]:
+        file_id = self._file_ids.get(key)
+        if file_id is None and self.db_path:
+            file_id = await self._db_file_id(key)
+            if file_id is not None:
+                self._remember_file_id(key, file_id)
+        if file_id is not None:
+            self._file_ids.move_to_end(key)
+        return file_id
+
+    def _remember_file_id(self, key: str, file_id: str):
+        self._file_ids[key] = file_id
+        self._file_ids.move_to_end(key)
+        while len(self._file_ids) > self.max_file_ids:
+            self._file_ids.popitem(last=False)
+
+    def put_file_id(self, key: str, file_id: str):
+        self._remember_file_id(key, file_id)
+        self._schedule_write(
+            """
+            INSERT INTO ChartImages (image_key, file_id, stored_at) VALUES (?, ?, ?)
+            ON CONFLICT(image_key) DO UPDATE SET file_id = excluded.file_id, stored_at = excluded.stored_at
+            """,
+            (key, file_id, time.time())
+        )
+
+    def forget_file_id(self, key: str):
+        """file_id که تلگرام نپذیرفت (مثلاً پس از تغییر توکن بات)."""
+        self._file_ids.pop(key, None)
+        self._schedule_write("DELETE FROM ChartImages WHERE image_key = ?", (key,))
+
+    # --- PNG ---
+    def get_png(self, key: str) -> Optional[bytes]:
+        png = self._images.get(key)
+        if png is not None:
+            self._images.move_to_end(key)
+        return png
+
+    def put_png(self, key: str, png: bytes):
+        if len(png) > self.max_bytes:
+            return
+        previous = self._images.pop(key, None)
+        if previous is not None:
+            self._image_bytes -= len(previous)
+        self._images[key] = png
+        self._image_bytes += len(png)
+        while self._image_bytes > self.max_bytes:
+            _, evicted = self._images.popitem(last=False)
+            self._image_bytes -= len(evicted)
+            self.counters['evictions'] += 1
+
+    # --- رابط عمومی ---
+    async def prepare(self, chart_data: Dict[str, Any], render: Callable[[], Awaitable[Optional[bytes]]]) -> Dict[str, Any]:
+        """
+        آماده‌سازی عکس چارت پیش از ارسال: {'key', 'file_id', 'png'}.
+        اگر file_id موجود باشد رسم انجام نمی‌شود؛ وگرنه PNG از کش یا با render (در process pool) ساخته می‌شود.
+        """
+        key = image_key(chart_data)
+        file_id = await self.get_file_id(key)
+        if file_id is not None:
+            self.counters['file_id_hits'] += 1
+            return {'key': key, 'file_id': file_id, 'png': None}
+        return {'key': key, 'file_id': None, 'png': await self._png(key, render)}
+
+    async def _png(self, key: str, render: Callable[[], Awaitable[Optional[bytes]]]) -> Optional[bytes]:
+        png = self.get_png(key)
+        if png is not None:
+            self.counters['png_hits'] += 1
+            return png
+        png = await render()
+        self.counters['renders'] += 1
+        if png:
+            self.put_png(key, png)
+        return png
+
+    async def send(self, bot_token: str, chat_id: int, photo: Dict[str, Any], caption: str,
+                   render: Callable[[], Awaitable[Optional[bytes]]], reply_markup: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        ارسال عکس آماده‌شده با prepare. با file_id ارسال بدون آپلود است؛ اگر تلگرام file_id را نپذیرد،
+        تصویر (از کش یا با رسم دوباره) آپلود می‌شود. file_id پاسخ آپلود برای ارسال‌های بعدی ذخیره می‌شود.
+        """
+        key = photo['key']
+        if photo['file_id'] is not None:
+            response = await utils.send_photo_with_caption(bot_token, chat_id, photo['file_id'], caption, reply_markup,
+                                                           notify_on_error=False)
+            if response.get('ok'):
+                return True
+            logging.warning(f"Cached file_id rejected for {key}: {response.get('error')}")
+            self.counters['file_id_rejected'] += 1
+            self.forget_file_id(key)
+        png = photo['png'] or await self._png(key, render)
+        if not png:
+            return False
+        response = await utils.send_photo_with_caption(bot_token, chat_id, png, caption, reply_markup)
+        self.counters['uploads'] += 1
+        file_id = photo_file_id(response) if response.get('ok') else None
+        if file_id:
+            self.put_file_id(key, file_id)
+        return bool(response.get('ok'))
+
+    async def flush(self):
+        """انتظار برای پایان نوشتن‌های در حال انجام (هنگام خاموش شدن)."""
+        if self._pending_writes:
+            await asyncio.gather(*self._pending_writes)
+
+    def stats(self) -> Dict[str, Any]:
+        sends = self.counters['file_id_hits'] + self.counters['png_hits'] + self.counters['renders']
+        return {
+            **self.counters,
+            'file_ids': len(self._file_ids),
+            'images': len(self._images),
+            'image_bytes': self._image_bytes,
+            'max_bytes': self.max_bytes,
+            'file_id_hit_rate': self.counters['file_id_hits'] / sends if sends else 0.0,
+        }
+
+
+# نمونه پیش‌فرض مورد استفاده هندلرها
+image_cache = ImageCache()
+
+
+async def init_db():
+    """ایجاد جدول کش (از lifespan در bot_app فراخوانی می‌شود)."""
+    await image_cache.init_db()
+
+
+async def shutdown():
+    await image_cache.flush()
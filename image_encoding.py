@@ -0,0 +1,89 @@
+# ----------------------------------------------------------------------
+# image_encoding.py - مرحله رمزگذاری تصویر چارت پس از رسم (اندازه، قالب، فشرده‌سازی)
+#
+# رسام‌ها (chart_drawer_fa و chart_drawer_svg) یک تصویر Pillow برمی‌گردانند و این ماژول آن را برای
+# آپلود sendPhoto رمزگذاری می‌کند. حجم فایل بخش مهمی از زمان آپلود است و چرخ چارت فقط چند رنگ دارد.
+#   png:  PNG کامل (RGB) با سطح فشرده‌سازی CHART_PNG_COMPRESS_LEVEL
+#   png8: PNG پالتی (CHART_PNG_COLORS رنگ، بدون dithering)؛ پیش‌فرض: حدود یک چهارم حجم PNG کامل با PSNR حدود 45dB
+#   jpeg / webp: با کیفیت CHART_JPEG_QUALITY / CHART_WEBP_QUALITY
+# CHART_IMAGE_SIZE اندازه پیکسلی تصویر است؛ رسام‌ها مستقیماً در همین اندازه رسم می‌کنند (dpi شکل matplotlib
+# = CHART_IMAGE_SIZE / 10) و تصویر با اندازه دیگر پیش از رمزگذاری تغییر اندازه داده می‌شود.
+#
+# آمار هر قالب (تعداد، حجم و زمان رمزگذاری) در metrics جمع و در مسیر /<BOT_TOKEN>/stats نمایش داده می‌شود؛
+# مقایسه قالب‌ها: benchmarks/bench_image_encoding.py
+#
+# Pillow فقط در encode (در worker های chart_executor) وارد می‌شود؛ پردازه اصلی از این ماژول فقط
+# encoding_id و metrics را لازم دارد (بودجه زمان import: import_budget.py).
+# ----------------------------------------------------------------------
+
+import io
+import os
+import time
+from typing import Dict, Any, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# --- تنظیمات (قابل تغییر با متغیرهای محیطی) ---
+CHART_IMAGE_FORMAT = os.environ.get("CHART_IMAGE_FORMAT", "png8")
+CHART_IMAGE_SIZE = int(os.environ.get("CHART_IMAGE_SIZE", "1000"))
+CHART_PNG_COMPRESS_LEVEL = int(os.environ.get("CHART_PNG_COMPRESS_LEVEL", "6"))
+CHART_PNG_COLORS = int(os.environ.get("CHART_PNG_COLORS", "64"))
+CHART_JPEG_QUALITY = int(os.environ.get("CHART_JPEG_QUALITY", "85"))
+CHART_WEBP_QUALITY = int(os.environ.get("CHART_WEBP_QUALITY", "85"))
+
+# نوع MIME فایل آپلود از روی امضای فایل تعیین می‌شود (utils.image_file_type)
+IMAGE_FORMATS = ("png", "png8", "jpeg", "webp")
+if CHART_IMAGE_FORMAT not in IMAGE_FORMATS:
+    raise ValueError(f"Unknown CHART_IMAGE_FORMAT '{CHART_IMAGE_FORMAT}' (expected one of {sorted(IMAGE_FORMATS)}).")
+
+
+def encoding_id(fmt: str = CHART_IMAGE_FORMAT, size: int = CHART_IMAGE_SIZE) -> str:
+    """شناسه تنظیمات رمزگذاری (بخشی از کلید image_cache)."""
+    return f"{fmt}{size}"
+
+
+def encode(image: "Image.Image", fmt: str = CHART_IMAGE_FORMAT, size: int = CHART_IMAGE_SIZE) -> Tuple[bytes, float]:
+    """رمزگذاری تصویر رسم‌شده. بازگشت: (بایت‌های فایل، زمان رمزگذاری به میلی‌ثانیه شامل تغییر اندازه)."""
+    from PIL import Image
+    start = time.perf_counter()
+    if image.size != (size, size):
+        image = image.resize((size, size), Image.LANCZOS)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    buffer = io.BytesIO()
+    if fmt == "png":
+        image.save(buffer, format="PNG", compress_level=CHART_PNG_COMPRESS_LEVEL)
+    elif fmt == "png8":
+        palette = image.quantize(colors=CHART_PNG_COLORS, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+        palette.save(buffer, format="PNG", compress_level=CHART_PNG_COMPRESS_LEVEL)
+    elif fmt == "jpeg":
+        image.save(buffer, format="JPEG", quality=CHART_JPEG_QUALITY, optimize=True)
+    elif fmt == "webp":
+        image.save(buffer, format="WEBP", quality=CHART_WEBP_QUALITY)
+    else:
+        raise ValueError(f"Unknown image format '{fmt}'.")
+    return buffer.getvalue(), (time.perf_counter() - start) * 1000
+
+
+class EncodingMetrics:
+    """حجم و زمان رمزگذاری به تفکیک قالب (در پردازه اصلی، از نتیجه کارهای chart_executor)."""
+
+    def __init__(self):
+        self.formats: Dict[str, Dict[str, float]] = {}
+
+    def record(self, fmt: str, size_bytes: int, encode_ms: float):
+        entry = self.formats.setdefault(fmt, {'images': 0, 'bytes': 0, 'encode_ms': 0.0})
+        entry['images'] += 1
+        entry['bytes'] += size_bytes
+        entry['encode_ms'] += encode_ms
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            fmt: {**entry, 'mean_kb': entry['bytes'] / entry['images'] / 1e3,
+                  'mean_encode_ms': entry['encode_ms'] / entry['images']}
+            for fmt, entry in self.formats.items()
+        }
+
+
+metrics = EncodingMetrics()
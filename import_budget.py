@@ -0,0 +1,113 @@
+# ----------------------------------------------------------------------
+# import_budget.py - اندازه‌گیری زمان import ماژول‌ها و بودجه زمان شروع هر worker وب‌هوک
+#
+# هر worker uvicorn پیش از پاسخ به اولین وب‌هوک bot_app را import می‌کند. این ابزار import را در یک
+# پردازه تازه با `python -X importtime` اجرا می‌کند و هزینه هر ماژول (خودی و تجمعی) را گزارش می‌دهد.
+# زیرسیستم‌های سنگین در پردازه اصلی وارد نمی‌شوند:
+#   رسام‌ها (matplotlib / Pillow): فقط در worker های chart_executor (_renderer_module، image_encoding.encode)
+#   متن‌های تفسیر و کاتالوگ ستارگان ثابت: در lifespan یا اولین استفاده (interpretation_fragments.load،
+#   fixed_stars.load_catalogue)؛ گرم کردن فایل‌های اپمریس: astrology_core.setup_ephemeris
+#   jplephem: فقط با انتخاب backend 'jplephem' (astrology_core._load_jpl_backend)
+# ماژول‌های fixed_stars، interpretation_fragments و astrology_interpretation خودشان eager می‌مانند: هر کدام
+# حدود 1 میلی‌ثانیه‌اند (فقط NumPy و precession_nutation، بدون jplephem) و lifespan و هندلرها به‌هرحال لازمشان دارند.
+#
+# گزارش:              python import_budget.py report [ماژول]
+# بررسی بودجه:        python import_budget.py check [بودجه به میلی‌ثانیه] [ماژول]
+# check میانه IMPORT_BUDGET_RUNS اجرا را با IMPORT_BUDGET_MS مقایسه می‌کند و اگر زمان از بودجه بیشتر باشد
+# یا یکی از LAZY_MODULES در پردازه اصلی وارد شده باشد با کد 1 خارج می‌شود؛ در CI روی image ساخته‌شده
+# اجرا می‌شود (.github/workflows/docker-image.yml).
+# ----------------------------------------------------------------------
+
+import os
+import sys
+import statistics
+import subprocess
+from typing import Dict, Any, List
+
+# --- تنظیمات (قابل تغییر با متغیرهای محیطی) ---
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", "1200"))
+IMPORT_BUDGET_RUNS = int(os.environ.get("IMPORT_BUDGET_RUNS", "5"))
+IMPORT_BUDGET_MODULE = os.environ.get("IMPORT_BUDGET_MODULE", "bot_app")
+
+# بسته‌هایی که نباید در پردازه اصلی import شوند
+LAZY_MODULES = ("matplotlib", "PIL", "jplephem")
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure(module: str = IMPORT_BUDGET_MODULE) -> List[Dict[str, Any]]:
+    """
+    import ماژول در یک پردازه تازه با -X importtime.
+    بازگشت: فهرست ماژول‌ها به ترتیب پایان import با {'name', 'self_ms', 'cumulative_ms', 'depth'}؛
+    depth صفر یعنی import مستقیم از سطح بالا.
+    """
+    env = dict(os.environ)
+    # bot_app بدون BOT_TOKEN هم import می‌شود ولی خطای FATAL چاپ می‌کند
+    env.setdefault("BOT_TOKEN", "import-budget")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_DIR, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        stripped = name.lstrip(" ")
+        modules.append({
+            'name': stripped,
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+            'depth': (len(name) - len(stripped) - 1) // 2,
+        })
+    return modules
+
+
+def total_ms(modules: List[Dict[str, Any]]) -> float:
+    """زمان کل import (مجموع import های سطح بالا، شامل ماژول‌های شروع مفسر مانند site)."""
+    return sum(m['cumulative_ms'] for m in modules if m['depth'] == 0)
+
+
+def lazy_violations(modules: List[Dict[str, Any]]) -> List[str]:
+    """بسته‌های LAZY_MODULES که در پردازه اصلی وارد شده‌اند."""
+    return sorted({m['name'].split('.')[0] for m in modules} & set(LAZY_MODULES))
+
+
+def check(budget_ms: float = IMPORT_BUDGET_MS, module: str = IMPORT_BUDGET_MODULE,
+          runs: int = IMPORT_BUDGET_RUNS) -> Dict[str, Any]:
+    """میانه زمان import در runs اجرا (اجرای اول فقط برای ساخت .pyc و گرم کردن کش فایل‌ها)."""
+    measure(module)
+    samples = [measure(module) for _ in range(max(1, runs))]
+    median_ms = statistics.median(total_ms(modules) for modules in samples)
+    violations = lazy_violations(samples[-1])
+    return {
+        'module': module,
+        'median_ms': median_ms,
+        'budget_ms': budget_ms,
+        'lazy_violations': violations,
+        'ok': median_ms <= budget_ms and not violations,
+    }
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "report"
+
+    if command == "check":
+        budget = float(sys.argv[2]) if len(sys.argv) > 2 else IMPORT_BUDGET_MS
+        module = sys.argv[3] if len(sys.argv) > 3 else IMPORT_BUDGET_MODULE
+        result = check(budget, module)
+        print(f"import {module}: median {result['median_ms']:.1f} ms of {IMPORT_BUDGET_RUNS} runs, budget {budget:.0f} ms")
+        if result['lazy_violations']:
+            print(f"imported eagerly (should be lazy): {', '.join(result['lazy_violations'])}")
+        print("OK" if result['ok'] else "OVER BUDGET")
+        sys.exit(0 if result['ok'] else 1)
+    else:
+        module = sys.argv[2] if len(sys.argv) > 2 else IMPORT_BUDGET_MODULE
+        modules = measure(module)
+        print(f"import {module}: {total_ms(modules):.1f} ms")
+        print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+        for m in sorted(modules, key=lambda m: m['cumulative_ms'], reverse=True)[:25]:
+            print(f"{m['cumulative_ms']:14.1f} {m['self_ms']:9.1f}  {'  ' * m['depth']}{m['name']}")
@@ -0,0 +1,225 @@
+# ----------------------------------------------------------------------
+# interpretation_cache.py - کش متن تفسیر با کلید امضای گسسته چارت
+#
+# بدنه تفسیر (interpretation_fragments.render_body) فقط به این ویژگی‌ها وابسته است:
+#   برج طالع، (برج، خانه) سیارات، فهرست زوایا، اتصال ستارگان ثابت، خلاصه عناصر/کیفیت‌ها
+# و نه به درجه‌های خام. Orb زوایا و ستارگان در متن با دو رقم اعشار چاپ می‌شوند، پس با همان دقت
+# در امضا می‌آیند. لایه 1 با خود tuple ویژگی‌ها کلید می‌خورد؛ امضای لایه 2 = blake2b این ویژگی‌ها +
+# اثر انگشت متن‌های تفسیر (FragmentStore.digest) تا با تغییر متن‌ها رکوردهای قدیمی استفاده نشوند.
+# سرآغاز (شهر، تاریخ، زمان) جزو کش نیست و برای هر درخواست جداگانه ساخته می‌شود.
+#
+# لایه 1: LRU درون‌پردازه‌ای؛ لایه 2 (اختیاری): جدول aiosqlite با TTL (مانند chart_cache).
+# کاربرانی با امضای مشترک (مثلاً تولد در یک روز با ساعت پیش‌فرض 12:00 در یک شهر) بدنه را از کش می‌گیرند؛
+# نرخ hit در stats() و مسیر /<BOT_TOKEN>/stats بات قابل مشاهده است.
+# ----------------------------------------------------------------------
+
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Set, AsyncIterator
+
+import aiosqlite
+
+import astrology_interpretation as ai
+import interpretation_fragments
+import state_manager
+
+logging.basicConfig(level=logging.INFO)
+
+# --- تنظیمات (قابل تغییر با متغیرهای محیطی) ---
+INTERPRETATION_CACHE_MAX_SIZE = int(os.environ.get("INTERPRETATION_CACHE_MAX_SIZE", "4096"))
+INTERPRETATION_CACHE_TTL_SECONDS = float(os.environ.get("INTERPRETATION_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+# لایه دوم (دیتابیس) به طور پیش‌فرض خاموش است: هر miss یک خواندن sqlite (حدود 1 میلی‌ثانیه) دارد،
+# در حالی که ساخت بدنه از قطعه‌ها کمتر از 0.1 میلی‌ثانیه است؛ با مقدار 1 روشن می‌شود (مثلاً برای چند نمونه بات)
+INTERPRETATION_CACHE_PERSISTENT = os.environ.get("INTERPRETATION_CACHE_PERSISTENT", "0") == "1"
+
+
+def _rounded(counts: Dict[str, float]) -> tuple:
+    return tuple((name, round(count, 2)) for name, count in counts.items())
+
+
+def chart_features(chart_data: Dict[str, Any]) -> tuple:
+    """
+    ویژگی‌های گسسته‌ای که بدنه تفسیر را مشخص می‌کنند، به ترتیب استفاده در render_body (کلید لایه 1).
+    round(x, 2) همان گرد کردن قالب '.2f' متن تفسیر است.
+    """
+    planets = chart_data['planets']
+    summary = chart_data.get('summary', {})
+    return (
+        chart_data.get('houses', {}).get('ascendant_sign'),
+        tuple((data.get('sign', 'UNKNOWN'), data.get('house')) if (data := planets.get(planet)) is not None else None
+              for planet in ai.INNER_PLANETS + ai.OUTER_PLANETS),
+        tuple((a['aspect'], a['p1'], a['p2'], round(a['orb'], 2)) for a in chart_data.get('aspects', [])),
+        tuple((h['point'], h['star'], round(h['orb'], 2)) for h in chart_data.get('fixed_stars', [])[:ai.FIXED_STAR_MAX_LINES]),
+        _rounded(summary.get('elements', {})),
+        _rounded(summary.get('qualities', {})),
+    )
+
+
+def chart_signature(features: tuple) -> str:
+    """امضای کانونی (کلید لایه 2): اثر انگشت متن‌های تفسیر + blake2b ویژگی‌ها."""
+    digest = hashlib.blake2b(repr(features).encode("utf-8"), digest_size=16).hexdigest()
+    return f"{interpretation_fragments.load().digest}:{digest}"
+
+
+class InterpretationCache:
+    """کش بدنه تفسیر فراردهی‌شده (بایت‌های UTF-8)؛ لایه 1 با کلید chart_features و لایه 2 با chart_signature."""
+
+    def __init__(self, max_size: int = INTERPRETATION_CACHE_MAX_SIZE, ttl_seconds: float = INTERPRETATION_CACHE_TTL_SECONDS,
+                 db_path: Optional[str] = state_manager.DATABASE_NAME if INTERPRETATION_CACHE_PERSISTENT else None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self._entries: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self.counters = {'l1_hits': 0, 'l2_hits': 0, 'misses': 0, 'evictions': 0}
+        self._pending_writes: Set[asyncio.Task] = set()
+
+    # --- لایه 1 ---
+    def _put_l1(self, features: tuple, body: bytes):
+        self._entries[features] = body
+        self._entries.move_to_end(features)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    # --- لایه 2 ---
+    async def init_db(self):
+        """ایجاد جدول InterpretationCache و حذف رکوردهای منقضی."""
+        if not self.db_path:
+            return
+        async with aiosqlite.connect(self.db_path) as db:
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS InterpretationCache (
+                    signature TEXT PRIMARY KEY,
+                    body BLOB NOT NULL,
+                    stored_at REAL NOT NULL
+                )
+            """)
+            await db.execute("DELETE FROM InterpretationCache WHERE stored_at < ?", (time.time() - self.ttl_seconds,))
+            await db.commit()
+
+    async def _get_l2(self, signature: str) -> Optional[bytes]:
+        if not self.db_path:
+            return None
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                async with db.execute("SELECT body, stored_at FROM InterpretationCache WHERE signature = ?", (signature,)) as cursor:
+                    row = await cursor.fetchone()
+        except Exception as e:
+            logging.error(f"Interpretation cache read failed: {e}")
+            return None
+        if not row or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return row[0]
+
+    async def _put_l2(self, signature: str, body: bytes):
+        if not self.db_path:
+            return
+        try:
+            async with aiosqlite.connect(self.db_path) as db:
+                await db.execute(
+                    """
+                    INSERT INTO InterpretationCache (signature, body, stored_at) VALUES (?, ?, ?)
+                    ON CONFLICT(signature) DO UPDATE SET body = excluded.body, stored_at = excluded.stored_at
+                    """,
+                    (signature, body, time.time())
+                )
+                await db.commit()
+        except Exception as e:
+            logging.error(f"Interpretation cache write failed: {e}")
+
+    # --- رابط عمومی ---
+    async def get(self, features: tuple) -> Optional[bytes]:
+        body = self._entries.get(features)
+        if body is not None:
+            self._entries.move_to_end(features)
+            self.counters['l1_hits'] += 1
+            return body
+        body = await self._get_l2(chart_signature(features)) if self.db_path else None
+        if body is not None:
+            self.counters['l2_hits'] += 1
+            self._put_l1(features, body)
+            return body
+        self.counters['misses'] += 1
+        return None
+
+    def put(self, features: tuple, body: bytes):
+        """ذخیره در لایه 1؛ نوشتن در لایه 2 در پس‌زمینه انجام می‌شود تا پاسخ کاربر منتظر دیتابیس نماند."""
+        self._put_l1(features, body)
+        if self.db_path:
+            task = asyncio.get_running_loop().create_task(self._put_l2(chart_signature(features), body))
+            self._pending_writes.add(task)
+            task.add_done_callback(self._pending_writes.discard)
+
+    async def flush(self):
+        """انتظار برای پایان نوشتن‌های در حال انجام لایه 2 (هنگام خاموش شدن)."""
+        if self._pending_writes:
+            await asyncio.gather(*self._pending_writes)
+
+    def clear(self):
+        """پاک کردن لایه 1 (لایه 2 دست نخورده می‌ماند)."""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters['l1_hits'] + self.counters['l2_hits'] + self.counters['misses']
+        hits = self.counters['l1_hits'] + self.counters['l2_hits']
+        return {
+            **self.counters,
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'lookups': lookups,
+            'hit_rate': hits / lookups if lookups else 0.0,
+        }
+
+
+# نمونه پیش‌فرض مورد استفاده هندلرها
+interpretation_cache = InterpretationCache()
+
+
+async def init_db():
+    """ایجاد جدول کش (از lifespan در bot_app فراخوانی می‌شود)."""
+    await interpretation_cache.init_db()
+
+
+async def shutdown():
+    await interpretation_cache.flush()
+
+
+async def interpret_cached(chart_data: Dict[str, Any], cache: Optional[InterpretationCache] = None) -> str:
+    """
+    تفسیر فراردهی‌شده (MarkdownV2) چارت، برابر interpretation_fragments.render_escaped.
+    بدنه از کش خوانده یا ساخته و ذخیره می‌شود؛ سرآغاز هر بار ساخته می‌شود.
+    """
+    cache = cache or interpretation_cache
+    store = interpretation_fragments.load()
+    features = chart_features(chart_data)
+    body = await cache.get(features)
+    if body is None:
+        body = store.render_body(chart_data)
+        cache.put(features, body)
+    return (store.render_header(chart_data) + body).decode("utf-8")
+
+
+async def iter_interpretation(chart_data: Dict[str, Any], prefix: str = "",
+                              cache: Optional[InterpretationCache] = None) -> AsyncIterator[str]:
+    """
+    تفسیر فراردهی‌شده به صورت بخش به بخش (طالع، سیارات اصلی، سیارات بیرونی، زوایا، ستارگان ثابت، خلاصه)
+    برای utils.send_message_stream. prefix (فراردهی‌شده) و سرآغاز به ابتدای بخش اول افزوده می‌شوند.
+    در صورت hit کل بدنه یکجا برگردانده می‌شود؛ در غیر این صورت پس از آخرین بخش در کش ذخیره می‌شود.
+    """
+    cache = cache or interpretation_cache
+    store = interpretation_fragments.load()
+    head = prefix.encode("utf-8") + store.render_header(chart_data)
+    features = chart_features(chart_data)
+    body = await cache.get(features)
+    if body is not None:
+        yield (head + body).decode("utf-8")
+        return
+    sections = []
+    for _, section in store.iter_sections(chart_data):
+        yield ((head + section) if not sections else section).decode("utf-8")
+        sections.append(section)
+    cache.put(features, b"".join(sections))
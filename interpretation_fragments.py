@@ -0,0 +1,208 @@
+# ----------------------------------------------------------------------
+# interpretation_fragments.py - قطعه‌های از پیش فراردهی‌شده (MarkdownV2) متن تفسیر چارت
+#
+# همه متن‌های ثابت astrology_interpretation (عنوان بخش‌ها، طالع، سیاره در برج، سیاره در خانه، زوایا،
+# حاکم چارت و ستارگان ثابت) یک بار هنگام شروع برنامه با utils.escape_markdown_v2 فراردهی و به صورت
+# بایت‌های UTF-8 در یک فهرست ذخیره می‌شوند (شناسه هر قطعه = ایندکس آن در فهرست).
+# تولید تفسیر یک چارت فقط جستجوی شناسه‌ها و یک b"".join است؛ تنها بخش‌های متغیر (نام شهر، تاریخ و
+# اعداد Orb و خلاصه عناصر) هنگام درخواست و بدون regex (str.translate) فراردهی می‌شوند.
+#
+# خروجی render_escaped دقیقاً برابر utils.escape_markdown_v2(interpret_natal_chart(chart)) است
+# (benchmarks/bench_interpretation.py این برابری را بررسی می‌کند).
+# ----------------------------------------------------------------------
+
+import hashlib
+import logging
+from typing import Dict, Any, List, Optional, Callable, Iterator, Tuple
+
+import astrology_core
+import astrology_interpretation as ai
+import utils
+
+logging.basicConfig(level=logging.INFO)
+
+HOUSE_KEYS: List[Optional[int]] = list(range(1, 13)) + [None]
+
+
+def _escape(text: str) -> bytes:
+    return text.translate(utils.MARKDOWN_V2_ESCAPES).encode("utf-8")
+
+
+def _number(value: float) -> bytes:
+    """عدد با دو رقم اعشار، فراردهی‌شده (تنها کاراکترهای خاص ممکن '.' و '-' هستند)."""
+    return f"{value:.2f}".replace(".", "\\.").replace("-", "\\-").encode("ascii")
+
+
+class FragmentStore:
+    """فهرست قطعه‌های فراردهی‌شده و جدول‌های کلید -> شناسه قطعه."""
+
+    def __init__(self):
+        self.fragments: List[bytes] = []
+        self._text_ids: Dict[str, int] = {}
+        self._key_ids: Dict[tuple, int] = {}
+
+        self.newline = self.add("\n")
+        self.titles = {name: self.add(title) for name, title in ai.SECTION_TITLES.items()}
+        self.element_line = self.add("  • عناصر: ")
+        self.quality_line = self.add("  • کیفیت‌ها: ")
+        self.list_separator = self.add("، ")
+        self.count_suffix = self.add(" سیاره")
+
+        for sign in astrology_core.SIGN_NAMES + [None]:
+            self.key_id(("ascendant", sign), lambda: ai.ascendant_text(sign))
+        for planet in ai.INNER_PLANETS + ['true_node']:
+            for sign in astrology_core.SIGN_NAMES:
+                self.key_id(("sign", planet, sign), lambda: ai.planet_sign_text(planet, sign))
+        for planet in ai.INNER_PLANETS + ai.OUTER_PLANETS[:-1]:
+            for house in HOUSE_KEYS:
+                self.key_id(("house", planet, house), lambda: ai.planet_house_text(planet, house))
+        points = [name.upper() for name in astrology_core.BODY_NAMES]
+        for aspect_name in astrology_core.ASPECT_ENGINE.aspect_names:
+            for p1 in points:
+                for p2 in points:
+                    if p1 != p2:
+                        self._aspect_ids(aspect_name, p1, p2)
+        for names in (ai.ELEMENT_MAP, ai.QUALITY_MAP):
+            for name, name_fa in names.items():
+                self.key_id(("count", name), lambda: f"{name_fa}: ")
+        for star in ai.FIXED_STAR_INTERPRETATIONS:
+            for point in astrology_core.BODY_NAMES + ['ascendant', 'midheaven']:
+                self._star_ids(point, star)
+        # حاکم چارت: (خانه طالع، خانه حاکم) -> شناسه؛ هنوز در interpret_natal_chart استفاده نمی‌شود
+        self.ruler_ids: Dict[tuple, int] = {
+            (asc_house, house): self.add(text)
+            for asc_house, houses in ai.RULER_IN_HOUSE_INTERPRETATIONS.items()
+            for house, text in houses.items()
+        }
+        # اثر انگشت متن‌ها: با تغییر هر متن تفسیر، کلیدهای interpretation_cache هم عوض می‌شوند
+        self.digest = hashlib.blake2b(b"\0".join(self.fragments), digest_size=8).hexdigest()
+        logging.info(f"Interpretation fragments compiled: {len(self.fragments)} fragments, "
+                     f"{sum(len(f) for f in self.fragments) / 1e3:.0f} kB.")
+
+    def add(self, text: str) -> int:
+        """افزودن متن (فراردهی‌شده یک بار) و بازگرداندن شناسه آن؛ متن تکراری شناسه قبلی را می‌گیرد."""
+        fragment_id = self._text_ids.get(text)
+        if fragment_id is None:
+            fragment_id = len(self.fragments)
+            self.fragments.append(utils.escape_markdown_v2(text).encode("utf-8"))
+            self._text_ids[text] = fragment_id
+        return fragment_id
+
+    def key_id(self, key: tuple, build: Callable[[], str]) -> int:
+        """شناسه قطعه کلید key؛ کلید ناشناخته (مثلاً برج 'UNKNOWN') یک بار ساخته و نگه داشته می‌شود."""
+        fragment_id = self._key_ids.get(key)
+        if fragment_id is None:
+            fragment_id = self._key_ids[key] = self.add(build())
+        return fragment_id
+
+    def _aspect_ids(self, aspect_name: str, p1: str, p2: str) -> tuple:
+        key = ("aspect", aspect_name, p1, p2)
+        ids = self._key_ids.get(key)
+        if ids is None:
+            before, after = ai.aspect_line_parts(aspect_name, p1, p2)
+            ids = self._key_ids[key] = (self.add(before), self.add(after))
+        return ids
+
+    def _star_ids(self, point: str, star: str) -> tuple:
+        key = ("star", point, star)
+        ids = self._key_ids.get(key)
+        if ids is None:
+            before, after = ai.fixed_star_line_parts(point, star)
+            ids = self._key_ids[key] = (self.add(before), self.add(after))
+        return ids
+
+    def render_header(self, chart_data: Dict[str, Any]) -> bytes:
+        """سرآغاز تفسیر (محل، تاریخ و زمان تولد)؛ تنها بخشی که به داده ورودی کاربر وابسته است."""
+        return _escape(ai.header_text(chart_data.get('city_name', 'نامشخص'),
+                                      chart_data.get('birth_date_jalali', 'تاریخ نامشخص'),
+                                      chart_data.get('birth_time_str', 'زمان نامشخص')))
+
+    def iter_sections(self, chart_data: Dict[str, Any]) -> Iterator[Tuple[str, bytes]]:
+        """
+        بخش‌های بدنه تفسیر به ترتیب: (نام بخش در SECTION_TITLES، بایت‌های فراردهی‌شده).
+        زوایا و ستارگان ثابت فقط در صورت وجود می‌آیند؛ اتصال بخش‌ها پشت سر هم برابر render_body است.
+        """
+        f = self.fragments
+        nl = f[self.newline]
+        planets = chart_data['planets']
+
+        asc_sign = chart_data.get('houses', {}).get('ascendant_sign')
+        yield 'ascendant', b"".join([f[self.titles['ascendant']], nl,
+                                     f[self.key_id(("ascendant", asc_sign), lambda: ai.ascendant_text(asc_sign))]])
+
+        out = [nl, f[self.titles['inner']]]
+        for planet in ai.INNER_PLANETS:
+            data = planets.get(planet)
+            if data is None:
+                continue
+            sign, house = data.get('sign', 'UNKNOWN'), data.get('house')
+            sign_id = self.key_id(("sign", planet, sign), lambda: ai.planet_sign_text(planet, sign))
+            house_id = self.key_id(("house", planet, house), lambda: ai.planet_house_text(planet, house))
+            out += [nl, nl, f[sign_id], nl, f[house_id]]
+        yield 'inner', b"".join(out)
+
+        out = [nl, f[self.titles['outer']]]
+        for planet in ai.OUTER_PLANETS:
+            data = planets.get(planet)
+            if data is None:
+                continue
+            if planet == 'true_node':
+                sign = data.get('sign', 'UNKNOWN')
+                fragment_id = self.key_id(("sign", planet, sign), lambda: ai.planet_sign_text(planet, sign))
+            else:
+                house = data.get('house')
+                fragment_id = self.key_id(("house", planet, house), lambda: ai.planet_house_text(planet, house))
+            out += [nl, nl, f[fragment_id]]
+        yield 'outer', b"".join(out)
+
+        aspects = chart_data.get('aspects', [])
+        if aspects:
+            out = [nl, f[self.titles['aspects']]]
+            for aspect in aspects:
+                before, after = self._aspect_ids(aspect['aspect'], *ai.aspect_names(aspect))
+                out += [nl, f[before], _number(aspect['orb']), f[after]]
+            yield 'aspects', b"".join(out)
+
+        hits = chart_data.get('fixed_stars', [])
+        if hits:
+            out = [nl, f[self.titles['fixed_stars']]]
+            for hit in hits[:ai.FIXED_STAR_MAX_LINES]:
+                before, after = self._star_ids(hit['point'], hit['star'])
+                out += [nl, f[before], _number(hit['orb']), f[after]]
+            yield 'fixed_stars', b"".join(out)
+
+        summary = chart_data.get('summary', {})
+        out = [nl, f[self.titles['summary']]]
+        for line_id, counts, names in ((self.element_line, summary.get('elements', {}), ai.ELEMENT_MAP),
+                                       (self.quality_line, summary.get('qualities', {}), ai.QUALITY_MAP)):
+            out += [nl, f[line_id]]
+            for i, (name, count) in enumerate(counts.items()):
+                if i:
+                    out.append(f[self.list_separator])
+                out += [f[self.key_id(("count", name), lambda: f"{names.get(name, name)}: ")], _number(count),
+                        f[self.count_suffix]]
+        yield 'summary', b"".join(out)
+
+    def render_body(self, chart_data: Dict[str, Any]) -> bytes:
+        """بدنه تفسیر (بدون سرآغاز)؛ فقط به ویژگی‌های گسسته چارت و Orb های گرد شده وابسته است (interpretation_cache)."""
+        return b"".join(section for _, section in self.iter_sections(chart_data))
+
+    def render(self, chart_data: Dict[str, Any]) -> bytes:
+        """تفسیر فراردهی‌شده چارت (UTF-8)؛ ترتیب و متن همانند astrology_interpretation.interpret_natal_chart."""
+        return self.render_header(chart_data) + self.render_body(chart_data)
+
+
+_store: Optional[FragmentStore] = None
+
+
+def load() -> FragmentStore:
+    """ساخت قطعه‌ها (یک بار در هر پردازه؛ از lifespan و worker های chart_executor فراخوانی می‌شود)."""
+    global _store
+    if _store is None:
+        _store = FragmentStore()
+    return _store
+
+
+def render_escaped(chart_data: Dict[str, Any]) -> str:
+    """تفسیر چارت، آماده ارسال با parse_mode='MarkdownV2' (بدون نیاز به utils.escape_markdown_v2)."""
+    return load().render(chart_data).decode("utf-8")
@@ -0,0 +1,201 @@
+# ----------------------------------------------------------------------
+# jpl_ephemeris.py - backend موقعیت سیارات بر پایه کرنل‌های DE ناسا (jplephem)
+#
+# کرنل SPK (مثلاً de440s.bsp یا de421.bsp) با jplephem به صورت memory-map باز می‌شود و
+# طول دایره‌البروجی ظاهری ژئوسنتریک (اعتدال حقیقی تاریخ، مانند پیش‌فرض swisseph)
+# برای کل آرایه JD ها در یک فراخوانی برداری محاسبه می‌شود:
+#   زمان نوری → ابیراهی سالانه → پرسشن IAU 1976 → نوتیشن IAU 1980 (جملات اصلی؛ precession_nutation)
+# گره شمالی حقیقی در کرنل‌های DE وجود ندارد و به swisseph سپرده می‌شود.
+#
+# کرنل در مخزن نیست و backend 'jplephem' فقط در صورت وجود آن (astrology_core.JPL_KERNEL_PATH) ثبت می‌شود.
+# دریافت کرنل (حدود 32 مگابایت، 1849 تا 2150):  python jpl_ephemeris.py download [مسیر]
+#   (در Docker: docker build --build-arg JPL_KERNEL=1 .)
+# مقایسه با swisseph:                          python jpl_ephemeris.py check [مسیر]
+#   با کد 1 خارج می‌شود اگر اختلاف از CROSS_CHECK_TOLERANCE_ARCSEC بیشتر باشد؛ بدون کرنل SKIP (کد 0)،
+#   مگر در CI (متغیر محیطی CI) که نبود کرنل هم خطاست. CI image را با JPL_KERNEL=1 می‌سازد.
+# ----------------------------------------------------------------------
+
+import os
+import sys
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import swisseph as se
+from jplephem.spk import SPK
+
+import astrology_core
+from precession_nutation import J2000, nutation_and_obliquity, precession_matrices
+
+logging.basicConfig(level=logging.INFO)
+
+JPL_KERNEL_PATH = astrology_core.JPL_KERNEL_PATH
+JPL_KERNEL_URL = os.environ.get("JPL_KERNEL_URL", "https://ssd.jpl.nasa.gov/ftp/eph/planets/bsp/de440s.bsp")
+# بیشینه اختلاف مجاز با swisseph در cross_check (ثانیه قوس)
+CROSS_CHECK_TOLERANCE_ARCSEC = 5.0
+
+C_KM_PER_DAY = 299792.458 * 86400.0
+# پرسشن عمومی در طول (5028.796 ثانیه قوس در قرن) بر حسب درجه در روز
+GENERAL_PRECESSION_DEG_PER_DAY = 5028.796 / 3600.0 / 36525.0
+
+# زنجیره سگمنت‌های SPK از مرکز جرم منظومه تا هر جسم (کد swisseph -> [(مرکز، هدف)])
+BODY_CHAINS: Dict[int, List[Tuple[int, int]]] = {
+    0: [(0, 10)],             # خورشید
+    1: [(0, 3), (3, 301)],    # ماه
+    2: [(0, 1)],              # عطارد (مرکز جرم سیستم)
+    3: [(0, 2)],              # زهره
+    4: [(0, 4)],              # مریخ
+    5: [(0, 5)],              # مشتری
+    6: [(0, 6)],              # زحل
+    7: [(0, 7)],              # اورانوس
+    8: [(0, 8)],              # نپتون
+    9: [(0, 9)],              # پلوتو
+}
+EARTH_CHAIN = [(0, 3), (3, 399)]
+
+def _delta_t_days(jd_ut: np.ndarray) -> np.ndarray:
+    """ΔT (TT - UT) بر حسب روز، درون‌یابی شده از se.deltat روی شبکه 30 روزه (ΔT بسیار کند تغییر می‌کند)."""
+    grid = np.arange(jd_ut.min() - 30.0, jd_ut.max() + 60.0, 30.0)
+    return np.interp(jd_ut, grid, [se.deltat(float(g)) for g in grid])
+
+
+class JPLEphemerisBackend(astrology_core.PositionBackend):
+    """backend برداری jplephem؛ JD های خارج از بازه کرنل و اجسام ناموجود به swisseph سپرده می‌شوند."""
+    name = "jplephem"
+
+    def __init__(self, kernel_path: str = JPL_KERNEL_PATH, fallback: Optional[astrology_core.PositionBackend] = None):
+        # SPK.open فایل را memory-map می‌کند؛ فقط بخش‌های لازم از دیسک خوانده می‌شوند
+        self.kernel = SPK.open(kernel_path)
+        self.kernel_path = kernel_path
+        self.fallback = fallback or astrology_core.SwissEphemerisBackend()
+        self._segments = {(s.center, s.target): s for s in self.kernel.segments}
+        self.start_jd = max(s.start_jd for s in self.kernel.segments)
+        self.end_jd = min(s.end_jd for s in self.kernel.segments)
+        self.supported_codes = {code for code, chain in BODY_CHAINS.items() if all(link in self._segments for link in chain)}
+
+    def close(self):
+        self.kernel.close()
+
+    def _position(self, chain: Sequence[Tuple[int, int]], tdb: np.ndarray, with_velocity: bool = False):
+        if not with_velocity:
+            return sum(self._segments[link].compute(tdb) for link in chain)
+        pos, vel = 0.0, 0.0
+        for link in chain:
+            p, v = self._segments[link].compute_and_differentiate(tdb)
+            pos, vel = pos + p, vel + v
+        return pos, vel
+
+    def _apparent_longitudes(self, jd_ut: np.ndarray, body_codes: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """طول ظاهری ژئوسنتریک (درجه) و سرعت روزانه برای همه JD ها و اجسام پشتیبانی‌شده؛ خروجی‌ها (N, B)."""
+        tdb = jd_ut + _delta_t_days(jd_ut)   # TDB ≈ TT
+        t = (tdb - J2000) / 36525.0
+        earth_pos, earth_vel = self._position(EARTH_CHAIN, tdb, with_velocity=True)
+        beta = earth_vel / C_KM_PER_DAY
+        precession = precession_matrices(t)
+        dpsi, eps = nutation_and_obliquity(t)
+        ce, s_e = np.cos(eps), np.sin(eps)
+
+        lon = np.full((len(jd_ut), len(body_codes)), np.nan)
+        speed = np.full((len(jd_ut), len(body_codes)), np.nan)
+        for b, code in enumerate(body_codes):
+            if code not in self.supported_codes:
+                continue
+            chain = BODY_CHAINS[code]
+            # زمان نوری: موقعیت جسم در لحظه گسیل نور
+            rel = self._position(chain, tdb) - earth_pos
+            light_time = np.linalg.norm(rel, axis=0) / C_KM_PER_DAY
+            target_pos, target_vel = self._position(chain, tdb - light_time, with_velocity=True)
+            rel = target_pos - earth_pos
+            rel_vel = target_vel - earth_vel
+            u = rel / np.linalg.norm(rel, axis=0)
+            # ابیراهی سالانه (مرتبه اول)
+            u = u + beta - u * (u * beta).sum(axis=0)
+            # ICRF → استوای میانگین تاریخ → دایره‌البروج تاریخ (نوتیشن در طول جداگانه اضافه می‌شود)
+            x, y, zc = np.einsum('nij,jn->in', precession, u)
+            lon[:, b] = np.degrees(np.arctan2(y * ce + zc * s_e, x) + dpsi) % 360.0
+
+            # سرعت: تغییر جهت هندسی در همان دستگاه + نرخ پرسشن عمومی در طول
+            x, y, zc = np.einsum('nij,jn->in', precession, rel)
+            vx, vy, vz = np.einsum('nij,jn->in', precession, rel_vel)
+            ey, evy = y * ce + zc * s_e, vy * ce + vz * s_e
+            speed[:, b] = np.degrees((x * evy - ey * vx) / (x * x + ey * ey)) + GENERAL_PRECESSION_DEG_PER_DAY
+        return lon, speed
+
+    def positions(self, jd_utc: np.ndarray, body_codes: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        jd_utc = np.atleast_1d(np.asarray(jd_utc, dtype=np.float64))
+        lon = np.full((len(jd_utc), len(body_codes)), np.nan)
+        speed = np.full((len(jd_utc), len(body_codes)), np.nan)
+
+        inside = (jd_utc >= self.start_jd + 1.0) & (jd_utc <= self.end_jd - 1.0)
+        if inside.any():
+            lon[inside], speed[inside] = self._apparent_longitudes(jd_utc[inside], body_codes)
+
+        missing = np.isnan(lon).any(axis=1)
+        if missing.any():
+            fb_lon, fb_speed = self.fallback.positions(jd_utc[missing], body_codes)
+            lon[missing] = np.where(np.isnan(lon[missing]), fb_lon, lon[missing])
+            speed[missing] = np.where(np.isnan(speed[missing]), fb_speed, speed[missing])
+        return lon, speed
+
+
+def cross_check(backend: JPLEphemerisBackend, n_samples: int = 2000, seed: int = 0,
+                start_jd: Optional[float] = None, end_jd: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+    """
+    مقایسه jplephem و swisseph در JD های تصادفی.
+    بازگشت: برای هر جسم پشتیبانی‌شده بیشینه اختلاف طول (ثانیه قوس) و سرعت (ثانیه قوس در روز).
+    """
+    rng = np.random.default_rng(seed)
+    start_jd = max(start_jd or backend.start_jd, backend.start_jd) + 1.0
+    end_jd = min(end_jd or backend.end_jd, backend.end_jd) - 1.0
+    jd = rng.uniform(start_jd, end_jd, n_samples)
+    codes = [c for c in astrology_core.BODY_CODES if c in backend.supported_codes]
+    jpl_lon, jpl_speed = backend.positions(jd, codes)
+    swiss_lon, swiss_speed = astrology_core.SwissEphemerisBackend().positions(jd, codes)
+    lon_diff = np.abs((jpl_lon - swiss_lon + 180.0) % 360.0 - 180.0) * 3600.0
+    speed_diff = np.abs(jpl_speed - swiss_speed) * 3600.0
+    names = {code: name for name, code in astrology_core.PLANETS_MAP.items()}
+    return {
+        names[code]: {"max_arcsec": float(lon_diff[:, b].max()), "max_speed_arcsec_per_day": float(speed_diff[:, b].max())}
+        for b, code in enumerate(codes)
+    }
+
+
+def download_kernel(path: str = JPL_KERNEL_PATH, url: str = JPL_KERNEL_URL) -> int:
+    """دریافت کرنل از url در path (ابتدا در فایل موقت). بازگشت: اندازه فایل به بایت."""
+    import httpx
+    partial = path + ".part"
+    with httpx.stream("GET", url, follow_redirects=True, timeout=60.0) as response:
+        response.raise_for_status()
+        with open(partial, "wb") as f:
+            for chunk in response.iter_bytes(1 << 20):
+                f.write(chunk)
+    os.replace(partial, path)
+    return os.path.getsize(path)
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    path = sys.argv[2] if len(sys.argv) > 2 else JPL_KERNEL_PATH
+
+    if command == "download":
+        size = download_kernel(path)
+        print(f"downloaded {JPL_KERNEL_URL} -> {path} ({size / 1e6:.1f} MB)")
+        sys.exit(0)
+
+    if not os.path.exists(path):
+        if os.environ.get("CI"):
+            print(f"FAIL: kernel {path} not found; the cross-check must run in CI (build with JPL_KERNEL=1)")
+            sys.exit(1)
+        print(f"SKIP: kernel {path} not found (python jpl_ephemeris.py download)")
+        sys.exit(0)
+    backend = JPLEphemerisBackend(path)
+    report = cross_check(backend, n_samples=5000)
+    print(f"{'body':<10} {'max lon diff (arcsec)':>22} {'max speed diff (arcsec/day)':>29}")
+    worst = 0.0
+    for body, diffs in report.items():
+        worst = max(worst, diffs['max_arcsec'])
+        print(f"{body:<10} {diffs['max_arcsec']:>22.4f} {diffs['max_speed_arcsec_per_day']:>29.4f}")
+    if worst > CROSS_CHECK_TOLERANCE_ARCSEC:
+        print(f"FAIL: max difference {worst:.3f}\" exceeds {CROSS_CHECK_TOLERANCE_ARCSEC}\"")
+        sys.exit(1)
+    print("OK")
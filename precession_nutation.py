@@ -0,0 +1,68 @@
+# ----------------------------------------------------------------------
+# precession_nutation.py - پرسشن IAU 1976 و نوتیشن IAU 1980 (جملات اصلی) به صورت برداری
+#
+# مشترک backend موقعیت jpl_ephemeris و ستارگان ثابت (fixed_stars)؛ فقط به NumPy وابسته است تا
+# محاسبه ستارگان ثابت در هر چارت jplephem را import نکند.
+# ----------------------------------------------------------------------
+
+from typing import Tuple
+
+import numpy as np
+
+J2000 = 2451545.0
+ARCSEC = np.pi / (180.0 * 3600.0)
+
+# جملات اصلی نوتیشن در طول IAU 1980 (ضرایب D, M, M', F, Ω و Δψ بر حسب 0.0001 ثانیه قوس)
+NUTATION_TERMS = np.array([
+    # D   M   M'  F   Ω      ψ0       ψ1
+    [0, 0, 0, 0, 1, -171996, -174.2],
+    [-2, 0, 0, 2, 2, -13187, -1.6],
+    [0, 0, 0, 2, 2, -2274, -0.2],
+    [0, 0, 0, 0, 2, 2062, 0.2],
+    [0, 1, 0, 0, 0, 1426, -3.4],
+    [0, 0, 1, 0, 0, 712, 0.1],
+    [-2, 1, 0, 2, 2, -517, 1.2],
+    [0, 0, 0, 2, 1, -386, -0.4],
+    [0, 0, 1, 2, 2, -301, 0.0],
+    [-2, -1, 0, 2, 2, 217, -0.5],
+    [-2, 0, 1, 0, 0, -158, 0.0],
+    [-2, 0, 0, 2, 1, 129, 0.1],
+    [0, 0, -1, 2, 2, 123, 0.0],
+    [2, 0, 0, 0, 0, 63, 0.0],
+    [0, 0, 1, 0, 1, 63, 0.1],
+    [2, 0, -1, 2, 2, -59, 0.0],
+    [0, 0, -1, 0, 1, -58, -0.1],
+    [0, 0, 1, 2, 1, -51, 0.0],
+])
+
+
+def nutation_and_obliquity(t: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    نوتیشن در طول (رادیان) و میل میانگین دایره‌البروج (رادیان) برای T قرن ژولیانی از J2000.
+    دوران از استوای میانگین به دایره‌البروج تاریخ با میل میانگین انجام می‌شود و نوتیشن فقط در طول
+    اضافه می‌شود؛ نوتیشن در میل (Δε) فقط برای مختصات استوایی حقیقی لازم است.
+    """
+    d = np.radians(297.85036 + 445267.111480 * t - 0.0019142 * t**2 + t**3 / 189474.0)
+    m = np.radians(357.52772 + 35999.050340 * t - 0.0001603 * t**2 - t**3 / 300000.0)
+    mp = np.radians(134.96298 + 477198.867398 * t + 0.0086972 * t**2 + t**3 / 56250.0)
+    f = np.radians(93.27191 + 483202.017538 * t - 0.0036825 * t**2 + t**3 / 327270.0)
+    om = np.radians(125.04452 - 1934.136261 * t + 0.0020708 * t**2 + t**3 / 450000.0)
+    args = NUTATION_TERMS[:, :5] @ np.vstack((d, m, mp, f, om))             # (terms, N)
+    dpsi = ((NUTATION_TERMS[:, 5:6] + NUTATION_TERMS[:, 6:7] * t) * np.sin(args)).sum(axis=0)
+    eps0 = 84381.448 - 46.8150 * t - 0.00059 * t**2 + 0.001813 * t**3
+    return dpsi * 1e-4 * ARCSEC, eps0 * ARCSEC
+
+
+def precession_matrices(t: np.ndarray) -> np.ndarray:
+    """ماتریس‌های پرسشن IAU 1976 از J2000 به استوای میانگین تاریخ؛ خروجی (N, 3, 3)."""
+    zeta = (2306.2181 * t + 0.30188 * t**2 + 0.017998 * t**3) * ARCSEC
+    z = (2306.2181 * t + 1.09468 * t**2 + 0.018203 * t**3) * ARCSEC
+    theta = (2004.3109 * t - 0.42665 * t**2 - 0.041833 * t**3) * ARCSEC
+    cz, sz = np.cos(zeta), np.sin(zeta)
+    cZ, sZ = np.cos(z), np.sin(z)
+    ct, st = np.cos(theta), np.sin(theta)
+    return np.stack([
+        np.stack([cz * ct * cZ - sz * sZ, -sz * ct * cZ - cz * sZ, -st * cZ], axis=-1),
+        np.stack([cz * ct * sZ + sz * cZ, -sz * ct * sZ + cz * cZ, -st * sZ], axis=-1),
+        np.stack([cz * st, -sz * st, ct], axis=-1),
+    ], axis=-2)
@@ -1,6 +1,7 @@
 import aiosqlite
 import json
-from typing import Dict, Any
+import time
+from typing import Dict, Any, List, Optional, Tuple
 # 💡 [جدید]: برای مدیریت Serialization شیء JalaliDateTime
 from persiantools.jdatetime import JalaliDateTime 
 
@@ -20,15 +21,44 @@ def custom_json_encoder(obj):
     # اگر شیء از نوع شناخته شده‌ای نبود، خطای Type پیش‌فرض را صادر کنید
     raise TypeError(f'Object of type {obj.__class__.__name__} is not JSON serializable')
 
-async def init_db():
-    """ایجاد جدول UserStates در صورت عدم وجود."""
-    async with aiosqlite.connect(DATABASE_NAME) as db:
+async def init_db(db_path: Optional[str] = None):
+    """ایجاد جدول‌های UserStates، UserCharts و BroadcastCheckpoints در صورت عدم وجود."""
+    async with aiosqlite.connect(db_path or DATABASE_NAME) as db:
         await db.execute("""
             CREATE TABLE IF NOT EXISTS UserStates (
                 chat_id INTEGER PRIMARY KEY,
                 state_json TEXT NOT NULL
             )
         """)
+        # آخرین چارت تولد هر کاربر (خروجی ChartResult.to_bytes) برای ارسال روزانه ترانزیت‌ها
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS UserCharts (
+                chat_id INTEGER PRIMARY KEY,
+                chart_blob BLOB NOT NULL,
+                transit_subscribed INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            )
+        """)
+        # عضویت داوطلبانه کاربران در گروه‌های جستجوی هم‌خوانی (سیناستری)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS SynastryMembers (
+                group_name TEXT NOT NULL,
+                chat_id INTEGER NOT NULL,
+                joined_at REAL NOT NULL,
+                PRIMARY KEY (group_name, chat_id)
+            )
+        """)
+        # پیشرفت هر اجرای ارسال گروهی (برای ادامه پس از ری‌استارت)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS BroadcastCheckpoints (
+                run_id TEXT PRIMARY KEY,
+                last_chat_id INTEGER NOT NULL,
+                sent INTEGER NOT NULL,
+                failed INTEGER NOT NULL,
+                finished INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
         await db.commit()
 
 async def get_user_state_db(chat_id: int) -> Dict[str, Any]:
@@ -64,3 +94,92 @@ async def save_user_state_db(chat_id: int, state: Dict[str, Any]):
             (chat_id, state_json)
         )
         await db.commit()
+
+
+# --- چارت ذخیره‌شده کاربران و اشتراک ترانزیت روزانه ---
+
+async def save_user_chart(chat_id: int, chart_blob: bytes, db_path: Optional[str] = None):
+    """
+    ذخیره یا جایگزینی چارت تولد کاربر (وضعیت اشتراک قبلی حفظ می‌شود).
+    کاربر جدید مشترک پیام روزانه ترانزیت نیست؛ عضویت فقط با /transit_on (set_transit_subscription).
+    مقدار 0 صریحاً درج می‌شود تا جدول‌های ساخته‌شده با DEFAULT 1 قبلی هم کسی را خودکار عضو نکنند.
+    """
+    async with aiosqlite.connect(db_path or DATABASE_NAME) as db:
+        await db.execute(
+            """
+            INSERT INTO UserCharts (chat_id, chart_blob, transit_subscribed, updated_at) VALUES (?, ?, 0, ?)
+            ON CONFLICT(chat_id) DO UPDATE SET chart_blob = excluded.chart_blob, updated_at = excluded.updated_at
+            """,
+            (chat_id, chart_blob, time.time())
+        )
+        await db.commit()
+
+
+async def set_transit_subscription(chat_id: int, subscribed: bool, db_path: Optional[str] = None) -> bool:
+    """فعال/غیرفعال کردن پیام روزانه ترانزیت. False اگر کاربر هنوز چارتی ذخیره نکرده باشد."""
+    async with aiosqlite.connect(db_path or DATABASE_NAME) as db:
+        cursor = await db.execute("UPDATE UserCharts SET transit_subscribed = ? WHERE chat_id = ?", (int(subscribed), chat_id))
+        await db.commit()
+        return cursor.rowcount > 0
+
+
+async def load_user_charts(after_chat_id: Optional[int] = None, subscribed_only: bool = True, db_path: Optional[str] = None) -> List[Tuple[int, bytes]]:
+    """(chat_id، chart_blob) کاربران به ترتیب chat_id؛ after_chat_id برای ادامه از یک checkpoint."""
+    query = "SELECT chat_id, chart_blob FROM UserCharts WHERE 1 = 1"
+    params: list = []
+    if subscribed_only:
+        query += " AND transit_subscribed = 1"
+    if after_chat_id is not None:
+        query += " AND chat_id > ?"
+        params.append(after_chat_id)
+    query += " ORDER BY chat_id"
+    async with aiosqlite.connect(db_path or DATABASE_NAME) as db:
+        async with db.execute(query, params) as cursor:
+            return [(row[0], row[1]) for row in await cursor.fetchall()]
+
+
+async def join_synastry_group(chat_id: int, group_name: str, db_path: Optional[str] = None):
+    async with aiosqlite.connect(db_path or DATABASE_NAME) as db:
+        await db.execute("INSERT OR IGNORE INTO SynastryMembers (group_name, chat_id, joined_at) VALUES (?, ?, ?)", (group_name, chat_id, time.time()))
+        await db.commit()
+
+
+async def leave_synastry_group(chat_id: int, group_name: str, db_path: Optional[str] = None):
+    async with aiosqlite.connect(db_path or DATABASE_NAME) as db:
+        await db.execute("DELETE FROM SynastryMembers WHERE group_name = ? AND chat_id = ?", (group_name, chat_id))
+        await db.commit()
+
+
+async def load_synastry_group(group_name: str, db_path: Optional[str] = None) -> List[Tuple[int, bytes]]:
+    """(chat_id، chart_blob) اعضای گروه که چارت ذخیره‌شده دارند، به ترتیب chat_id."""
+    async with aiosqlite.connect(db_path or DATABASE_NAME) as db:
+        async with db.execute(
+            """
+            SELECT c.chat_id, c.chart_blob FROM SynastryMembers m JOIN UserCharts c ON c.chat_id = m.chat_id
+            WHERE m.group_name = ? ORDER BY c.chat_id
+            """,
+            (group_name,)
+        ) as cursor:
+            return [(row[0], row[1]) for row in await cursor.fetchall()]
+
+
+async def get_broadcast_checkpoint(run_id: str, db_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    async with aiosqlite.connect(db_path or DATABASE_NAME) as db:
+        async with db.execute("SELECT last_chat_id, sent, failed, finished FROM BroadcastCheckpoints WHERE run_id = ?", (run_id,)) as cursor:
+            row = await cursor.fetchone()
+    if not row:
+        return None
+    return {'last_chat_id': row[0], 'sent': row[1], 'failed': row[2], 'finished': bool(row[3])}
+
+
+async def save_broadcast_checkpoint(run_id: str, last_chat_id: int, sent: int, failed: int, finished: bool = False, db_path: Optional[str] = None):
+    async with aiosqlite.connect(db_path or DATABASE_NAME) as db:
+        await db.execute(
+            """
+            INSERT INTO BroadcastCheckpoints (run_id, last_chat_id, sent, failed, finished, updated_at) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(run_id) DO UPDATE SET last_chat_id = excluded.last_chat_id, sent = excluded.sent,
+                failed = excluded.failed, finished = excluded.finished, updated_at = excluded.updated_at
+            """,
+            (run_id, last_chat_id, sent, failed, int(finished), time.time())
+        )
+        await db.commit()
@@ -0,0 +1,198 @@
+# ----------------------------------------------------------------------
+# synastry.py - امتیاز هم‌خوانی (سیناستری) یک چارت با مجموعه بزرگی از چارت‌های ذخیره‌شده
+#
+# مجموعه (pool) یک ماتریس float32 (N × B) از طول سیارات است. امتیاز هر جفت سیاره از یک جدول
+# از پیش محاسبه‌شده خوانده می‌شود: فاصله زاویه‌ای (0 تا 180) با گام 0.1 درجه به ایندکس جدول تبدیل
+# می‌شود و مقدار جدول = وزن زاویه × نزدیکی (1 در زاویه دقیق تا 0 در لبه Orb). امتیاز هر چارت
+# مجموع وزن‌دار همه جفت‌ها است که با یک ضرب ماتریسی (N, B*B) @ (B*B,) به دست می‌آید.
+# به جای calculate_aspects برای هر جفت چارت، کل مجموعه در چند عملیات برداری امتیاز می‌گیرد.
+#
+# پیش‌فیلتر اختیاری (prefilter=True): برج سیارات کلیدی مجموعه از پیش در سطل‌های برج (12 سطل)
+# گروه‌بندی شده‌اند و فقط چارت‌هایی امتیاز می‌گیرند که دست‌کم PREFILTER_MIN_PAIRS جفت کلیدی
+# (خورشید/ماه، زهره/مریخ) در برج‌های هماهنگ (هم‌برج، تسدیس، تثلیث) داشته باشند. این روش تقریبی است
+# (زاویه نزدیک مرز برج ممکن است حذف شود)؛ recall در بنچمارک گزارش می‌شود.
+#
+# بنچمارک: python benchmarks/bench_synastry.py
+# ----------------------------------------------------------------------
+
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import aspect_engine
+import astrology_core
+import chart_result
+import state_manager
+
+logging.basicConfig(level=logging.INFO)
+
+# --- تنظیمات (قابل تغییر با متغیرهای محیطی) ---
+SYNASTRY_TOP_K = int(os.environ.get("SYNASTRY_TOP_K", "20"))
+# تعداد ردیف‌هایی که در هر مرحله امتیاز می‌گیرند (محدود کردن حافظه موقت)
+SYNASTRY_CHUNK_ROWS = int(os.environ.get("SYNASTRY_CHUNK_ROWS", "32768"))
+# مدت نگهداری مجموعه هر گروه در حافظه پیش از خواندن دوباره از دیتابیس
+SYNASTRY_POOL_TTL_SECONDS = float(os.environ.get("SYNASTRY_POOL_TTL_SECONDS", "300"))
+SYNASTRY_DEFAULT_GROUP = os.environ.get("SYNASTRY_DEFAULT_GROUP", "public")
+PREFILTER_MIN_PAIRS = int(os.environ.get("SYNASTRY_PREFILTER_MIN_PAIRS", "2"))
+
+SYNASTRY_BODIES = ["sun", "moon", "mercury", "venus", "mars", "jupiter", "saturn"]
+_BODY_COLUMNS = [astrology_core.BODY_NAMES.index(name) for name in SYNASTRY_BODIES]
+
+# وزن هر نوع زاویه (مثبت = هماهنگ، منفی = پرتنش) و Orb آن در سیناستری
+SYNASTRY_ASPECT_WEIGHTS = {"Conjunction": 2.0, "Sextile": 1.5, "Square": -1.5, "Trine": 2.5, "Opposition": -1.0}
+SYNASTRY_ASPECT_ORBS = {"Conjunction": 6.0, "Sextile": 4.0, "Square": 5.0, "Trine": 6.0, "Opposition": 6.0}
+
+# وزن جفت سیارات (چارت هدف، چارت مجموعه)؛ جفت‌های ذکرنشده وزن 1 دارند
+PAIR_WEIGHTS = {
+    ("sun", "moon"): 3.0, ("moon", "sun"): 3.0,
+    ("venus", "mars"): 3.0, ("mars", "venus"): 3.0,
+    ("moon", "moon"): 2.0, ("sun", "sun"): 1.5, ("venus", "venus"): 2.0,
+    ("sun", "venus"): 1.5, ("venus", "sun"): 1.5, ("moon", "venus"): 1.5, ("venus", "moon"): 1.5,
+    ("saturn", "sun"): 1.5, ("sun", "saturn"): 1.5, ("saturn", "moon"): 1.5, ("moon", "saturn"): 1.5,
+}
+# جفت‌های کلیدی پیش‌فیلتر (سیاره هدف، سیاره مجموعه)
+PREFILTER_PAIRS = [("sun", "moon"), ("moon", "sun"), ("venus", "mars"), ("mars", "venus")]
+# فاصله برجی هماهنگ: هم‌برج، تسدیس و تثلیث
+HARMONIOUS_SIGN_STEPS = (0, 2, 4, 8, 10)
+
+TABLE_STEP = 0.1
+TABLE_SCALE = np.float32(1.0 / TABLE_STEP)
+
+
+def _build_score_table() -> np.ndarray:
+    """امتیاز جفت برای فاصله‌های 0 تا 180 درجه با گام TABLE_STEP (Orb ها همپوشانی ندارند)."""
+    sep = np.arange(0.0, 180.0 + TABLE_STEP / 2, TABLE_STEP)
+    table = np.zeros(len(sep), dtype=np.float32)
+    for name, angle in astrology_core.ASPECT_DEGREES.items():
+        orb = SYNASTRY_ASPECT_ORBS[name]
+        closeness = np.clip(1.0 - np.abs(sep - angle) / orb, 0.0, None)
+        table += (SYNASTRY_ASPECT_WEIGHTS[name] * closeness).astype(np.float32)
+    return table
+
+
+def _build_pair_weights() -> np.ndarray:
+    weights = np.ones((len(SYNASTRY_BODIES), len(SYNASTRY_BODIES)), dtype=np.float32)
+    for (a, b), w in PAIR_WEIGHTS.items():
+        weights[SYNASTRY_BODIES.index(a), SYNASTRY_BODIES.index(b)] = w
+    return weights
+
+
+SCORE_TABLE = _build_score_table()
+PAIR_WEIGHT_MATRIX = _build_pair_weights()
+SYNASTRY_ENGINE = aspect_engine.AspectEngine(astrology_core.ASPECT_DEGREES, SYNASTRY_ASPECT_ORBS)
+
+
+class SynastryPool:
+    """مجموعه چارت‌ها برای امتیازدهی یک‌به‌چند؛ ماتریس طول‌ها و سطل‌های برج یک بار ساخته می‌شوند."""
+
+    def __init__(self, chat_ids: np.ndarray, longitudes: np.ndarray):
+        valid = ~np.isnan(longitudes).any(axis=1)
+        if not valid.all():
+            logging.warning(f"Synastry pool: {int((~valid).sum())} charts without all bodies skipped.")
+        self.chat_ids = np.asarray(chat_ids, dtype=np.int64)[valid]
+        self.longitudes = np.ascontiguousarray(longitudes[valid], dtype=np.float32)       # (N, B)
+        self.signs = (self.longitudes // 30.0).astype(np.int8) % 12                         # (N, B)
+        # سطل‌های برج: body -> 12 آرایه ایندکس ردیف (فقط سیارات پیش‌فیلتر)
+        self._buckets: Dict[str, List[np.ndarray]] = {}
+        for body in {pool_body for _, pool_body in PREFILTER_PAIRS}:
+            column = self.signs[:, SYNASTRY_BODIES.index(body)]
+            order = np.argsort(column, kind='stable')
+            bounds = np.searchsorted(column[order], np.arange(13))
+            self._buckets[body] = [order[bounds[s]:bounds[s + 1]] for s in range(12)]
+        self.built_at = time.time()
+
+    def __len__(self) -> int:
+        return len(self.chat_ids)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Tuple[int, bytes]]) -> "SynastryPool":
+        """ساخت از (chat_id، chart_blob) های ذخیره‌شده (state_manager.UserCharts)."""
+        chat_ids = np.array([chat_id for chat_id, _ in rows], dtype=np.int64)
+        if not rows:
+            return cls(chat_ids, np.empty((0, len(SYNASTRY_BODIES))))
+        data = chart_result.data_matrix([blob for _, blob in rows])
+        return cls(chat_ids, data[:, chart_result.LONGITUDE_COLUMNS[_BODY_COLUMNS]])
+
+    def prefilter(self, target: np.ndarray, min_pairs: int = PREFILTER_MIN_PAIRS) -> np.ndarray:
+        """ایندکس ردیف‌هایی که دست‌کم min_pairs جفت کلیدی در برج هماهنگ دارند (فقط با سطل‌های برج)."""
+        counts = np.zeros(len(self), dtype=np.int32)
+        for target_body, pool_body in PREFILTER_PAIRS:
+            sign = int(target[SYNASTRY_BODIES.index(target_body)] // 30.0) % 12
+            buckets = self._buckets[pool_body]
+            for step in HARMONIOUS_SIGN_STEPS:
+                counts[buckets[(sign + step) % 12]] += 1
+        return np.flatnonzero(counts >= min_pairs)
+
+    def score(self, target: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """امتیاز هم‌خوانی چارت هدف (طول‌های SYNASTRY_BODIES) با همه ردیف‌ها یا ردیف‌های rows."""
+        target = np.asarray(target, dtype=np.float32)
+        pool = self.longitudes if rows is None else self.longitudes[rows]
+        weights = PAIR_WEIGHT_MATRIX.ravel()
+        scores = np.empty(len(pool), dtype=np.float32)
+        for first in range(0, len(pool), SYNASTRY_CHUNK_ROWS):
+            chunk = pool[first:first + SYNASTRY_CHUNK_ROWS]
+            # (n, B_target, B_pool): فاصله زاویه‌ای 0 تا 180 و سپس ایندکس جدول
+            sep = np.abs(chunk[:, None, :] - target[None, :, None])
+            np.minimum(sep, 360.0 - sep, out=sep)
+            index = (sep * TABLE_SCALE + 0.5).astype(np.int32)
+            scores[first:first + len(chunk)] = SCORE_TABLE[index].reshape(len(chunk), -1) @ weights
+        return scores
+
+    def top_matches(self, target: np.ndarray, k: int = SYNASTRY_TOP_K, exclude_chat_id: Optional[int] = None,
+                    prefilter: bool = False) -> List[Dict[str, Any]]:
+        """k چارت با بیشترین امتیاز: [{'chat_id', 'score'}] به ترتیب نزولی امتیاز."""
+        rows = self.prefilter(target) if prefilter else np.arange(len(self))
+        if exclude_chat_id is not None:
+            rows = rows[self.chat_ids[rows] != exclude_chat_id]
+        if len(rows) == 0:
+            return []
+        scores = self.score(target, rows)
+        if len(scores) > k:
+            best = np.argpartition(-scores, k - 1)[:k]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [{"chat_id": int(self.chat_ids[rows[i]]), "score": float(scores[i])} for i in best.tolist()]
+
+    def pair_aspects(self, target: np.ndarray, chat_id: int) -> List[Dict[str, Any]]:
+        """جزئیات زوایای بین چارت هدف و یک عضو مجموعه (برای توضیح نتیجه)، با همان خروجی calculate_aspects."""
+        row = int(np.flatnonzero(self.chat_ids == chat_id)[0])
+        return SYNASTRY_ENGINE.find([float(x) for x in target], SYNASTRY_BODIES, self.longitudes[row].astype(np.float64).tolist(), SYNASTRY_BODIES)
+
+
+def target_longitudes(chart: chart_result.ChartResult) -> np.ndarray:
+    """طول SYNASTRY_BODIES از یک ChartResult."""
+    return chart.longitudes[_BODY_COLUMNS]
+
+
+# --- مجموعه گروه‌ها از دیتابیس (با کش درون‌پردازه‌ای) ---
+_pools: Dict[str, SynastryPool] = {}
+_pool_locks: Dict[str, asyncio.Lock] = {}
+
+
+async def get_pool(group_name: str = SYNASTRY_DEFAULT_GROUP, db_path: Optional[str] = None) -> SynastryPool:
+    """مجموعه اعضای گروه؛ حداکثر هر SYNASTRY_POOL_TTL_SECONDS یک بار از دیتابیس ساخته می‌شود."""
+    lock = _pool_locks.setdefault(group_name, asyncio.Lock())
+    async with lock:
+        pool = _pools.get(group_name)
+        if pool is None or time.time() - pool.built_at > SYNASTRY_POOL_TTL_SECONDS:
+            rows = await state_manager.load_synastry_group(group_name, db_path)
+            pool = _pools[group_name] = SynastryPool.from_rows(rows)
+            logging.info(f"Synastry pool '{group_name}' loaded: {len(pool)} charts.")
+        return pool
+
+
+def invalidate_pool(group_name: str = SYNASTRY_DEFAULT_GROUP):
+    """حذف مجموعه کش‌شده (مثلاً پس از عضویت یا خروج کاربر)."""
+    _pools.pop(group_name, None)
+
+
+async def find_matches(chat_id: int, chart: chart_result.ChartResult, group_name: str = SYNASTRY_DEFAULT_GROUP,
+                       k: int = SYNASTRY_TOP_K, prefilter: bool = False, db_path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """بهترین k هم‌خوانی چارت کاربر در گروه (خود کاربر حذف می‌شود)."""
+    pool = await get_pool(group_name, db_path)
+    return pool.top_matches(target_longitudes(chart), k, exclude_chat_id=chat_id, prefilter=prefilter)
@@ -0,0 +1,228 @@
+# ----------------------------------------------------------------------
+# time_conversion.py - تبدیل سریع و برداری زمان محلی (تاریخ شمسی) به روز جولیان UTC
+#
+# 1. جدول از پیش محاسبه‌شده شماره روز اول فروردین هر سال شمسی (تبدیل شمسی ↔ میلادی بدون strptime)
+# 2. آرایه‌های کش‌شده لحظه‌های تغییر UTC offset برای هر منطقه زمانی (از داده‌های pytz، مثلاً
+#    قوانین تاریخی ساعت تابستانی Asia/Tehran)
+# 3. local_to_jd برای آرایه‌ای از تاریخ‌ها، ساعت‌ها و مناطق زمانی با خروجی float64
+#
+# زمان‌های محلی مبهم (تکرار یک ساعت هنگام برگشت ساعت) و ناموجود (پرش ساعت به جلو) بی‌صدا
+# حل نمی‌شوند: سیاست رفتار با آن‌ها صریحاً با پارامترهای ambiguous و nonexistent تعیین می‌شود.
+# ----------------------------------------------------------------------
+
+import datetime
+import functools
+from typing import Sequence, Tuple, Union
+
+import numpy as np
+import pytz
+from pytz.exceptions import AmbiguousTimeError, NonExistentTimeError
+from persiantools import jdatetime
+
+# بازه سال‌های شمسی پشتیبانی‌شده در جدول (حدود 1821 تا 2222 میلادی)؛ سال‌های بیرون از آن نامعتبرند
+# (utils.parse_persian_date همین بازه را هنگام ورود تاریخ تولد اعمال می‌کند)
+JALALI_FIRST_YEAR = 1200
+JALALI_LAST_YEAR = 1600
+
+# شماره روز (ordinal میلادی) مبدأ یونیکس و JD نیمه‌شب آن
+UNIX_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+UNIX_EPOCH_JD = 2440587.5
+
+# وضعیت هر ردیف در خروجی local_to_jd(return_status=True)
+STATUS_OK = 0
+STATUS_AMBIGUOUS = 1
+STATUS_NONEXISTENT = 2
+STATUS_INVALID = 3
+
+
+# --- 1. جدول تقویم شمسی ---
+
+@functools.lru_cache(maxsize=1)
+def _jalali_year_starts() -> np.ndarray:
+    """روز اول فروردین هر سال (روز از مبدأ یونیکس) برای سال‌های JALALI_FIRST_YEAR تا JALALI_LAST_YEAR + 1."""
+    years = range(JALALI_FIRST_YEAR, JALALI_LAST_YEAR + 2)
+    return np.array([jdatetime.JalaliDate(y, 1, 1).to_gregorian().toordinal() - UNIX_EPOCH_ORDINAL for y in years], dtype=np.int64)
+
+
+def jalali_to_days(years: np.ndarray, months: np.ndarray, days: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    تبدیل برداری تاریخ شمسی به شماره روز از مبدأ یونیکس.
+    بازگشت: (شماره روز، ماسک معتبر بودن تاریخ).
+    """
+    years = np.asarray(years, dtype=np.int64)
+    months = np.asarray(months, dtype=np.int64)
+    days = np.asarray(days, dtype=np.int64)
+    starts = _jalali_year_starts()
+
+    in_range = (years >= JALALI_FIRST_YEAR) & (years <= JALALI_LAST_YEAR) & (months >= 1) & (months <= 12) & (days >= 1)
+    y_idx = np.clip(years - JALALI_FIRST_YEAR, 0, len(starts) - 2)
+    year_length = starts[y_idx + 1] - starts[y_idx]
+    # شش ماه اول 31 روزه، پنج ماه بعد 30 روزه، اسفند 29 یا 30 روزه
+    month_offset = np.where(months <= 7, (months - 1) * 31, 186 + (months - 7) * 30)
+    month_length = np.where(months <= 6, 31, np.where(months <= 11, 30, year_length - 336))
+    valid = in_range & (days <= month_length)
+    return starts[y_idx] + month_offset + days - 1, valid
+
+
+def days_to_jalali(day_numbers: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """تبدیل برداری شماره روز از مبدأ یونیکس به (سال، ماه، روز) شمسی."""
+    day_numbers = np.asarray(day_numbers, dtype=np.int64)
+    starts = _jalali_year_starts()
+    y_idx = np.searchsorted(starts, day_numbers, side='right') - 1
+    day_of_year = day_numbers - starts[np.clip(y_idx, 0, len(starts) - 1)]
+    months = np.where(day_of_year < 186, day_of_year // 31 + 1, (day_of_year - 186) // 30 + 7)
+    days = np.where(day_of_year < 186, day_of_year % 31 + 1, (day_of_year - 186) % 30 + 1)
+    return y_idx + JALALI_FIRST_YEAR, months, days
+
+
+# --- 2. لحظه‌های تغییر offset مناطق زمانی ---
+
+@functools.lru_cache(maxsize=None)
+def zone_transitions(zone: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    لحظه‌های تغییر UTC offset یک منطقه زمانی (ثانیه UTC از مبدأ یونیکس) و offset معتبر از آن لحظه (ثانیه).
+    عضو اول همیشه یک لحظه بسیار قدیمی با offset اولیه است.
+    """
+    tz = pytz.timezone(zone)
+    transition_times = getattr(tz, '_utc_transition_times', None)
+    if not transition_times:
+        # منطقه زمانی ثابت (UTC یا Etc/GMT±N)
+        offset = tz.utcoffset(datetime.datetime(2000, 1, 1))
+        return np.array([np.iinfo(np.int64).min // 2], dtype=np.int64), np.array([int(offset.total_seconds())], dtype=np.int64)
+
+    epoch = datetime.datetime(1970, 1, 1)
+    times = np.array([int((t - epoch).total_seconds()) for t in transition_times], dtype=np.int64)
+    times[0] = np.iinfo(np.int64).min // 2
+    offsets = np.array([int(info[0].total_seconds()) for info in tz._transition_info], dtype=np.int64)
+    return times, offsets
+
+
+def _local_to_utc_seconds(local_seconds: np.ndarray, zone: str, ambiguous: str, nonexistent: str) -> Tuple[np.ndarray, np.ndarray]:
+    """تبدیل ثانیه‌های محلی (wall clock) یک منطقه زمانی به ثانیه UTC همراه با کد وضعیت."""
+    times, offsets = zone_transitions(zone)
+    prev_offsets = np.concatenate((offsets[:1], offsets[:-1]))
+    # در هر تغییر، بازه محلی [شروع، پایان) یا ناموجود است (offset بزرگ‌تر شده) یا مبهم (کوچک‌تر شده)
+    window_start = times + np.minimum(prev_offsets, offsets)
+    window_end = times + np.maximum(prev_offsets, offsets)
+
+    k = np.searchsorted(window_start, local_seconds, side='right') - 1
+    in_window = local_seconds < window_end[k]
+    gap = in_window & (offsets[k] > prev_offsets[k])
+    overlap = in_window & (offsets[k] < prev_offsets[k])
+
+    utc = local_seconds - offsets[k]
+    status = np.full(local_seconds.shape, STATUS_OK, dtype=np.int8)
+    status[gap] = STATUS_NONEXISTENT
+    status[overlap] = STATUS_AMBIGUOUS
+
+    if overlap.any():
+        if ambiguous == 'raise':
+            raise AmbiguousTimeError(f"{int(overlap.sum())} ambiguous local time(s) in {zone}")
+        if ambiguous == 'earlier':
+            # اولین وقوع: هنوز offset قبلی (مثلاً ساعت تابستانی) برقرار است
+            utc[overlap] = local_seconds[overlap] - prev_offsets[k][overlap]
+        elif ambiguous == 'nan':
+            utc = utc.astype(np.float64)
+            utc[overlap] = np.nan
+        elif ambiguous != 'later':
+            raise ValueError(f"ambiguous must be 'raise', 'earlier', 'later' or 'nan', not {ambiguous!r}")
+
+    if gap.any():
+        if nonexistent == 'raise':
+            raise NonExistentTimeError(f"{int(gap.sum())} nonexistent local time(s) in {zone}")
+        if nonexistent == 'shift_forward':
+            # نزدیک‌ترین لحظه موجود بعد از پرش ساعت
+            utc[gap] = times[k][gap]
+        elif nonexistent == 'previous_offset':
+            # offset پیش از پرش (مانند pytz.localize با is_dst=False): به اندازه فاصله تا پرش بعد از آن
+            utc[gap] = local_seconds[gap] - prev_offsets[k][gap]
+        elif nonexistent == 'nan':
+            utc = utc.astype(np.float64)
+            utc[gap] = np.nan
+        else:
+            raise ValueError(f"nonexistent must be 'raise', 'shift_forward', 'previous_offset' or 'nan', not {nonexistent!r}")
+    return utc, status
+
+
+# --- 3. تبدیل برداری ---
+
+def _parse_dates(dates: Union[Sequence[str], np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    if isinstance(dates, np.ndarray) and dates.ndim == 2:
+        return dates[:, 0], dates[:, 1], dates[:, 2], np.ones(len(dates), dtype=bool)
+    parts = np.zeros((len(dates), 3), dtype=np.int64)
+    ok = np.ones(len(dates), dtype=bool)
+    for i, text in enumerate(dates):
+        try:
+            y, m, d = text.split('/')
+            parts[i] = int(y), int(m), int(d)
+        except (ValueError, AttributeError):
+            ok[i] = False
+    return parts[:, 0], parts[:, 1], parts[:, 2], ok
+
+
+def _parse_times(times: Union[Sequence[str], np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    if isinstance(times, np.ndarray) and np.issubdtype(times.dtype, np.integer):
+        seconds = times.astype(np.int64)
+        return seconds, (seconds >= 0) & (seconds < 86400)
+    seconds = np.zeros(len(times), dtype=np.int64)
+    ok = np.ones(len(times), dtype=bool)
+    for i, text in enumerate(times):
+        try:
+            h, m = text.split(':')
+            h, m = int(h), int(m)
+            if not (0 <= h < 24 and 0 <= m < 60):
+                raise ValueError
+            seconds[i] = h * 3600 + m * 60
+        except (ValueError, AttributeError):
+            ok[i] = False
+    return seconds, ok
+
+
+def local_to_jd(dates: Union[Sequence[str], np.ndarray], times: Union[Sequence[str], np.ndarray],
+                zones: Union[str, Sequence[str]], ambiguous: str = 'raise', nonexistent: str = 'raise',
+                invalid: str = 'raise', return_status: bool = False):
+    """
+    تبدیل برداری زمان محلی به روز جولیان UTC (float64).
+
+    dates: رشته‌های 'YYYY/MM/DD' شمسی یا آرایه (N, 3) از اعداد
+    times: رشته‌های 'HH:MM' یا آرایه عددی ثانیه از نیمه‌شب
+    zones: نام یک منطقه زمانی برای همه ردیف‌ها یا یک نام برای هر ردیف
+    ambiguous: 'raise' | 'earlier' | 'later' | 'nan'
+    nonexistent: 'raise' | 'shift_forward' | 'previous_offset' | 'nan'
+    invalid: 'raise' | 'nan' - رفتار با تاریخ/ساعت یا منطقه زمانی نامعتبر
+    return_status: در صورت True، آرایه کدهای وضعیت (STATUS_*) هم برگردانده می‌شود.
+    """
+    years, months, days, date_ok = _parse_dates(dates)
+    seconds, time_ok = _parse_times(times)
+    if len(seconds) != len(years):
+        raise ValueError("dates و times باید طول برابر داشته باشند.")
+    day_numbers, calendar_ok = jalali_to_days(years, months, days)
+    valid = date_ok & time_ok & calendar_ok
+    if invalid == 'raise' and not valid.all():
+        bad = int(np.nonzero(~valid)[0][0])
+        if date_ok[bad] and not JALALI_FIRST_YEAR <= years[bad] <= JALALI_LAST_YEAR:
+            raise ValueError(f"Jalali year {int(years[bad])} at row {bad} is outside the supported range "
+                             f"{JALALI_FIRST_YEAR}-{JALALI_LAST_YEAR}")
+        raise ValueError(f"Invalid Jalali date/time at row {bad}: {dates[bad]!r} {times[bad]!r}")
+
+    local_seconds = day_numbers * 86400 + seconds
+    utc_seconds = np.full(len(local_seconds), np.nan)
+    status = np.full(len(local_seconds), STATUS_INVALID, dtype=np.int8)
+
+    zone_array = np.full(len(local_seconds), zones, dtype=object) if isinstance(zones, str) else np.asarray(zones, dtype=object)
+    for zone in set(zone_array[valid].tolist()):
+        rows = valid & (zone_array == zone)
+        try:
+            utc_seconds[rows], status[rows] = _local_to_utc_seconds(local_seconds[rows], zone, ambiguous, nonexistent)
+        except pytz.UnknownTimeZoneError:
+            if invalid == 'raise':
+                raise
+
+    jd = utc_seconds / 86400.0 + UNIX_EPOCH_JD
+    return (jd, status) if return_status else jd
+
+
+def jd_to_utc_datetime(jd_utc: float) -> datetime.datetime:
+    """تبدیل JD UTC به datetime آگاه از منطقه زمانی (UTC) با دقت میلی‌ثانیه (دقت float64 برای JD حدود 20 میکروثانیه است)."""
+    seconds = round((jd_utc - UNIX_EPOCH_JD) * 86400.0, 3)
+    return datetime.datetime(1970, 1, 1, tzinfo=pytz.utc) + datetime.timedelta(seconds=seconds)
@@ -0,0 +1,312 @@
+# ----------------------------------------------------------------------
+# transit_broadcast.py - ارسال روزانه پیام ترانزیت شخصی به همه کاربران مشترک
+#
+# مراحل (به جای calculate_natal_chart و send_message جداگانه برای هر کاربر):
+#   1. sky     - موقعیت سیارات گذرا یک بار برای ظهر UTC روز اجرا
+#   2. load    - چارت ذخیره‌شده همه کاربران (UserCharts) در یک ماتریس NumPy (کاربر × نقطه ناتال)
+#   3. aspects - زوایای ترانزیت به ناتال برای هر دسته کاربر با یک فراخوانی AspectEngine.match
+#   4. render  - ساخت متن از قالب‌ها
+#   5. send    - ارسال با محدودیت نرخ (BROADCAST_RATE_PER_SECOND) و همزمانی محدود
+# برای هر مرحله تعداد، زمان و توان عملیاتی (در ثانیه) گزارش می‌شود.
+#
+# پس از ارسال هر دسته، آخرین chat_id در BroadcastCheckpoints ذخیره می‌شود؛ اجرای دوباره برای همان روز
+# از کاربر بعدی ادامه می‌دهد (در بدترین حالت پیام‌های یک دسته دوباره ارسال می‌شوند) و اجرای تمام‌شده تکرار نمی‌شود.
+#
+# اجرا (مثلاً روزانه با cron):  python transit_broadcast.py [YYYY-MM-DD] [--dry-run]
+# ----------------------------------------------------------------------
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import datetime
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable, Union
+
+import numpy as np
+import swisseph as se
+
+import aspect_engine
+import astrology_core
+import astrology_interpretation
+import chart_result
+import state_manager
+import utils
+
+logging.basicConfig(level=logging.INFO)
+
+# --- تنظیمات (قابل تغییر با متغیرهای محیطی) ---
+TRANSIT_ORB = float(os.environ.get("TRANSIT_ORB", "1.0"))
+# حداکثر تعداد زوایا (نزدیک‌ترین‌ها) در پیام هر کاربر
+TRANSIT_MAX_ASPECTS = int(os.environ.get("TRANSIT_MAX_ASPECTS", "3"))
+BROADCAST_BATCH_SIZE = int(os.environ.get("BROADCAST_BATCH_SIZE", "500"))
+# محدودیت تلگرام برای ارسال گروهی حدود 30 پیام در ثانیه است
+BROADCAST_RATE_PER_SECOND = float(os.environ.get("BROADCAST_RATE_PER_SECOND", "25"))
+BROADCAST_CONCURRENCY = int(os.environ.get("BROADCAST_CONCURRENCY", "8"))
+# تعداد تلاش دوباره پس از پاسخ 429 (retry_after) برای هر پیام
+BROADCAST_MAX_RETRIES = int(os.environ.get("BROADCAST_MAX_RETRIES", "3"))
+
+# ماه در یک روز حدود 13 درجه جابه‌جا می‌شود و در پیام روزانه آورده نمی‌شود
+TRANSIT_BODIES = ["sun", "mercury", "venus", "mars", "jupiter", "saturn", "uranus", "neptune", "pluto"]
+TRANSIT_CODES = [astrology_core.PLANETS_MAP[name] for name in TRANSIT_BODIES]
+NATAL_POINTS = astrology_core.BODY_NAMES + ["ascendant", "midheaven"]
+NATAL_COLUMNS = np.concatenate((chart_result.LONGITUDE_COLUMNS, chart_result.ANGLE_COLUMNS))
+
+TRANSIT_ENGINE = aspect_engine.AspectEngine(astrology_core.ASPECT_DEGREES, {name: TRANSIT_ORB for name in astrology_core.ASPECT_DEGREES})
+
+# --- قالب‌های پیام ---
+TRANSIT_MESSAGE_HEADER = "🔭 ترانزیت‌های امروز شما ({date})"
+TRANSIT_LINE_TEMPLATE = "• {transit} {aspect} {natal} تولد شما (اُرب {orb:.1f}°): {tone}"
+TRANSIT_MESSAGE_FOOTER = "برای لغو پیام روزانه: /transit_off"
+ASPECT_TONES = {
+    "Conjunction": "تمرکز انرژی و شروعی تازه در این حوزه.",
+    "Sextile": "فرصتی برای همکاری و پیشرفت آرام.",
+    "Square": "چالشی که به اقدام و تصمیم نیاز دارد.",
+    "Trine": "جریان روان و حمایت‌کننده.",
+    "Opposition": "نیاز به ایجاد تعادل میان دو خواسته.",
+}
+
+# نام‌های فارسی به ترتیب ایندکس‌های خروجی match
+_TRANSIT_FA = [astrology_interpretation.PLANETS_MAP.get(name.upper(), name) for name in TRANSIT_BODIES]
+_NATAL_FA = [astrology_interpretation.PLANETS_MAP.get(name.upper(), name) for name in NATAL_POINTS]
+_ASPECT_FA = [astrology_interpretation.ASPECTS_MAP.get(name.upper(), name) for name in TRANSIT_ENGINE.aspect_names]
+_ASPECT_TONE = [ASPECT_TONES.get(name, "") for name in TRANSIT_ENGINE.aspect_names]
+
+SendFunc = Callable[[int, str], Awaitable[bool]]
+
+
+class StageStats:
+    """تعداد آیتم و زمان تجمعی هر مرحله."""
+
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = {}
+
+    def add(self, stage: str, items: int, seconds: float):
+        entry = self.stages.setdefault(stage, [0, 0.0])
+        entry[0] += items
+        entry[1] += seconds
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        return {
+            stage: {"items": int(items), "seconds": seconds, "per_second": items / seconds if seconds > 0 else float("inf")}
+            for stage, (items, seconds) in self.stages.items()
+        }
+
+    def log(self):
+        for stage, row in self.report().items():
+            logging.info(f"Broadcast stage {stage:<8} {row['items']:>8} items {row['seconds']:>9.3f}s {row['per_second']:>12.1f}/s")
+
+
+class RateLimiter:
+    """فاصله یکنواخت بین ارسال‌ها (حداکثر rate در ثانیه)، مشترک بین همه ارسال‌کننده‌ها."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._next = max(now, self._next) + self.interval
+
+    def pause(self, seconds: float):
+        """توقف همه ارسال‌کننده‌ها تا seconds ثانیه بعد (retry_after پاسخ 429؛ محدودیت تلگرام برای کل ربات است)."""
+        self._next = max(self._next, time.monotonic() + seconds)
+
+
+# --- مراحل ---
+
+def run_jd(run_date: datetime.date) -> float:
+    """لحظه محاسبه آسمان روز: ظهر UTC."""
+    return se.julday(run_date.year, run_date.month, run_date.day, 12.0)
+
+
+def compute_sky(jd_utc: float, backend: Union[str, astrology_core.PositionBackend, None] = None) -> np.ndarray:
+    """طول دایره‌البروجی سیارات گذرا (T,)."""
+    lon, _ = astrology_core.resolve_position_backend(backend).positions(np.array([jd_utc]), TRANSIT_CODES)
+    return lon[0]
+
+
+def natal_matrix(rows: List[Tuple[int, bytes]]) -> Tuple[np.ndarray, np.ndarray]:
+    """(chat_id ها (N,)، طول نقاط ناتال (N, P) به ترتیب NATAL_POINTS؛ NaN برای نقاط محاسبه‌نشده)."""
+    chat_ids = np.array([chat_id for chat_id, _ in rows], dtype=np.int64)
+    if not rows:
+        return chat_ids, np.empty((0, len(NATAL_POINTS)))
+    data = chart_result.data_matrix([blob for _, blob in rows])
+    return chat_ids, data[:, NATAL_COLUMNS]
+
+
+def transit_hits(sky: np.ndarray, natal: np.ndarray, max_aspects: int = TRANSIT_MAX_ASPECTS) -> Dict[str, np.ndarray]:
+    """
+    زوایای ترانزیت به ناتال برای همه کاربران یک دسته با یک فراخوانی match روی ماتریس تخت‌شده.
+    بازگشت: {'user' (ردیف در natal), 'transit', 'point', 'aspect', 'orb'}؛ برای هر کاربر حداکثر max_aspects
+    مورد به ترتیب Orb و کاربران به ترتیب ردیف.
+    """
+    n_points = natal.shape[1]
+    hits = TRANSIT_ENGINE.match(sky, TRANSIT_BODIES, natal.ravel(), NATAL_POINTS * natal.shape[0])
+    user = hits["j"] // n_points
+    # خروجی match بر اساس Orb مرتب است؛ مرتب‌سازی پایدار بر اساس کاربر ترتیب Orb را درون هر کاربر حفظ می‌کند
+    order = np.argsort(user, kind='stable')
+    user = user[order]
+    rank = np.arange(len(user)) - np.searchsorted(user, user, side='left')
+    keep = order[rank < max_aspects]
+    return {
+        "user": user[rank < max_aspects],
+        "transit": hits["i"][keep],
+        "point": hits["j"][keep] % n_points,
+        "aspect": hits["aspect"][keep],
+        "orb": hits["orb"][keep],
+    }
+
+
+def render_messages(chat_ids: np.ndarray, hits: Dict[str, np.ndarray], date_label: str) -> List[Tuple[int, str]]:
+    """(chat_id، متن MarkdownV2) برای کاربرانی که دست‌کم یک زاویه دارند."""
+    messages = []
+    lines: List[str] = []
+    current = -1
+    header = TRANSIT_MESSAGE_HEADER.format(date=date_label)
+
+    def flush():
+        if lines:
+            messages.append((int(chat_ids[current]), utils.escape_markdown_v2("\n".join([header, ""] + lines + ["", TRANSIT_MESSAGE_FOOTER]))))
+
+    for user, t, p, k, orb in zip(hits["user"].tolist(), hits["transit"].tolist(), hits["point"].tolist(),
+                                  hits["aspect"].tolist(), hits["orb"].tolist()):
+        if user != current:
+            flush()
+            current, lines = user, []
+        lines.append(TRANSIT_LINE_TEMPLATE.format(transit=_TRANSIT_FA[t], aspect=_ASPECT_FA[k], natal=_NATAL_FA[p], orb=orb, tone=_ASPECT_TONE[k]))
+    flush()
+    return messages
+
+
+async def send_messages(messages: List[Tuple[int, str]], send: SendFunc, limiter: RateLimiter,
+                        concurrency: int = BROADCAST_CONCURRENCY, max_retries: int = BROADCAST_MAX_RETRIES) -> Tuple[int, int]:
+    """
+    ارسال همزمان (حداکثر concurrency) با رعایت limiter. بازگشت: (موفق، ناموفق).
+    اگر send خطای utils.TelegramRetryAfter بدهد، limiter به اندازه retry_after متوقف و پیام تا max_retries بار دوباره ارسال می‌شود.
+    """
+    slots = asyncio.Semaphore(concurrency)
+
+    async def send_one(chat_id: int, text: str) -> bool:
+        async with slots:
+            for attempt in range(max_retries + 1):
+                await limiter.acquire()
+                try:
+                    return bool(await send(chat_id, text))
+                except utils.TelegramRetryAfter as e:
+                    logging.warning(f"Transit broadcast rate limited (attempt {attempt + 1}); pausing {e.retry_after} s.")
+                    limiter.pause(e.retry_after)
+                except Exception as e:
+                    logging.error(f"Transit broadcast to {chat_id} failed: {e}")
+                    return False
+            logging.error(f"Transit broadcast to {chat_id} failed: still rate limited after {max_retries} retries.")
+            return False
+
+    results = await asyncio.gather(*(send_one(chat_id, text) for chat_id, text in messages))
+    sent = sum(results)
+    return sent, len(results) - sent
+
+
+async def _telegram_send(chat_id: int, text: str) -> bool:
+    return await utils.send_message(utils.BOT_TOKEN, chat_id, text, raise_on_retry_after=True)
+
+
+async def run_broadcast(run_date: Optional[datetime.date] = None, send: Optional[SendFunc] = None,
+                        batch_size: int = BROADCAST_BATCH_SIZE, rate: float = BROADCAST_RATE_PER_SECOND,
+                        checkpoint: bool = True, db_path: Optional[str] = None,
+                        backend: Union[str, astrology_core.PositionBackend, None] = None) -> Dict[str, Any]:
+    """
+    اجرای کامل ارسال روزانه برای run_date (پیش‌فرض امروز UTC).
+    checkpoint=False پیشرفت را ذخیره نمی‌کند (برای اجرای آزمایشی).
+    بازگشت در همه حالت‌ها (از جمله روزی که قبلاً تمام شده) با کلیدهای یکسان: run_id، users (کاربران این اجرا)،
+    sent و failed (مجموع روز)، resumed_after، last_chat_id، finished و stages.
+    """
+    run_date = run_date or datetime.datetime.utcnow().date()
+    run_id = run_date.isoformat()
+    send = send or _telegram_send
+    stats = StageStats()
+
+    previous = await state_manager.get_broadcast_checkpoint(run_id, db_path) if checkpoint else None
+    if previous and previous['finished']:
+        logging.info(f"Transit broadcast {run_id} already finished ({previous['sent']} sent); nothing to do.")
+        return {"run_id": run_id, "users": 0, "sent": previous['sent'], "failed": previous['failed'],
+                "resumed_after": previous['last_chat_id'], "last_chat_id": previous['last_chat_id'], "finished": True, "stages": {}}
+    after = previous['last_chat_id'] if previous else None
+    sent = previous['sent'] if previous else 0
+    failed = previous['failed'] if previous else 0
+    if previous:
+        logging.info(f"Resuming transit broadcast {run_id} after chat {after} ({sent} already sent).")
+
+    # 1. آسمان روز
+    start = time.perf_counter()
+    sky = compute_sky(run_jd(run_date), backend)
+    stats.add("sky", 1, time.perf_counter() - start)
+
+    # 2. چارت همه کاربران باقی‌مانده در یک ماتریس
+    start = time.perf_counter()
+    rows = await state_manager.load_user_charts(after_chat_id=after, db_path=db_path)
+    chat_ids, natal = natal_matrix(rows)
+    del rows
+    stats.add("load", len(chat_ids), time.perf_counter() - start)
+
+    limiter = RateLimiter(rate)
+    date_label = run_date.strftime('%Y/%m/%d')
+    last_chat_id = after if after is not None else 0
+    for first in range(0, len(chat_ids), batch_size):
+        batch_ids = chat_ids[first:first + batch_size]
+
+        # 3. زوایای ترانزیت به ناتال
+        start = time.perf_counter()
+        hits = transit_hits(sky, natal[first:first + batch_size])
+        stats.add("aspects", len(batch_ids), time.perf_counter() - start)
+
+        # 4. متن پیام‌ها
+        start = time.perf_counter()
+        messages = render_messages(batch_ids, hits, date_label)
+        stats.add("render", len(messages), time.perf_counter() - start)
+
+        # 5. ارسال
+        start = time.perf_counter()
+        ok, bad = await send_messages(messages, send, limiter)
+        stats.add("send", len(messages), time.perf_counter() - start)
+        sent += ok
+        failed += bad
+
+        last_chat_id = int(batch_ids[-1])
+        if checkpoint:
+            await state_manager.save_broadcast_checkpoint(run_id, last_chat_id, sent, failed, db_path=db_path)
+
+    if checkpoint:
+        await state_manager.save_broadcast_checkpoint(run_id, last_chat_id, sent, failed, finished=True, db_path=db_path)
+    stats.log()
+    logging.info(f"Transit broadcast {run_id}: {len(chat_ids)} users, {sent} sent, {failed} failed.")
+    return {"run_id": run_id, "users": len(chat_ids), "sent": sent, "failed": failed, "resumed_after": after,
+            "last_chat_id": last_chat_id, "finished": True, "stages": stats.report()}
+
+
+async def _dry_run_send(chat_id: int, text: str) -> bool:
+    return True
+
+
+async def _main(argv: List[str]):
+    dry_run = "--dry-run" in argv
+    dates = [arg for arg in argv if not arg.startswith("--")]
+    run_date = datetime.date.fromisoformat(dates[0]) if dates else None
+    await state_manager.init_db()
+    try:
+        result = await run_broadcast(run_date, send=_dry_run_send if dry_run else None, checkpoint=not dry_run,
+                                     rate=0 if dry_run else BROADCAST_RATE_PER_SECOND)
+    finally:
+        await utils.close_http_client()
+    print(f"{result['run_id']}: users {result['users']}, sent {result['sent']}, failed {result['failed']}")
+    for stage, row in result["stages"].items():
+        print(f"  {stage:<8} {row['items']:>8} items {row['seconds']:>9.3f}s {row['per_second']:>12.1f}/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1:]))
@@ -0,0 +1,259 @@
+# ----------------------------------------------------------------------
+# transit_search.py - یافتن زمان دقیق ترانزیت‌ها، ورود به برج‌ها و عبور از کاپس خانه‌ها
+#
+# برای هر جسم ترانزیتی، زمان با گام تطبیقی (بر اساس سرعت روزانه جسم) جلو می‌رود و
+# تغییر علامت فاصله تا هدف (نقطه ناتال + زاویه، مرز برج یا کاپس خانه) رویداد را محصور می‌کند.
+# سپس زمان دقیق با روش Brent (با پشتیبان دوبخشی) تا دقت زیر یک دقیقه پیدا می‌شود.
+# ایستگاه‌ها (تغییر علامت سرعت): نزدیک ایستگاه گام کوچک می‌شود و گامی که ایستگاه را در بر دارد در لحظه
+# ایستگاه (ریشه سرعت) دو نیم می‌شود، تا عبور از هدف و بازگشت از آن در یک گام گم نشود.
+# find_transits همه هدف‌های هر جسم (زوایا، مرز برج‌ها و کاپس‌ها) را در یک اسکن بررسی می‌کند.
+# خروجی‌ها به صورت generator و به ترتیب زمانی تولید می‌شوند تا اسکن یک‌ساله همه اجسام
+# بدون ساختن لیست‌های بزرگ جریان پیدا کند.
+# ----------------------------------------------------------------------
+
+import heapq
+import datetime
+import logging
+from typing import Dict, Any, Iterator, List, Optional, Sequence, Tuple, Callable
+
+import numpy as np
+import swisseph as se
+
+import astrology_core
+
+logging.basicConfig(level=logging.INFO)
+
+# نام انگلیسی برج‌ها به ترتیب (ایندکس 0 = حمل)
+SIGN_NAMES = astrology_core.SIGN_NAMES
+
+# بیشینه جابجایی جسم در هر گام (درجه) و محدوده گام (روز)
+MAX_STEP_DEGREES = 1.0
+MIN_STEP_DAYS = 1.0 / 24.0
+MAX_STEP_DAYS = 5.0
+# هنگام کند شدن جسم به سمت ایستگاه، گام حداکثر این کسر از زمان تخمینی تا ایستگاه (سرعت / شتاب) است
+STATION_STEP_FRACTION = 0.5
+
+
+def _wrap180(x):
+    """نگاشت زاویه به بازه [-180, 180)."""
+    return (np.asarray(x) + 180.0) % 360.0 - 180.0
+
+
+def jd_to_datetime(jd_utc: float) -> datetime.datetime:
+    """تبدیل JD UTC به datetime با منطقه زمانی UTC."""
+    year, month, day, hours = se.revjul(jd_utc)
+    return datetime.datetime(year, month, day, tzinfo=datetime.timezone.utc) + datetime.timedelta(hours=hours)
+
+
+def brent_root(func: Callable[[float], float], a: float, b: float, fa: float, fb: float, tol: float, max_iter: int = 100) -> float:
+    """
+    یافتن ریشه func در بازه [a, b] با روش Brent (ترکیب درون‌یابی معکوس، سکانت و دوبخشی).
+    fa و fb باید علامت مخالف داشته باشند.
+    """
+    if fa == 0.0:
+        return a
+    if fb == 0.0:
+        return b
+    c, fc = a, fa
+    d = e = b - a
+    for _ in range(max_iter):
+        if (fb > 0) == (fc > 0):
+            c, fc = a, fa
+            d = e = b - a
+        if abs(fc) < abs(fb):
+            a, b, c = b, c, b
+            fa, fb, fc = fb, fc, fb
+        tol1 = 2.0 * 1e-15 * abs(b) + 0.5 * tol
+        xm = 0.5 * (c - b)
+        if abs(xm) <= tol1 or fb == 0.0:
+            return b
+        if abs(e) >= tol1 and abs(fa) > abs(fb):
+            s = fb / fa
+            if a == c:
+                p = 2.0 * xm * s
+                q = 1.0 - s
+            else:
+                q = fa / fc
+                r = fb / fc
+                p = s * (2.0 * xm * q * (q - r) - (b - a) * (r - 1.0))
+                q = (q - 1.0) * (r - 1.0) * (s - 1.0)
+            if p > 0:
+                q = -q
+            p = abs(p)
+            if 2.0 * p < min(3.0 * xm * q - abs(tol1 * q), abs(e * q)):
+                e, d = d, p / q
+            else:
+                d = e = xm
+        else:
+            d = e = xm
+        a, fa = b, fb
+        b += d if abs(d) > tol1 else (tol1 if xm > 0 else -tol1)
+        fb = func(b)
+    logging.warning(f"brent_root did not converge in {max_iter} iterations.")
+    return b
+
+
+def _body_position(body_code: int, jd_utc: float) -> Tuple[float, float]:
+    lon, speed = astrology_core.get_position_backend().positions(np.array([jd_utc]), [body_code])
+    return float(lon[0, 0]), float(speed[0, 0])
+
+
+def _scan_targets(body_name: str, target_lons: np.ndarray, target_meta: List[Dict[str, Any]],
+                  start_jd: float, end_jd: float, tolerance_days: float) -> Iterator[Dict[str, Any]]:
+    """
+    اسکن یک جسم در برابر همه هدف‌ها به صورت هم‌زمان (برداری روی هدف‌ها).
+    هر رویداد: لحظه‌ای که طول جسم دقیقاً برابر طول هدف می‌شود.
+    """
+    body_code = astrology_core.PLANETS_MAP[body_name]
+    target_lons = np.asarray(target_lons, dtype=np.float64)
+    if len(target_lons) == 0:
+        return
+
+    def distance(jd: float, target: float) -> float:
+        return float(_wrap180(_body_position(body_code, jd)[0] - target))
+
+    def speed(jd: float) -> float:
+        return _body_position(body_code, jd)[1]
+
+    jd_prev = start_jd
+    lon_prev, speed_prev = _body_position(body_code, jd_prev)
+    dist_prev = _wrap180(lon_prev - target_lons)
+    accel_prev = 0.0
+
+    while jd_prev < end_jd:
+        step = MAX_STEP_DEGREES / max(abs(speed_prev), 1e-6)
+        if speed_prev * accel_prev < 0:
+            # در حال کند شدن: گام تا کسری از زمان باقی‌مانده تا ایستگاه کوچک می‌شود
+            step = min(step, STATION_STEP_FRACTION * abs(speed_prev / accel_prev))
+        step = min(max(step, MIN_STEP_DAYS), MAX_STEP_DAYS)
+        jd_next = min(jd_prev + step, end_jd)
+        lon_next, speed_next = _body_position(body_code, jd_next)
+        dist_next = _wrap180(lon_next - target_lons)
+
+        # بازه‌هایی که فاصله در هر کدام یکنواخت است: گام کامل، یا دو نیمه پیش و پس از ایستگاه
+        segments = [(jd_prev, dist_prev, jd_next, dist_next)]
+        if (speed_prev < 0) != (speed_next < 0):
+            jd_station = brent_root(speed, jd_prev, jd_next, speed_prev, speed_next, tolerance_days)
+            dist_station = _wrap180(_body_position(body_code, jd_station)[0] - target_lons)
+            segments = [(jd_prev, dist_prev, jd_station, dist_station), (jd_station, dist_station, jd_next, dist_next)]
+
+        events = []
+        for jd_a, dist_a, jd_b, dist_b in segments:
+            # تغییر علامت واقعی (نه پرش ±180 در طرف مقابل دایره)
+            crossed = ((dist_a < 0) != (dist_b < 0)) & (np.abs(dist_a - dist_b) < 180.0)
+            for t in np.nonzero(crossed)[0]:
+                target = float(target_lons[t])
+                jd_exact = brent_root(lambda jd: distance(jd, target), jd_a, jd_b,
+                                      float(dist_a[t]), float(dist_b[t]), tolerance_days)
+                _, speed_exact = _body_position(body_code, jd_exact)
+                events.append({
+                    **target_meta[t],
+                    "body": body_name,
+                    "jd_utc": jd_exact,
+                    "datetime_utc": jd_to_datetime(jd_exact),
+                    "target_degree": target,
+                    "retrograde": speed_exact < 0,
+                })
+        events.sort(key=lambda ev: ev["jd_utc"])
+        yield from events
+
+        accel_prev = (speed_next - speed_prev) / (jd_next - jd_prev)
+        jd_prev, speed_prev, dist_prev = jd_next, speed_next, dist_next
+
+
+def _natal_points(natal_chart: Dict[str, Any]) -> Dict[str, float]:
+    """نقاط ناتال قابل هدف‌گیری: سیارات، آسندانت، میدهون و سهم سعادت."""
+    points = {name: data['degree'] for name, data in natal_chart.get('planets', {}).items() if 'degree' in data}
+    houses = natal_chart.get('houses', {})
+    if not houses.get('error'):
+        points['ascendant'] = houses.get('ascendant')
+        points['midheaven'] = houses.get('midheaven')
+    pof = natal_chart.get('arabic_parts', {}).get('part_of_fortune', {})
+    if 'degree' in pof:
+        points['part_of_fortune'] = pof['degree']
+    return {k: float(v) for k, v in points.items() if v is not None}
+
+
+def _aspect_targets(natal_points: Dict[str, float], aspect_degrees: Dict[str, float]) -> Tuple[List[float], List[Dict[str, Any]]]:
+    """هدف‌های زوایا: هر نقطه ناتال + هر زاویه (غیر از 0 و 180 در دو سمت)."""
+    lons, meta = [], []
+    for point, point_deg in natal_points.items():
+        for aspect_name, angle in aspect_degrees.items():
+            offsets = {angle % 360.0, (-angle) % 360.0}
+            for offset in sorted(offsets):
+                lons.append((point_deg + offset) % 360.0)
+                meta.append({"type": "aspect", "aspect": aspect_name, "natal_point": point, "natal_degree": point_deg})
+    return lons, meta
+
+
+def _ingress_meta(sign_index: int) -> Dict[str, Any]:
+    return {"type": "ingress", "sign_index": sign_index, "sign": SIGN_NAMES[sign_index]}
+
+
+def _ingress_targets() -> Tuple[List[float], List[Dict[str, Any]]]:
+    """هدف‌های ورود به برج: مرز 12 برج."""
+    return [i * 30.0 for i in range(12)], [_ingress_meta(i) for i in range(12)]
+
+
+def _house_targets(cusps: Dict[int, float]) -> Tuple[List[float], List[Dict[str, Any]]]:
+    """هدف‌های عبور از خانه: کاپس‌های ناتال."""
+    houses = sorted(cusps)
+    return [float(cusps[h]) for h in houses], [{"type": "house", "house": h} for h in houses]
+
+
+def _relabel_retrograde(event: Dict[str, Any]) -> Dict[str, Any]:
+    """عبور رجعی از مرز برج یا کاپس k یعنی ورود به برج یا خانه قبلی (زوایا تغییری نمی‌کنند)."""
+    if event["retrograde"]:
+        if event["type"] == "ingress":
+            event.update(_ingress_meta((event["sign_index"] - 1) % 12))
+        elif event["type"] == "house":
+            event["house"] = 12 if event["house"] == 1 else event["house"] - 1
+    return event
+
+
+def _scan_body(body_name: str, targets: Sequence[Tuple[List[float], List[Dict[str, Any]]]], start_jd: float, end_jd: float,
+               tolerance_seconds: float) -> Iterator[Dict[str, Any]]:
+    """یک اسکن برای همه گروه‌های هدف یک جسم (ادغام طول‌ها و meta) با برچسب‌گذاری رجعی هر نوع رویداد."""
+    lons = [lon for group_lons, _ in targets for lon in group_lons]
+    meta = [m for _, group_meta in targets for m in group_meta]
+    for event in _scan_targets(body_name, np.array(lons, dtype=np.float64), meta, start_jd, end_jd, tolerance_seconds / 86400.0):
+        yield _relabel_retrograde(event)
+
+
+def find_aspect_hits(body_name: str, natal_points: Dict[str, float], start_jd: float, end_jd: float,
+                     aspect_degrees: Optional[Dict[str, float]] = None, tolerance_seconds: float = 1.0) -> Iterator[Dict[str, Any]]:
+    """زمان دقیق زوایای جسم ترانزیتی با نقاط ناتال (هر زاویه غیر از 0 و 180 در دو سمت بررسی می‌شود)."""
+    targets = _aspect_targets(natal_points, aspect_degrees or astrology_core.ASPECT_DEGREES)
+    return _scan_body(body_name, [targets], start_jd, end_jd, tolerance_seconds)
+
+
+def find_sign_ingresses(body_name: str, start_jd: float, end_jd: float, tolerance_seconds: float = 1.0) -> Iterator[Dict[str, Any]]:
+    """زمان دقیق ورود جسم به هر برج (در حرکت رجعی، ورود به برج قبلی گزارش می‌شود)."""
+    return _scan_body(body_name, [_ingress_targets()], start_jd, end_jd, tolerance_seconds)
+
+
+def find_house_crossings(body_name: str, cusps: Dict[int, float], start_jd: float, end_jd: float, tolerance_seconds: float = 1.0) -> Iterator[Dict[str, Any]]:
+    """زمان دقیق عبور جسم ترانزیتی از کاپس خانه‌های ناتال."""
+    return _scan_body(body_name, [_house_targets(cusps)], start_jd, end_jd, tolerance_seconds)
+
+
+def find_transits(natal_chart: Dict[str, Any], start_jd: float, end_jd: float, bodies: Optional[Sequence[str]] = None,
+                  aspect_degrees: Optional[Dict[str, float]] = None, include_ingresses: bool = True,
+                  include_houses: bool = True, tolerance_seconds: float = 1.0) -> Iterator[Dict[str, Any]]:
+    """
+    جریان زمانی همه رویدادهای ترانزیتی بین start_jd و end_jd برای چارت ناتال (خروجی calculate_natal_chart).
+    رویدادها ادغام شده و به ترتیب jd_utc تولید می‌شوند. کلید 'type' یکی از 'aspect'، 'ingress' یا 'house' است.
+    برای هر جسم همه هدف‌ها در یک اسکن بررسی می‌شوند (هر موقعیت اپمریس فقط یک بار محاسبه می‌شود).
+    """
+    bodies = list(bodies or astrology_core.BODY_NAMES)
+    houses = natal_chart.get('houses', {})
+    cusps = houses.get('cusps') if not houses.get('error') else None
+
+    targets = [_aspect_targets(_natal_points(natal_chart), aspect_degrees or astrology_core.ASPECT_DEGREES)]
+    if include_ingresses:
+        targets.append(_ingress_targets())
+    if include_houses and cusps:
+        targets.append(_house_targets(cusps))
+
+    streams = [_scan_body(body, targets, start_jd, end_jd, tolerance_seconds) for body in bodies]
+    return heapq.merge(*streams, key=lambda ev: ev["jd_utc"])
@@ -2,31 +2,121 @@
 
 import os
 import re
+import asyncio
 import logging
-from typing import Dict, Any, Optional
+import importlib.util
+from typing import Dict, Any, Optional, List, AsyncIterable, Awaitable, Callable, Union
 import httpx 
 import io 
 from persiantools.jdatetime import JalaliDate, JalaliDateTime 
 import datetime
 
+import time_conversion
+
 logging.basicConfig(level=logging.INFO)
 
 # فرض می‌کنیم توکن ربات از متغیر محیطی گرفته می‌شود
 BOT_TOKEN = os.environ.get("BOT_TOKEN") 
 
+# --- کلاینت HTTP مشترک (قابل تغییر با متغیرهای محیطی) ---
+# همه تماس‌های Bot API از یک httpx.AsyncClient با اتصال‌های keep-alive استفاده می‌کنند تا هر پیام هزینه
+# اتصال TCP و دست‌دهی TLS تازه با api.telegram.org را نپردازد. کلاینت در lifespan (bot_app) ساخته و بسته
+# می‌شود؛ اسکریپت‌ها (مانند transit_broadcast) با اولین تماس آن را می‌سازند و در پایان close_http_client را
+# فراخوانی می‌کنند. مقایسه با کلاینت تازه برای هر درخواست: benchmarks/bench_http_client.py
+TELEGRAM_API_URL = os.environ.get("TELEGRAM_API_URL", "https://api.telegram.org").rstrip("/")
+# HTTP/2 (یک اتصال برای درخواست‌های هم‌زمان) به بسته h2 نیاز دارد (pip install httpx[http2])
+TELEGRAM_HTTP2 = os.environ.get("TELEGRAM_HTTP2", "0") == "1"
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5"))
+# زمان کل هر درخواست؛ آپلود عکس زمان بیشتری دارد
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", "10"))
+HTTP_CALLBACK_TIMEOUT = float(os.environ.get("HTTP_CALLBACK_TIMEOUT", "5"))
+HTTP_UPLOAD_TIMEOUT = float(os.environ.get("HTTP_UPLOAD_TIMEOUT", "30"))
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_available() -> bool:
+    if not TELEGRAM_HTTP2:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logging.warning("TELEGRAM_HTTP2=1 but the 'h2' package is not installed; using HTTP/1.1.")
+        return False
+    return True
+
+
+def start_http_client() -> httpx.AsyncClient:
+    """ساخت کلاینت مشترک (از lifespan؛ اگر از قبل باز باشد همان برگردانده می‌شود)."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        limits = httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                              max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                              keepalive_expiry=HTTP_KEEPALIVE_EXPIRY)
+        http2 = _http2_available()
+        _http_client = httpx.AsyncClient(base_url=TELEGRAM_API_URL, http2=http2, limits=limits,
+                                         timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT))
+        logging.info(f"HTTP client started: {TELEGRAM_API_URL}, {'HTTP/2' if http2 else 'HTTP/1.1'}, "
+                     f"max connections {HTTP_MAX_CONNECTIONS}, keep-alive {HTTP_MAX_KEEPALIVE_CONNECTIONS}.")
+    return _http_client
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """کلاینت مشترک تماس‌های Bot API (در صورت نبود ساخته می‌شود)."""
+    return start_http_client()
+
+
+async def close_http_client():
+    """بستن اتصال‌های کلاینت مشترک (پایان lifespan یا اسکریپت)."""
+    global _http_client
+    if _http_client is None:
+        return
+    client, _http_client = _http_client, None
+    await client.aclose()
+    logging.info("HTTP client closed.")
+
+
+def _request_timeout(total: float) -> httpx.Timeout:
+    return httpx.Timeout(total, connect=HTTP_CONNECT_TIMEOUT)
+
+
 # --- توابع Telegram API Call ---
 
+class TelegramRetryAfter(Exception):
+    """پاسخ 429 تلگرام (محدودیت نرخ)؛ retry_after: ثانیه‌های انتظار پیش از تلاش دوباره."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Too Many Requests: retry after {retry_after} s")
+        self.retry_after = retry_after
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """مقدار parameters.retry_after پاسخ 429 (یا None)."""
+    if response.status_code != 429:
+        return None
+    try:
+        return float(response.json().get('parameters', {}).get('retry_after', 1))
+    except (ValueError, AttributeError):
+        return 1.0
+
+# کاراکترهای خاص MarkdownV2؛ جدول str.translate معادل escape_markdown_v2 (بدون regex) برای قطعه‌های کوتاه
+MARKDOWN_V2_SPECIAL_CHARS = "_*[]()~`>#+-=|{}.!"
+MARKDOWN_V2_ESCAPES = str.maketrans({c: "\\" + c for c in MARKDOWN_V2_SPECIAL_CHARS})
+
 def escape_markdown_v2(text: str) -> str:
     """فراردهی کاراکترهای خاص برای MarkdownV2 تلگرام."""
     chars_to_escape = r'([_*\[\]()~`>#+\-=|{}.!])'
     return re.sub(chars_to_escape, r'\\\1', text)
 
-async def send_message(bot_token: str, chat_id: int, text: str, reply_markup: Optional[Dict[str, Any]] = None):
+async def send_message(bot_token: str, chat_id: int, text: str, reply_markup: Optional[Dict[str, Any]] = None,
+                       raise_on_retry_after: bool = False) -> bool:
     """
-    ارسال پیام متنی به کاربر.
+    ارسال پیام متنی به کاربر. بازگشت: True در صورت موفقیت (خطاها فقط لاگ می‌شوند).
+    raise_on_retry_after: پاسخ 429 به صورت TelegramRetryAfter برگردانده می‌شود تا فراخواننده (ارسال گروهی) دوباره تلاش کند.
     اصلاح: کلید 'reply_markup' در صورت None بودن حذف می‌شود تا خطای 400 تلگرام رفع شود.
     """
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+    url = f"/bot{bot_token}/sendMessage"
     
     payload = {
         'chat_id': chat_id,
@@ -39,38 +129,153 @@ async def send_message(bot_token: str, chat_id: int, text: str, reply_markup: Op
         payload['reply_markup'] = reply_markup
     
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(url, json=payload)
-            response.raise_for_status()
-            logging.info(f"HTTP Request: POST .../sendMessage \"HTTP/1.1 {response.status_code}\"")
+        response = await get_http_client().post(url, json=payload, timeout=_request_timeout(HTTP_TIMEOUT))
+        response.raise_for_status()
+        logging.info(f"HTTP Request: POST .../sendMessage \"{response.http_version} {response.status_code}\"")
+        return True
     except httpx.HTTPStatusError as e:
+        retry_after = _retry_after(e.response)
+        if retry_after is not None and raise_on_retry_after:
+            raise TelegramRetryAfter(retry_after) from e
         logging.error(f"HTTP Error: Status {e.response.status_code}, Response: {e.response.text}")
     except Exception as e:
         logging.error(f"Error sending message: {e}")
+    return False
+
+# حداکثر طول متن یک پیام تلگرام (بر حسب واحدهای UTF-16، همان شمارش تلگرام)
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+def telegram_length(text: str) -> int:
+    """طول متن به شمارش تلگرام (کاراکترهای خارج از BMP مانند برخی ایموجی‌ها دو واحد هستند)."""
+    return len(text.encode("utf-16-le")) // 2
+
+def _safe_cut(text: str, limit: int) -> int:
+    """بیشترین نقطه برش امن تا limit: ترجیحاً پایان خط، سپس فاصله؛ هرگز میان '\\' و کاراکتر فراردهی‌شده‌اش."""
+    cut = min(len(text), limit)
+    while telegram_length(text[:cut]) > limit:
+        cut -= 1
+    for separator in ("\n", " "):
+        position = text.rfind(separator, 0, cut)
+        if position > cut // 2:
+            cut = position + 1
+            break
+    # برش پس از تعداد فرد '\\' یعنی جدا شدن فراردهی از کاراکترش؛ پیش از variation selector / ZWJ هم برش نمی‌خورد
+    while cut > 1 and ((len(text[:cut]) - len(text[:cut].rstrip("\\"))) % 2 == 1 or text[cut] in "\ufe0f\u200d"):
+        cut -= 1
+    return cut
+
+def split_markdown_v2(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[str]:
+    """
+    تقسیم متن فراردهی‌شده MarkdownV2 به تکه‌های حداکثر limit.
+    متن باید کاملاً فراردهی‌شده باشد (بدون قالب‌بندی باز مانند *...*)، پس تنها مرز ناامن میان یک '\\' و کاراکتر
+    بعدی آن است. تکه‌های خالی (فقط فاصله) حذف می‌شوند چون تلگرام پیام خالی را نمی‌پذیرد.
+    """
+    chunks = []
+    while telegram_length(text) > limit:
+        cut = _safe_cut(text, limit)
+        chunks.append(text[:cut])
+        text = text[cut:]
+    chunks.append(text)
+    return [chunk for chunk in chunks if chunk.strip()]
+
+async def send_message_stream(bot_token: str, chat_id: int, sections: AsyncIterable[str],
+                              reply_markup: Optional[Dict[str, Any]] = None, limit: int = TELEGRAM_MESSAGE_LIMIT,
+                              before_last: Optional[Callable[[], Awaitable[Any]]] = None) -> int:
+    """
+    ارسال ترتیبی متن طولانی (بخش‌های فراردهی‌شده) در چند پیام، هم‌زمان با تولید بخش‌های بعدی.
+    هر پیام همه بخش‌های آماده تا سقف limit را در بر می‌گیرد؛ بخشی که دیرتر آماده شود در پیام بعدی می‌رود
+    (بنابراین متن آماده یکجا در یک پیام و متن کند بدون انتظار برای پایان آن ارسال می‌شود).
+    reply_markup فقط به آخرین پیام افزوده می‌شود. بازگشت: تعداد پیام‌های ارسال‌شده (با اولین خطا متوقف می‌شود).
+    before_last: تابع async که درست پیش از آخرین پیام اجرا می‌شود (مثلاً ارسال تصویر بالای پیام دارای کیبورد).
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def produce():
+        try:
+            async for section in sections:
+                await queue.put(section)
+        finally:
+            await queue.put(None)
+
+    ready: List[str] = []
+    carry: List[Optional[str]] = []
+
+    async def next_message() -> Optional[str]:
+        while not ready:
+            section = carry.pop() if carry else await queue.get()
+            if section is None:
+                return None
+            while not queue.empty():
+                following = queue.get_nowait()
+                if following is None or telegram_length(section) + telegram_length(following) > limit:
+                    carry.append(following)
+                    break
+                section += following
+            ready.extend(reversed(split_markdown_v2(section, limit)))
+        return ready.pop()
+
+    producer = asyncio.create_task(produce())
+    sent = 0
+    try:
+        # یک پیام جلوتر خوانده می‌شود تا آخرین پیام (دارای reply_markup) مشخص باشد
+        pending = await next_message()
+        while pending is not None:
+            following = await next_message()
+            if following is None and before_last is not None:
+                await before_last()
+            if not await send_message(bot_token, chat_id, pending, reply_markup if following is None else None):
+                break
+            sent += 1
+            pending = following
+    finally:
+        producer.cancel()
+    await asyncio.gather(producer, return_exceptions=True)
+    return sent
+
+async def send_long_message(bot_token: str, chat_id: int, text: str, reply_markup: Optional[Dict[str, Any]] = None,
+                            before_last: Optional[Callable[[], Awaitable[Any]]] = None) -> bool:
+    """ارسال متن فراردهی‌شده بلندتر از سقف تلگرام در چند پیام (reply_markup روی آخرین پیام)."""
+    async def single():
+        yield text
+    return await send_message_stream(bot_token, chat_id, single(), reply_markup, before_last=before_last) > 0
 
 async def answer_callback_query(bot_token: str, callback_id: str, text: Optional[str] = None, show_alert: bool = False):
     """پاسخ به کلیک‌های اینلاین (برای جلوگیری از ماندن علامت لودینگ)."""
-    url = f"https://api.telegram.org/bot{bot_token}/answerCallbackQuery"
+    url = f"/bot{bot_token}/answerCallbackQuery"
     payload = {
         'callback_query_id': callback_id,
         'text': text,
         'show_alert': show_alert
     }
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            await client.post(url, json=payload)
+        await get_http_client().post(url, json=payload, timeout=_request_timeout(HTTP_CALLBACK_TIMEOUT))
     except Exception as e:
         logging.error(f"Error answering callback query: {e}")
 
 
+def image_file_type(photo: Union[io.BytesIO, bytes]) -> tuple:
+    """(نام فایل، نوع MIME) تصویر از روی امضای ابتدای فایل (PNG، JPEG یا WebP؛ image_encoding)."""
+    head = (photo.getvalue() if isinstance(photo, io.BytesIO) else photo)[:12]
+    if head.startswith(b"\xff\xd8"):
+        return 'chart.jpg', 'image/jpeg'
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return 'chart.webp', 'image/webp'
+    return 'chart.png', 'image/png'
+
 # 💥 تابع ارسال عکس با کپشن 💥
-async def send_photo_with_caption(bot_token: str, chat_id: int, photo: io.BytesIO, caption: str, reply_markup: Optional[Dict[str, Any]] = None):
-    """ارسال یک فایل باینری (عکس) به همراه کپشن به تلگرام."""
-    url = f"https://api.telegram.org/bot{bot_token}/sendPhoto"
+async def send_photo_with_caption(bot_token: str, chat_id: int, photo: Union[io.BytesIO, bytes, str], caption: str,
+                                  reply_markup: Optional[Dict[str, Any]] = None, notify_on_error: bool = True):
+    """
+    ارسال عکس به همراه کپشن به تلگرام.
+    photo: فایل باینری (آپلود multipart) یا file_id عکسی که قبلاً ارسال شده (بدون آپلود؛ image_cache).
+    پاسخ JSON تلگرام برگردانده می‌شود (file_id عکس آپلودشده در result.photo است).
+    """
+    url = f"/bot{bot_token}/sendPhoto"
     
-    files = {
-        'photo': ('chart.png', photo, 'image/png') 
-    }
+    files = None
+    if not isinstance(photo, str):
+        filename, content_type = image_file_type(photo)
+        files = {'photo': (filename, photo, content_type)}
     
     data = {
         'chat_id': chat_id,
@@ -87,16 +292,18 @@ async def send_photo_with_caption(bot_token: str, chat_id: int, photo: io.BytesI
         import json
         data['reply_markup'] = json.dumps(reply_markup)
 
+    if files is None:
+        data['photo'] = photo
 
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(url, data=data, files=files)
-            response.raise_for_status()
-            logging.info(f"HTTP Request: POST .../sendPhoto \"HTTP/1.1 {response.status_code}\"")
-            return response.json()
+        response = await get_http_client().post(url, data=data, files=files, timeout=_request_timeout(HTTP_UPLOAD_TIMEOUT))
+        response.raise_for_status()
+        logging.info(f"HTTP Request: POST .../sendPhoto \"{response.http_version} {response.status_code}\"")
+        return response.json()
     except httpx.HTTPStatusError as e:
         logging.error(f"HTTP ERROR in send_photo: Status {e.response.status_code}, Response: {e.response.text}")
-        await send_message(bot_token, chat_id, escape_markdown_v2(f"❌ *خطای ارسال عکس*:\n `{e.response.status_code}`"), None)
+        if notify_on_error:
+            await send_message(bot_token, chat_id, escape_markdown_v2(f"❌ *خطای ارسال عکس*:\n `{e.response.status_code}`"), None)
         return {"ok": False, "error": f"HTTP Error: {e.response.status_code}"}
     except Exception as e:
         logging.error(f"Unknown ERROR in send_photo: {e}")
@@ -106,11 +313,14 @@ async def send_photo_with_caption(bot_token: str, chat_id: int, photo: io.BytesI
 # --- توابع کمکی تبدیل و جستجو ---
 
 def parse_persian_date(date_str: str) -> Optional[JalaliDate]:
-    """تبدیل رشته تاریخ شمسی به شیء JalaliDate."""
+    """تبدیل رشته تاریخ شمسی به شیء JalaliDate (None برای سال‌های بیرون از بازه time_conversion)."""
     try:
-        return JalaliDate.strptime(date_str, '%Y/%m/%d')
+        jdate = JalaliDate.strptime(date_str, '%Y/%m/%d')
     except ValueError:
         return None
+    if not time_conversion.JALALI_FIRST_YEAR <= jdate.year <= time_conversion.JALALI_LAST_YEAR:
+        return None
+    return jdate
 
 def parse_persian_time(time_str: str) -> Optional[str]:
     """اعتبار سنجی رشته ساعت (HH:MM)."""